@@ -0,0 +1,272 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+from json_schema_loader import JsonSchemaLoader
+from join_planner import JoinPlanner
+from query_generator import QueryGenerator
+from query_validator import QueryValidator
+from llm_backend import FixtureBackend, PerplexityBackend
+from sql_stream import SQLStreamParser
+
+STAGES = [
+    "extract_keywords",
+    "find_related_tables",
+    "build_context",
+    "build_prompt",
+    "llm_first_fragment",
+    "llm_total",
+    "validate_tables",
+    "explain",
+    "execute",
+]
+
+class OfflineConnector:
+    """DB 없이 JSON 메타데이터의 관계 그래프만 제공하는 커넥터"""
+    def __init__(self, json_loader):
+        self.json_loader = json_loader
+
+        self._join_planner = None
+
+    def build_relation_graph(self):
+        return self.json_loader.relation_graph
+
+    def get_join_planner(self):
+        if self._join_planner is None:
+            self._join_planner = JoinPlanner.from_sources(
+                self.json_loader.metadata, relation_graph=self.json_loader.relation_graph
+            )
+        return self._join_planner
+
+class JsonInspector:
+    """JSON 메타데이터 기반 inspector (QueryValidator 오프라인 측정용)"""
+    def __init__(self, json_loader):
+        self.json_loader = json_loader
+
+    def get_table_names(self):
+        return list(self.json_loader.metadata.keys())
+
+    def get_columns(self, table_name):
+        columns = self.json_loader.metadata[table_name]['columns']
+        return [{'name': name, 'type': info['type']} for name, info in columns.items()]
+
+def percentile(values, pct):
+    """최근접 순위 방식 백분위수"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+    }
+
+def build_pipeline(args):
+    """벤치마크 대상 파이프라인 구성"""
+    json_loader = JsonSchemaLoader(os.path.join(ROOT, "docs/data_discription.json"))
+    stub_server = None
+
+    if args.backend == "fixture":
+        backend = FixtureBackend(args.llm_fixtures, latency=args.llm_latency,
+                                 tokens_per_second=args.tokens_per_second)
+    elif args.backend == "stub":
+        from stub_llm_server import StubLLMServer
+        stub_server = StubLLMServer(args.llm_fixtures, port=0, latency=args.llm_latency,
+                                    tokens_per_second=args.tokens_per_second).start()
+        backend = PerplexityBackend(api_key="stub", api_url=stub_server.url)
+    else:
+        backend = PerplexityBackend()
+
+    if args.db:
+        from dotenv import load_dotenv
+        from db_connector import DatabaseConnector
+        load_dotenv(os.path.join(ROOT, ".env"))
+        connection_string = (
+            f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
+            f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+        )
+        db_connector = DatabaseConnector(connection_string, json_loader)
+        validator = QueryValidator(db_connector.inspector)
+    else:
+        db_connector = OfflineConnector(json_loader)
+        validator = QueryValidator(JsonInspector(json_loader))
+
+    generator = QueryGenerator(db_connector, json_loader, backend=backend)
+    return generator, validator, db_connector, stub_server
+
+def run_question(generator, validator, db_connector, question, use_db):
+    """질의 하나의 단계별 소요 시간(ms) 측정"""
+    timings = {}
+
+    def timed(stage, func, *args):
+        start = time.perf_counter()
+        value = func(*args)
+        timings[stage] = (time.perf_counter() - start) * 1000
+        return value
+
+    keywords = timed("extract_keywords", generator._extract_keywords, question)
+    tables = timed("find_related_tables", generator._find_related_tables, keywords)
+    context = timed("build_context", generator._build_schema_context, question, tables, keywords)
+    messages, prompt_context = timed("build_prompt", generator._build_messages, question)
+
+    # LLM 호출 (캐시를 거치지 않고 스트리밍 파서까지 측정)
+    parser = SQLStreamParser()
+    fragments = []
+    start = time.perf_counter()
+    chunks = generator.backend.stream(messages, **generator.generation_params)
+    try:
+        for chunk in chunks:
+            fragment = parser.feed(chunk)
+            if fragment:
+                if not fragments:
+                    timings["llm_first_fragment"] = (time.perf_counter() - start) * 1000
+                fragments.append(fragment)
+            if parser.done:
+                break
+    finally:
+        chunks.close()
+    found = parser.found
+    tail = parser.finish()
+    fragments.append(tail if found else generator._extract_sql(tail))
+    timings["llm_total"] = (time.perf_counter() - start) * 1000
+    timings.setdefault("llm_first_fragment", timings["llm_total"])
+    sql_query = "".join(fragments).strip()
+
+    error = None
+    try:
+        timed("validate_tables", validator.validate_tables, sql_query)
+        if use_db:
+            timed("explain", db_connector.analyze_query, sql_query)
+            timed("execute", db_connector.execute_query, sql_query)
+    except Exception as e:
+        error = str(e)
+
+    return {
+        "question": question,
+        "tables": tables,
+        "context_tokens": context["tokens"],
+        "prompt_tokens": prompt_context["prompt_tokens"],
+        "sql": sql_query,
+        "error": error,
+        "timings_ms": timings,
+    }
+
+def compare(report, baseline, tolerance):
+    """기준 결과 대비 p50/p95 회귀 탐지"""
+    regressions = []
+    for stage, current in report["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous:
+            continue
+        for key in ("p50", "p95"):
+            before, after = previous.get(key), current.get(key)
+            # 0.05ms 미만의 단계는 측정 오차로 간주
+            if not before or after is None or max(before, after) < 0.05:
+                continue
+            ratio = after / before
+            if ratio > 1 + tolerance:
+                regressions.append({"stage": stage, "metric": key, "baseline": before,
+                                    "current": after, "ratio": round(ratio, 3)})
+    for key in ("prompt_tokens", "context_tokens"):
+        before = baseline.get(key, {}).get("p50")
+        after = report[key]["p50"]
+        if before and after and after > before * (1 + tolerance):
+            regressions.append({"stage": key, "metric": "p50", "baseline": before,
+                                "current": after, "ratio": round(after / before, 3)})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="골든 질의 기반 파이프라인 단계별 지연 시간 벤치마크")
+    parser.add_argument("--questions", default=os.path.join(ROOT, "benchmarks/fixtures/golden_questions.json"))
+    parser.add_argument("--llm-fixtures", default=os.path.join(ROOT, "benchmarks/fixtures/llm_responses.json"))
+    parser.add_argument("--backend", choices=["fixture", "stub", "perplexity"], default="fixture")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="LLM 첫 토큰 지연(초)")
+    parser.add_argument("--tokens-per-second", type=float, default=None)
+    parser.add_argument("--db", action="store_true", help=".env의 DB로 EXPLAIN 및 실행 단계 측정")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--output", default=None, help="결과 JSON 저장 경로")
+    parser.add_argument("--baseline", default=os.path.join(ROOT, "benchmarks/baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="이번 결과를 기준 결과로 저장")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="허용 회귀 비율")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    with open(args.questions, 'r', encoding='utf-8') as f:
+        questions = [q["question"] for q in json.load(f)["questions"]]
+
+    generator, validator, db_connector, stub_server = build_pipeline(args)
+    try:
+        for _ in range(args.warmup):
+            for question in questions:
+                run_question(generator, validator, db_connector, question, args.db)
+
+        samples = defaultdict(list)
+        prompt_tokens, context_tokens, details = [], [], []
+        for _ in range(args.iterations):
+            for question in questions:
+                result = run_question(generator, validator, db_connector, question, args.db)
+                for stage, ms in result["timings_ms"].items():
+                    samples[stage].append(ms)
+                prompt_tokens.append(result["prompt_tokens"])
+                context_tokens.append(result["context_tokens"])
+                details.append(result)
+    finally:
+        generator.close()
+        if stub_server:
+            stub_server.stop()
+
+    report = {
+        "meta": {
+            "backend": args.backend,
+            "db": args.db,
+            "iterations": args.iterations,
+            "questions": len(questions),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "stages": {stage: summarize(samples[stage]) for stage in STAGES if samples.get(stage)},
+        "prompt_tokens": summarize(prompt_tokens),
+        "context_tokens": summarize(context_tokens),
+        "questions": details[-len(questions):],
+    }
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        report["regressions"] = regressions
+
+    print(f"{'stage':<22}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+    for stage, stats in report["stages"].items():
+        print(f"{stage:<22}{stats['p50']:>10.3f}{stats['p95']:>10.3f}{stats['p99']:>10.3f}")
+    print(f"prompt tokens p50={report['prompt_tokens']['p50']} p95={report['prompt_tokens']['p95']}")
+    for regression in regressions:
+        print(f"회귀: {regression['stage']} {regression['metric']} "
+              f"{regression['baseline']:.3f} -> {regression['current']:.3f} (x{regression['ratio']})")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+from json_schema_loader import JsonSchemaLoader
+from query_generator import QueryGenerator
+from hybrid_retriever import HybridRetriever
+from llm_backend import FixtureBackend
+from bench_pipeline import OfflineConnector, summarize
+
+def recall_at(ranked, expected, k):
+    """상위 k개 안에 포함된 정답 테이블 비율"""
+    if not expected:
+        return None
+    return len(set(ranked[:k]) & set(expected)) / len(expected)
+
+def build_methods(args):
+    """측정할 테이블 검색 방식 (이름 -> 함수(질문) -> 순위 목록)"""
+    json_loader = JsonSchemaLoader(os.path.join(ROOT, "docs/data_discription.json"))
+    generator = QueryGenerator(
+        OfflineConnector(json_loader), json_loader,
+        backend=FixtureBackend(os.path.join(ROOT, "benchmarks/fixtures/llm_responses.json"))
+    )
+    max_k = max(args.k)
+    lexical = HybridRetriever(json_loader, table_k=max_k, candidate_k=max_k, parallel=False)
+    methods = {
+        # 현재 파이프라인 (키워드 확장 + 역색인 부분 문자열 점수)
+        "keyword": lambda q: generator._find_related_tables(generator._extract_keywords(q)),
+        "bm25": lambda q: [t for t, _ in lexical.bm25.search(" ".join([q] + sorted(generator._extract_keywords(q))))[0]],
+        # 키워드 + BM25 (임베딩 모델 준비 전 하이브리드 검색과 같음)
+        "fused": lambda q: lexical.tables(q, generator._extract_keywords(q)),
+    }
+
+    embedder = None
+    if not args.no_semantic and importlib.util.find_spec("sentence_transformers") is not None:
+        from schema_embedder import SchemaEmbedder
+        embedder = SchemaEmbedder(json_loader, cache_dir=os.path.join(ROOT, "cache/schema_embeddings"))
+        embedder.start_warmup()
+        if embedder.wait_ready(args.ready_timeout):
+            hybrid = HybridRetriever(json_loader, embedder, table_k=max_k, candidate_k=max(max_k, 20),
+                                     parallel=not args.sequential, budget_ms=args.budget_ms)
+            methods["semantic"] = lambda q: [
+                table for table, _ in sorted(
+                    ((table, max([info['table_score']] + [c['score'] for c in info['columns']]))
+                     for table, info in embedder.search_schema(q, table_k=max_k, column_k=max_k * 2).items()),
+                    key=lambda x: -x[1]
+                )
+            ]
+            methods["hybrid"] = lambda q: hybrid.tables(q, generator._extract_keywords(q))
+        else:
+            print(f"임베딩 모델 준비 실패: {embedder.status()['error']}")
+    else:
+        print("sentence_transformers가 없거나 --no-semantic이 지정되어 BM25/키워드 방식만 측정합니다.")
+    return methods, generator
+
+def main():
+    parser = argparse.ArgumentParser(description="골든 질의 기반 테이블 검색 recall@k 및 지연 시간 벤치마크")
+    parser.add_argument("--questions", default=os.path.join(ROOT, "benchmarks/fixtures/golden_questions.json"))
+    parser.add_argument("--k", type=int, nargs="+", default=[3, 5, 8])
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=None, help="하이브리드 검색 지연 예산(ms)")
+    parser.add_argument("--sequential", action="store_true", help="하이브리드 검색을 순차 실행")
+    parser.add_argument("--no-semantic", action="store_true", help="임베딩 검색 제외")
+    parser.add_argument("--ready-timeout", type=float, default=300.0)
+    parser.add_argument("--output", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    with open(args.questions, 'r', encoding='utf-8') as f:
+        questions = [q for q in json.load(f)["questions"] if q.get("expected_tables")]
+
+    methods, generator = build_methods(args)
+    report = {
+        "meta": {
+            "questions": len(questions),
+            "iterations": args.iterations,
+            "k": args.k,
+            "budget_ms": args.budget_ms,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "methods": {},
+    }
+    try:
+        for name, method in methods.items():
+            latencies, details = [], []
+            recalls = {k: [] for k in args.k}
+            for question in questions:
+                method(question["question"])  # 준비 실행 (LRU/지연 로드 제외)
+                for _ in range(args.iterations):
+                    start = time.perf_counter()
+                    ranked = method(question["question"])
+                    latencies.append((time.perf_counter() - start) * 1000)
+                for k in args.k:
+                    recalls[k].append(recall_at(ranked, question["expected_tables"], k))
+                details.append({
+                    "question": question["question"],
+                    "expected": question["expected_tables"],
+                    "ranked": ranked[:max(args.k)],
+                    "missed": [t for t in question["expected_tables"] if t not in ranked[:max(args.k)]],
+                })
+            report["methods"][name] = {
+                "recall": {f"@{k}": sum(values) / len(values) for k, values in recalls.items()},
+                "latency_ms": summarize(latencies),
+                "questions": details,
+            }
+    finally:
+        generator.close()
+
+    header = "".join(f"{'recall@' + str(k):>11}" for k in args.k)
+    print(f"{'method':<10}{header}{'p50(ms)':>10}{'p95(ms)':>10}")
+    for name, result in report["methods"].items():
+        recalls = "".join(f"{result['recall'][f'@{k}']:>11.3f}" for k in args.k)
+        latency = result["latency_ms"]
+        print(f"{name:<10}{recalls}{latency['p50']:>10.3f}{latency['p95']:>10.3f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
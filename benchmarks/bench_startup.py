@@ -0,0 +1,149 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import importlib.util
+import subprocess
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+# 새 인터프리터에서 측정할 모듈 (가져오기 시간)
+IMPORT_MODULES = [
+    "schema_embedder",
+    "semantic_cache",
+    "query_generator",
+    "app",
+]
+
+def child_import(module):
+    """모듈 가져오기 시간(ms)"""
+    start = time.perf_counter()
+    __import__(module)
+    return {f"import_{module}": (time.perf_counter() - start) * 1000}
+
+def child_startup(wait_ready, timeout):
+    """오프라인 구성 요소 생성 및 임베딩 준비 시간(ms)"""
+    timings = {}
+    start = time.perf_counter()
+    from json_schema_loader import JsonSchemaLoader
+    from query_generator import QueryGenerator
+    from schema_embedder import SchemaEmbedder
+    from semantic_cache import SemanticCache
+    from llm_backend import FixtureBackend
+    from bench_pipeline import OfflineConnector
+    json_loader = JsonSchemaLoader(os.path.join(ROOT, "docs/data_discription.json"))
+    embedder = SchemaEmbedder(json_loader, cache_dir=os.path.join(ROOT, "cache/schema_embeddings"))
+    embedder.start_warmup()
+    generator = QueryGenerator(
+        OfflineConnector(json_loader), json_loader,
+        semantic_cache=SemanticCache(embedder),
+        backend=FixtureBackend(os.path.join(ROOT, "benchmarks/fixtures/llm_responses.json"))
+    )
+    # 키워드 기반 검색으로 질의를 처리할 수 있는 시점
+    generator._find_related_tables(generator._extract_keywords("실험체별 평균 킬 수"))
+    timings["startup_serving"] = (time.perf_counter() - start) * 1000
+
+    if wait_ready:
+        if embedder.wait_ready(timeout):
+            timings["startup_semantic_ready"] = (time.perf_counter() - start) * 1000
+    generator.close()
+    return timings
+
+def run_child(args):
+    """별도 프로세스에서 측정 하나 실행"""
+    command = [sys.executable, os.path.abspath(__file__), "--child"] + args
+    output = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def compare(report, baseline, tolerance, min_ms):
+    """기준 결과 대비 p50 회귀 탐지"""
+    regressions = []
+    for name, current in report["timings"].items():
+        previous = baseline.get("timings", {}).get(name)
+        if not previous:
+            continue
+        before, after = previous.get("p50"), current.get("p50")
+        # 짧은 구간은 프로세스 생성 편차로 간주
+        if not before or after is None or max(before, after) < min_ms:
+            continue
+        ratio = after / before
+        if ratio > 1 + tolerance:
+            regressions.append({"name": name, "baseline": before, "current": after, "ratio": round(ratio, 3)})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="모듈 가져오기 및 시작 시간 벤치마크")
+    parser.add_argument("--child", nargs="+", help=argparse.SUPPRESS)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--wait-ready", action="store_true", help="임베딩 모델 준비 완료까지 측정")
+    parser.add_argument("--ready-timeout", type=float, default=300.0)
+    parser.add_argument("--output", default=None, help="결과 JSON 저장 경로")
+    parser.add_argument("--baseline", default=os.path.join(ROOT, "benchmarks/startup_baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="이번 결과를 기준 결과로 저장")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="허용 회귀 비율")
+    parser.add_argument("--min-ms", type=float, default=5.0, help="회귀 판정 최소 시간(ms)")
+    args = parser.parse_args()
+
+    if args.child:
+        kind = args.child[0]
+        if kind == "import":
+            result = child_import(args.child[1])
+        else:
+            result = child_startup(args.child[1] == "1", float(args.child[2]))
+        print(json.dumps(result))
+        return
+
+    # 측정용 자식 프로세스에는 파이프라인 모듈을 미리 불러오지 않음
+    from bench_pipeline import summarize
+    os.chdir(ROOT)
+    wait_ready = args.wait_ready and importlib.util.find_spec("sentence_transformers") is not None
+    if args.wait_ready and not wait_ready:
+        print("sentence_transformers가 없어 임베딩 준비 시간은 측정하지 않습니다.")
+
+    samples = defaultdict(list)
+    for _ in range(args.iterations):
+        for module in IMPORT_MODULES:
+            for name, ms in run_child(["import", module]).items():
+                samples[name].append(ms)
+        for name, ms in run_child(["startup", "1" if wait_ready else "0", str(args.ready_timeout)]).items():
+            samples[name].append(ms)
+
+    report = {
+        "meta": {
+            "iterations": args.iterations,
+            "wait_ready": wait_ready,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "timings": {name: summarize(values) for name, values in samples.items()},
+    }
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance, args.min_ms)
+        report["regressions"] = regressions
+
+    print(f"{'name':<32}{'p50(ms)':>10}{'p95(ms)':>10}")
+    for name, stats in report["timings"].items():
+        print(f"{name:<32}{stats['p50']:>10.1f}{stats['p95']:>10.1f}")
+    for regression in regressions:
+        print(f"회귀: {regression['name']} {regression['baseline']:.1f} -> "
+              f"{regression['current']:.1f} (x{regression['ratio']})")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,77 +1,259 @@
 import os
-import pymysql
-from pymysql.cursors import DictCursor
+import time
+from cache import SingleFlight
 from db_connector import DatabaseConnector
 from query_generator import QueryGenerator
 from query_validator import QueryValidator
 from json_schema_loader import JsonSchemaLoader
+from persistent_cache import PersistentCache, compute_schema_fingerprint
+from schema_snapshot import open_snapshot, write_snapshot, content_hash
+from schema_reloader import SchemaReloader
+from value_index import ValueIndex
+from rate_limiter import TokenBucket
+from result_stream import collect_rows
+from result_cache import ResultCache, DataVersionProbe
+from tracing import Tracer, span, annotate
+from utils import normalize_question
 from dotenv import load_dotenv
 
 class TextToSQLApp:
-    def __init__(self, db_config):
+    def __init__(self, db_config, use_semantic_cache=False, cache_path="./cache/sql_cache.db",
+                 llm_backend=None, trace_path=None, metrics_path=None, metrics_port=None,
+                 snapshot_path="./cache/schema_snapshot.bin", schema_watch_interval=None,
+                 embedding_cache_dir="./cache/schema_embeddings", table_retriever="keyword",
+                 retrieval_budget_ms=None, embedding_workers=None, embedding_batch_window_ms=5,
+                 value_aliases_path="./mapping/value_aliases.json", value_refresh_interval=3600,
+                 parallel_schema_reflection=False, max_result_rows=10000, max_result_bytes=16 * 1024 * 1024,
+                 result_batch_size=500, result_cache_bytes=64 * 1024 * 1024, result_cache_ttl=600,
+                 closed_version_ttl=7 * 24 * 3600):
         # 데이터베이스 연결 설정
         connection_string = f"mysql+pymysql://{db_config['user']}:{db_config['password']}@{db_config['host']}:{db_config['port']}/{db_config['database']}"
-        # JSON 스키마 로더 초기화
-        self.json_loader = JsonSchemaLoader("./docs/data_discription.json")
+        self.json_path = "./docs/data_discription.json"
+        self.mapping_path = "./mapping/keyword_mapping.json"
         self.db_config = db_config
+        
+        # 스키마 스냅샷 확인 (데이터 명세서/매핑 파일 해시가 같을 때만 사용)
+        self.snapshot_path = snapshot_path
+        source_hash = content_hash([self.json_path, self.mapping_path])
+        snapshot = open_snapshot(snapshot_path, source_hash) if snapshot_path else None
+        
+        # JSON 스키마 로더 초기화
+        self.json_loader = snapshot.restore_loader() if snapshot else JsonSchemaLoader(self.json_path)
         # 데이터베이스 커넥터 초기화 (연결 풀 사용)
         self.db_connector = DatabaseConnector(
             connection_string=connection_string,
             json_loader=self.json_loader,
-            pool_size=5  # 연결 풀 크기 설정
+            pool_size=5,  # 연결 풀 크기 설정
+            parallel_reflection=parallel_schema_reflection  # 스키마 일괄 조회 동시 실행
         )
         
+        # 실제 DB 스키마가 스냅샷과 같으면 inspector 반영 생략
+        db_hash = self.db_connector.schema_probe_hash() if snapshot_path else None
+        self.schema_db_hash = db_hash
+        schema_current = bool(snapshot and db_hash and snapshot.db_hash == db_hash)
+        if schema_current:
+            self.db_connector.preload_schema(snapshot.db_schema())
+        
+        # 디스크 캐시 초기화 (스키마 지문이 바뀌면 기존 항목 무효화)
+        persistent_cache = None
+        if cache_path:
+            persistent_cache = PersistentCache(cache_path, fingerprint=self._schema_fingerprint())
+        
+        # 요청 추적 및 메트릭 (JSON Lines 추적 파일, Prometheus 텍스트 파일/엔드포인트)
+        self.tracer = Tracer(trace_path=trace_path, metrics_path=metrics_path)
+        if metrics_port:
+            self.tracer.metrics.serve(int(metrics_port))
+        
+        # 임베딩 모델 (유사 질문 캐시, 하이브리드 테이블 검색에서 사용)
+        embedder = None
+        self.embedding_service = None
+        if use_semantic_cache or table_retriever == "hybrid":
+            from schema_embedder import SchemaEmbedder
+            if embedding_workers and int(embedding_workers) > 0:
+                # 동시 요청의 인코딩을 모아 별도 프로세스에서 배치 처리
+                from embedding_service import EmbeddingService
+                self.embedding_service = EmbeddingService(
+                    SchemaEmbedder.MODEL_NAME,
+                    workers=int(embedding_workers),
+                    batch_window_ms=float(embedding_batch_window_ms),
+                    metrics=self.tracer.metrics
+                )
+            embedder = SchemaEmbedder(self.json_loader, cache_dir=embedding_cache_dir,
+                                      embedding_service=self.embedding_service)
+            if snapshot:
+                snapshot.apply_embeddings(embedder)
+            # 모델 로드와 인덱스 구축은 백그라운드에서 진행 (준비 전에는 키워드 기반 검색만 사용)
+            # 스냅샷에 임베딩이 없으면 디스크에 저장된 벡터를 재사용하여 구축 (바뀐 설명만 인코딩)
+            embedder.start_warmup()
+        self.embedder = embedder
+        
+        # 유사 질문 캐시 초기화
+        semantic_cache = None
+        if use_semantic_cache:
+            from semantic_cache import SemanticCache
+            semantic_cache = SemanticCache(embedder)
+        
+        # 테이블 검색기 (hybrid: 키워드 + BM25 + 임베딩 검색 RRF 결합)
+        retriever = None
+        if table_retriever == "hybrid":
+            from hybrid_retriever import HybridRetriever
+            retriever = HybridRetriever(
+                self.json_loader, embedder,
+                budget_ms=float(retrieval_budget_ms) if retrieval_budget_ms else None
+            )
+        
+        # 범주형/이름 컬럼 값 색인 (명세서 값은 즉시, DB 값은 백그라운드에서 주기적으로 반영)
+        self.value_index = ValueIndex.from_sources(self.json_loader.metadata, value_aliases_path)
+        if value_refresh_interval is not None:
+            self.value_index.start_refresh(self.db_connector, interval=float(value_refresh_interval))
+        
         # 쿼리 생성기 초기화
         self.query_generator = QueryGenerator(
             db_connector=self.db_connector,
-            json_loader=self.json_loader
+            json_loader=self.json_loader,
+            semantic_cache=semantic_cache,
+            persistent_cache=persistent_cache,
+            backend=llm_backend,
+            keyword_matcher=snapshot.restore_keyword_matcher() if snapshot else None,
+            context_builder=snapshot.restore_context_builder(self.json_loader) if snapshot else None,
+            retriever=retriever,
+            value_index=self.value_index
         )
         
+        # 스냅샷이 없거나 해시가 다르면 전체 구성 결과로 다시 저장
+        self.snapshot_source_hash = source_hash
+        if snapshot_path and (snapshot is None or (db_hash and not schema_current)):
+            self._write_snapshot(source_hash, db_hash)
+            if embedder is not None:
+                # 설명 임베딩은 준비 스레드가 인덱스 구축을 마친 뒤 같은 잠금 안에서 다시 저장
+                embedder.on_ready(lambda: self._write_snapshot(
+                    self.snapshot_source_hash, self.schema_db_hash, embedder
+                ))
+        if snapshot:
+            snapshot.close()
+        
         # 쿼리 검증기 초기화
-        self.validator = QueryValidator(self.db_connector.inspector)
+        self.validator = QueryValidator(self.db_connector.inspector, schema_source=self.db_connector.get_full_schema)
+        
+        # 처리 중인 동일 질의 합치기
+        self._inflight = SingleFlight()
         
-        # 연결 풀 생성 (PyMySQL)
-        self.connection_pool = self._create_connection_pool(db_config)
+        # 실행 결과 상한 (서버 측 커서로 묶음 단위 수신, 상한 이후 행은 읽지 않음)
+        self.max_result_rows = int(max_result_rows) if max_result_rows else None
+        self.max_result_bytes = int(max_result_bytes) if max_result_bytes else None
+        self.result_batch_size = int(result_batch_size)
+        
+        # 쿼리 결과 캐시 (SQL 지문 + 데이터 버전, 새 경기가 들어오면 자동으로 다른 키 사용)
+        self.result_cache = None
+        if result_cache_bytes and int(result_cache_bytes) > 0:
+            self.result_cache = ResultCache(
+                DataVersionProbe(self.db_connector),
+                max_bytes=int(result_cache_bytes),
+                ttl=float(result_cache_ttl),
+                closed_version_ttl=float(closed_version_ttl)
+            )
+        
+        # 데이터 명세서/키워드 매핑 파일 변경 감시 (재시작 없이 증분 반영)
+        self.schema_reloader = None
+        if schema_watch_interval:
+            self.schema_reloader = SchemaReloader(self, interval=float(schema_watch_interval)).start()
+    
+    def status(self):
+        """구성 요소 준비 상태"""
+        return {
+            'semantic': self.embedder.status() if self.embedder else {'state': 'disabled', 'ready': False},
+            'schema_reloads': self.schema_reloader.reloads if self.schema_reloader else None,
+            'embedding_service': self.embedding_service.stats() if self.embedding_service else None,
+            'result_cache': self.result_cache.stats() if self.result_cache else None,
+            'value_index': {
+                'entries': self.value_index.entries,
+                'scanned_columns': len(self.value_index.scanned),
+                'refreshed_at': self.value_index.refreshed_at,
+            },
+        }
     
-    def _create_connection_pool(self, db_config):
-        """PyMySQL 연결 풀 생성"""
+    def _write_snapshot(self, source_hash, db_hash, embedder=None):
+        """현재 구성된 스키마 정보를 스냅샷으로 저장"""
         try:
-            # PyMySQL 직접 연결 (SQLAlchemy와 별도로 유지)
-            return pymysql.connect(
-                host=db_config['host'],
-                user=db_config['user'],
-                password=db_config['password'],
-                database=db_config['database'],
-                port=int(db_config['port']),
-                charset='utf8mb4',
-                cursorclass=DictCursor,
-                autocommit=True,  # 자동 커밋 활성화
-                connect_timeout=5
+            schema_info = self.db_connector.get_full_schema() if db_hash else None
+            write_snapshot(
+                self.snapshot_path,
+                self.json_loader,
+                self.query_generator.keyword_matcher,
+                self.query_generator.context_builder,
+                source_hash=source_hash,
+                schema_info=schema_info,
+                db_hash=db_hash,
+                embedder=embedder
             )
         except Exception as e:
-            print(f"연결 풀 생성 중 오류: {str(e)}")
-            return None
+            print(f"스냅샷 저장 중 오류: {str(e)}")
+    
+    def _schema_fingerprint(self):
+        """데이터 명세서와 실제 DB 스키마 지문"""
+        try:
+            schema_info = self.db_connector.get_full_schema()
+        except Exception as e:
+            print(f"스키마 조회 중 오류: {str(e)}")
+            schema_info = None
+        return compute_schema_fingerprint(self.json_path, schema_info)
     
-    def _get_connection(self):
-        """연결 풀에서 연결 가져오기"""
-        db_config = self.db_config
-        if not self.connection_pool or not self.connection_pool.open:
-            db_config = {
-                'host': db_config['host'],
-                'user': db_config['user'],
-                'password': db_config['password'],
-                'database': db_config['database'],
-                'port': int(db_config['port']),
-            }
-            self.connection_pool = self._create_connection_pool(db_config)
-        
-        return self.connection_pool
+    def process_query(self, natural_language_query, on_fragment=None):
+        """자연어 질의를 처리하고 결과 반환 (동일 질의 동시 요청은 한 번만 처리)"""
+        # on_fragment: 생성 중인 SQL 조각을 받는 함수 (실제로 생성하는 첫 요청에서만 호출, 나머지는 결과만 공유)
+        key = normalize_question(natural_language_query)
+        result = self._inflight.do(key, lambda: self._process_query(natural_language_query, on_fragment))
+        return dict(result, natural_language_query=natural_language_query)
     
-    def process_query(self, natural_language_query):
-        """자연어 질의를 처리하고 결과 반환"""
-        # SQL 쿼리 생성
-        sql_query = self.query_generator.generate_sql_query(natural_language_query)
-        
+    async def aprocess_query(self, natural_language_query):
+        """자연어 질의를 처리하고 결과 반환 (비동기)"""
+        key = normalize_question(natural_language_query)
+        result = await self._inflight.do_async(key, lambda: self._process_query(natural_language_query))
+        return dict(result, natural_language_query=natural_language_query)
+    
+    def process_batch(self, questions, max_workers=4, requests_per_minute=50, execute=True):
+        """여러 질의를 동시에 생성하고 완료되는 순서대로 검증/실행 결과 반환"""
+        rate_limiter = TokenBucket.per_minute(requests_per_minute) if requests_per_minute else None
+        generated = self.query_generator.generate_batch(
+            questions, max_workers=max_workers, rate_limiter=rate_limiter
+        )
+        for item in generated:
+            if item["error"] or not execute:
+                yield dict(item, execution_result=None, query_plan=None)
+                continue
+            result = self._execute_generated(item["natural_language_query"], item["generated_sql"])
+            result["index"] = item["index"]
+            yield result
+    
+    def _process_query(self, natural_language_query, on_fragment=None):
+        """SQL 생성, 검증, 실행 (단계별 소요 시간 기록)"""
+        with self.tracer.trace("process_query", question=natural_language_query) as root:
+            # SQL 쿼리 생성
+            with span("generate_sql"):
+                if on_fragment is None:
+                    sql_query = self.query_generator.generate_sql_query(natural_language_query)
+                    annotate(sql_chars=len(sql_query))
+                else:
+                    # 화면에 스트리밍하는 경우에도 같은 구간에서 첫 조각까지의 시간 기록
+                    start = time.perf_counter()
+                    first_fragment_ms = []
+                    
+                    def forward(fragment):
+                        if not first_fragment_ms:
+                            first_fragment_ms.append((time.perf_counter() - start) * 1000)
+                        on_fragment(fragment)
+                    
+                    sql_query = self.query_generator.generate_sql_query(natural_language_query, forward)
+                    annotate(sql_chars=len(sql_query), streamed=True,
+                             first_fragment_ms=first_fragment_ms[0] if first_fragment_ms else None)
+            result = self._execute_generated(natural_language_query, sql_query)
+            root.set(error=result["error"])
+        result["trace_id"] = root.trace_id
+        result["timings"] = root.timings()
+        return result
+    
+    def _execute_generated(self, natural_language_query, sql_query):
+        """생성된 SQL 검증 및 실행"""
         # 결과 및 쿼리 실행 정보 준비
         result = {
             "natural_language_query": natural_language_query,  # 자연어 질문
@@ -84,27 +266,60 @@ class TextToSQLApp:
         # 쿼리 검증
         try:
             # 쿼리 구문 및 테이블 검증
-            self.validator.validate_tables(sql_query)
+            with span("validate_tables"):
+                self.validator.validate_tables(sql_query)
+            
+            # 결과 캐시 확인 (같은 SQL, 같은 데이터 버전이면 실행 계획 분석/실행 생략)
+            cache_key, cache_ttl = None, None
+            if self.result_cache:
+                with span("result_cache") as current:
+                    cache_key, cache_ttl = self.result_cache.key(sql_query)
+                    cached = self.result_cache.get(cache_key) if cache_key else None
+                    if current:
+                        current.set(hit=cached is not None)
+                if cached is not None:
+                    annotate(result_cache='hit')
+                    result.update(cached)
+                    return result
             
             # 실행 계획 분석
-            try:
-                # SQLAlchemy로 실행 계획 분석
-                plan = self.db_connector.analyze_query(sql_query)
-                if plan:
-                    result["query_plan"] = [dict(row) for row in plan]
-            except:
-                # 실행 계획 분석 실패는 무시
-                pass
+            with span("explain") as current:
+                try:
+                    # SQLAlchemy로 실행 계획 분석
+                    plan = self.db_connector.analyze_query(sql_query, raise_on_error=True)
+                    if plan:
+                        result["query_plan"] = [dict(row._mapping) for row in plan]
+                except Exception as e:
+                    # 실행 계획 분석 실패는 실행을 막지 않고 기록만 남김
+                    result["query_plan_error"] = str(e)
+                    if current:
+                        current.set(error=str(e))
             
-            # 쿼리 실행
-            connection = self._get_connection()
-            if connection:
-                with connection.cursor() as cursor:
-                    cursor.execute(sql_query)
-                    result["execution_result"] = cursor.fetchall()
-                    result["rows_affected"] = cursor.rowcount
-            else:
-                result["error"] = "데이터베이스 연결을 확인할 수 없습니다."
+            # 쿼리 실행 (SQLAlchemy 풀에서 요청마다 별도 연결, 서버 측 커서로 행/바이트 상한까지만 수신)
+            with span("execute") as current:
+                status = {}
+                collected = collect_rows(
+                    self.db_connector.stream_query(sql_query, self.result_batch_size, status),
+                    max_rows=self.max_result_rows,
+                    max_bytes=self.max_result_bytes
+                )
+                rows_affected = status.get('rows_affected')
+                result["execution_result"] = collected["rows"]
+                result["rows_affected"] = collected["row_count"] if rows_affected is None else rows_affected
+                result["result_bytes"] = collected["bytes"]
+                result["truncated"] = collected["truncated"]
+                result["truncated_by"] = collected["truncated_by"]
+                if current:
+                    current.set(rows_returned=collected["row_count"], result_bytes=collected["bytes"],
+                                truncated=collected["truncated"])
+            
+            if cache_key and result["error"] is None:
+                self.result_cache.set(cache_key, {
+                    field: result.get(field)
+                    for field in ("execution_result", "rows_affected", "result_bytes", "truncated",
+                                  "truncated_by", "query_plan", "query_plan_error")
+                    if field in result
+                }, cache_ttl)
                 
         except ValueError as e:
             result["error"] = str(e)
@@ -114,8 +329,15 @@ class TextToSQLApp:
     
     def close(self):
         """리소스 정리 및 데이터베이스 연결 종료"""
-        if hasattr(self, 'connection_pool') and self.connection_pool and self.connection_pool.open:
-            self.connection_pool.close()
+        if self.schema_reloader:
+            self.schema_reloader.stop()
+        self.value_index.stop()
+        self.query_generator.close()
+        self.tracer.metrics.close()
+        if self.embedding_service:
+            self.embedding_service.close()
+        if hasattr(self, 'db_connector'):
+            self.db_connector.engine.dispose()
             print("데이터베이스 연결이 종료되었습니다.")
 
 if __name__ == "__main__":
@@ -133,7 +355,24 @@ if __name__ == "__main__":
         "port": os.getenv("DB_PORT")
     }
     
-    app = TextToSQLApp(db_config)
+    app = TextToSQLApp(
+        db_config,
+        use_semantic_cache=os.getenv("USE_SEMANTIC_CACHE", "false").lower() == "true",
+        trace_path=os.getenv("TRACE_PATH"),
+        metrics_path=os.getenv("METRICS_PATH"),
+        metrics_port=os.getenv("METRICS_PORT"),
+        schema_watch_interval=os.getenv("SCHEMA_WATCH_INTERVAL"),
+        table_retriever=os.getenv("TABLE_RETRIEVER", "keyword"),
+        retrieval_budget_ms=os.getenv("RETRIEVAL_BUDGET_MS"),
+        embedding_workers=os.getenv("EMBEDDING_WORKERS"),
+        embedding_batch_window_ms=os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"),
+        value_refresh_interval=os.getenv("VALUE_INDEX_REFRESH_INTERVAL", "3600"),
+        parallel_schema_reflection=os.getenv("SCHEMA_REFLECTION_PARALLEL", "false").lower() == "true",
+        max_result_rows=os.getenv("MAX_RESULT_ROWS", "10000"),
+        max_result_bytes=os.getenv("MAX_RESULT_BYTES", str(16 * 1024 * 1024)),
+        result_cache_bytes=os.getenv("RESULT_CACHE_BYTES", str(64 * 1024 * 1024)),
+        result_cache_ttl=os.getenv("RESULT_CACHE_TTL", "600")
+    )
     
     try:
         while True:
@@ -158,5 +397,7 @@ if __name__ == "__main__":
                     for row in result["execution_result"]:
                         print(row)
                     print(f"\n총 {result.get('rows_affected', 0)}개 행이 반환되었습니다.")
+                    if result.get("truncated"):
+                        print(f"결과가 상한({'행 수' if result['truncated_by'] == 'rows' else '크기'})을 넘어 일부만 표시합니다.")
     finally:
         app.close()
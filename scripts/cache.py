@@ -0,0 +1,240 @@
+import sys
+import asyncio
+import time
+import threading
+import functools
+from collections import OrderedDict
+from concurrent.futures import Future
+
+def approximate_size(obj, _seen=None):
+    """객체의 대략적인 메모리 크기(바이트)"""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approximate_size(k, _seen) + approximate_size(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approximate_size(item, _seen) for item in obj)
+    return size
+
+class SingleFlight:
+    """같은 키의 동시 계산을 하나로 합치는 도우미"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> Future
+
+    def claim(self, key):
+        """(future, is_leader) 반환 - leader만 실제 계산 수행"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def release(self, key, future, result=None, error=None):
+        """계산 결과를 대기 중인 호출자에게 전달"""
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _run(self, key, future, func):
+        """leader 호출자의 실제 계산"""
+        try:
+            result = func()
+        except BaseException as e:
+            self.release(key, future, error=e)
+            return
+        self.release(key, future, result=result)
+
+    def do(self, key, func):
+        """키별로 한 번만 func 실행 후 결과 공유 (스레드 호출자)"""
+        future, is_leader = self.claim(key)
+        if is_leader:
+            self._run(key, future, func)
+        return future.result()
+
+    async def do_async(self, key, func):
+        """키별로 한 번만 func 실행 후 결과 공유 (asyncio 호출자)"""
+        future, is_leader = self.claim(key)
+        if is_leader:
+            # 호출자가 취소되더라도 대기 중인 다른 호출자를 위해 계산은 끝까지 수행
+            loop = asyncio.get_running_loop()
+            loop.run_in_executor(None, self._run, key, future, func)
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+class LRUCache:
+    """LRU + TTL 기반 스레드 안전 캐시"""
+    _MISSING = object()
+
+    def __init__(self, max_entries=128, ttl=3600, max_bytes=None, sizeof=approximate_size):
+        self.max_entries = max_entries  # 최대 항목 수
+        self.ttl = ttl                  # 기본 만료 시간(초), None이면 만료 없음
+        self.max_bytes = max_bytes      # 최대 크기(바이트), None이면 제한 없음
+        self.sizeof = sizeof
+        self._data = OrderedDict()      # key -> (만료 시각, 크기, 값)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _pop(self, key):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def get(self, key, default=None):
+        """값 조회 (만료 시 삭제)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, _, value = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                self._pop(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=_MISSING):
+        """값 저장 후 한도를 넘으면 오래된 항목부터 제거"""
+        ttl = self.ttl if ttl is self._MISSING else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        size = self.sizeof(value) if self.max_bytes else 0
+
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            if self.max_bytes and size > self.max_bytes:
+                return
+            self._data[key] = (expires_at, size, value)
+            self._bytes += size
+            while len(self._data) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+                oldest = next(iter(self._data))
+                self._pop(oldest)
+                self.evictions += 1
+
+    def get_or_compute(self, key, func, ttl=_MISSING):
+        """캐시 미스 시 func 실행 (같은 키의 동시 호출은 한 번만 실행)"""
+        value = self.get(key, self._MISSING)
+        if value is not self._MISSING:
+            return value
+
+        def compute():
+            # 대기 중 다른 호출자가 채웠을 수 있으므로 재확인
+            with self._lock:
+                entry = self._data.get(key)
+                if entry is not None and (entry[0] is None or time.monotonic() < entry[0]):
+                    return entry[2]
+            result = func()
+            self.set(key, result, ttl)
+            return result
+
+        return self._flight.do(key, compute)
+
+    def invalidate(self, key):
+        """특정 항목 삭제"""
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+                return True
+            return False
+
+    def invalidate_where(self, predicate):
+        """조건(key, value)에 맞는 항목 삭제"""
+        with self._lock:
+            keys = [k for k, (_, _, v) in self._data.items() if predicate(k, v)]
+            for key in keys:
+                self._pop(key)
+            return len(keys)
+
+    def clear(self):
+        """전체 삭제"""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    @property
+    def lock(self):
+        """캐시 갱신과 함께 다른 통계를 원자적으로 갱신할 때 사용하는 잠금 (재진입 가능)"""
+        return self._lock
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, self._MISSING) is not self._MISSING
+
+    def stats(self):
+        """적중/미스/제거 통계"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'entries': len(self._data),
+                'bytes': self._bytes
+            }
+
+_method_cache_lock = threading.Lock()
+
+def method_cache(instance, method_name):
+    """인스턴스별 메서드 캐시 조회 (무효화, 통계 확인용)"""
+    return instance.__dict__.get('_method_caches', {}).get(method_name)
+
+def _instance_cache(instance, method_name, options):
+    """인스턴스별 메서드 캐시 (없으면 생성)"""
+    caches = instance.__dict__.get('_method_caches')
+    cache = caches.get(method_name) if caches else None
+    if cache is None:
+        with _method_cache_lock:
+            caches = instance.__dict__.setdefault('_method_caches', {})
+            cache = caches.get(method_name)
+            if cache is None:
+                cache = LRUCache(**options)
+                caches[method_name] = cache
+    return cache
+
+def _method_key(args, kwargs):
+    """self를 제외한 인자로 캐시 키 생성"""
+    key = (args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        key = repr(key)
+    return key
+
+def prime_method_cache(instance, method_name, value, *args, **kwargs):
+    """메서드 캐시에 미리 계산된 결과 등록 (스냅샷 등에서 복원한 값)"""
+    options = getattr(type(instance), method_name)._cache_options
+    cache = _instance_cache(instance, method_name, options)
+    cache.set(_method_key(args, kwargs), value)
+
+def cached_method(max_entries=128, ttl=3600, max_bytes=None):
+    '''인스턴스별 LRU 캐시를 사용하는 메서드 데코레이터'''
+    options = {'max_entries': max_entries, 'ttl': ttl, 'max_bytes': max_bytes}
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            cache = _instance_cache(self, func.__name__, options)
+            return cache.get_or_compute(_method_key(args, kwargs), lambda: func(self, *args, **kwargs))
+        wrapper._cache_options = options
+        return wrapper
+    return decorator
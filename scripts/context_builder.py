@@ -0,0 +1,223 @@
+from utils import estimate_tokens
+from value_index import sql_literal
+
+class SchemaContextBuilder:
+    """토큰 예산 기반 스키마 컨텍스트 구성기 (프롬프트 조각 사전 계산)"""
+    PK_WEIGHT = 3.0
+    FK_WEIGHT = 2.5
+    KEYWORD_WEIGHT = 2.0
+
+    def __init__(self, json_loader, max_line_length=100):
+        self.json_loader = json_loader
+        self.max_line_length = max_line_length
+        self._precompute()
+
+    def _line(self, text):
+        """프롬프트 한 줄과 토큰 수"""
+        return (text, estimate_tokens(text))
+
+    def _shorten(self, text):
+        """너무 긴 설명 축약"""
+        if len(text) <= self.max_line_length:
+            return text
+        if ':' in text:
+            head, tail = text.split(':', 1)
+            return f"{head}: {tail[:40]}..." if len(tail) > 40 else text
+        return text[:80] + '...'
+
+    def _precompute(self):
+        """테이블/컬럼별 프롬프트 조각 사전 계산"""
+        metadata = self.json_loader.metadata
+        self.table_headers = {}
+        self.columns = {}
+        for table, details in metadata.items():
+            self._precompute_table(table, details)
+        self._precompute_table_list()
+
+        self.section_titles = {
+            'pk': self._line("### 기본 키(PK):"),
+            'fk': self._line("### 외래 키(FK):"),
+            'important': self._line("### 중요 컬럼:"),
+            'other': self._line("### 기타 컬럼:"),
+        }
+        self.join_title = self._line("## 조인 경로:")
+        self.value_title = self._line("## 질문에 언급된 값:")
+        # 생략 컬럼 요약 줄에 예약하는 토큰 수
+        self.summary_reserve = estimate_tokens("### 생략된 컬럼: 000개")
+
+    def _precompute_table_list(self):
+        self.table_list_lines = [
+            self._line("## 사용 가능한 전체 테이블 목록:"),
+            self._line(f"테이블명: {', '.join(self.json_loader.metadata.keys())}"),
+        ]
+
+    def _precompute_table(self, table, details):
+        """테이블 헤더와 컬럼 조각"""
+        self.table_headers[table] = self._line(f"## {table} 테이블: {details.get('description', '')}")
+        fragments = []
+        for col, info in details['columns'].items():
+            col_desc = f"{col}: {info['description']}"
+            if info.get('note'):
+                col_desc += f" ({info['note']})"
+            if info.get('is_primary'):
+                kind, base = 'pk', self.PK_WEIGHT
+            elif info.get('is_foreign'):
+                kind, base = 'fk', self.FK_WEIGHT
+            else:
+                kind, base = 'other', 0.0
+            text, tokens = self._line(self._shorten(f" - {col_desc}"))
+            fragments.append({
+                'name': col,
+                'kind': kind,
+                'base_score': base,
+                'search_text': f"{col} {info['description']}".lower(),
+                'text': text,
+                'tokens': tokens
+            })
+        self.columns[table] = fragments
+
+    def updated(self, json_loader, tables):
+        """지정한 테이블의 조각만 다시 계산한 새 구성기 (기존 구성기는 그대로 유지)"""
+        builder = SchemaContextBuilder.__new__(SchemaContextBuilder)
+        builder.__dict__.update(self.__dict__)
+        builder.json_loader = json_loader
+        builder.table_headers = dict(self.table_headers)
+        builder.columns = dict(self.columns)
+        for table in tables:
+            if table in json_loader.metadata:
+                builder._precompute_table(table, json_loader.metadata[table])
+            else:
+                builder.table_headers.pop(table, None)
+                builder.columns.pop(table, None)
+        builder._precompute_table_list()
+        return builder
+
+    def _score(self, fragment, terms):
+        """키워드 관련도 + PK/FK 중요도"""
+        matches = sum(1 for term in terms if term in fragment['search_text'])
+        return fragment['base_score'] + self.KEYWORD_WEIGHT * matches
+
+    def build(self, query, tables, keywords=None, joins=None, token_budget=2000, values=None):
+        """토큰 예산 안에서 스키마 컨텍스트 구성 (values: 값 색인이 찾은 컬럼 값)"""
+        terms = {t.lower() for t in query.split() if len(t) > 1}
+        terms.update(kw.lower() for kw in (keywords or ()) if len(kw) > 1)
+
+        used = sum(tokens for _, tokens in self.table_list_lines)
+        plan = []
+        omitted_tables = []
+
+        # 1단계: 관련도 순으로 테이블 헤더와 PK/FK 추가
+        for table in tables:
+            if table not in self.columns:
+                continue
+            scored = sorted(
+                ((self._score(f, terms), f) for f in self.columns[table]),
+                key=lambda x: x[0], reverse=True
+            )
+            required = [f for score, f in scored if f['kind'] != 'other']
+            cost = self.table_headers[table][1] + self.summary_reserve
+            cost += sum(f['tokens'] for f in required)
+            cost += sum(self.section_titles[k][1] for k in {f['kind'] for f in required})
+            if used + cost > token_budget:
+                omitted_tables.append(table)
+                continue
+            used += cost
+            plan.append({'table': table, 'selected': list(required), 'candidates': scored, 'scores': {}})
+
+        # 포함된 테이블 사이의 조인 조건 (조인 계획 순서 유지)
+        included = {entry['table'] for entry in plan}
+        join_lines = []
+        for join in joins or ():
+            if join['left'] in included and join['right'] in included:
+                text = f" - {join['condition']}"
+                if join.get('alternatives'):
+                    text += f" (또는 {' / '.join(join['alternatives'])})"
+                line = self._line(text)
+                title_cost = 0 if join_lines else self.join_title[1]
+                if used + title_cost + line[1] > token_budget:
+                    break
+                used += title_cost + line[1]
+                join_lines.append(line[0])
+
+        # 포함된 테이블 컬럼의 실제 값 (예: '쾌청' -> weather_main = 10002)
+        value_lines = []
+        seen_values = set()
+        for value in values or ():
+            key = (value['table'], value['column'], value['value'])
+            if value['table'] not in included or key in seen_values:
+                continue
+            seen_values.add(key)
+            line = self._line(f" - '{value['term']}': {value['table']}.{value['column']} = {sql_literal(value['value'])}")
+            title_cost = 0 if value_lines else self.value_title[1]
+            if used + title_cost + line[1] > token_budget:
+                break
+            used += title_cost + line[1]
+            value_lines.append(line[0])
+
+        # 2단계: 남은 예산으로 관련도 높은 일반 컬럼 추가
+        candidates = [
+            (score, entry, f)
+            for entry in plan
+            for score, f in entry['candidates']
+            if f['kind'] == 'other'
+        ]
+        candidates.sort(key=lambda x: x[0], reverse=True)
+        opened_sections = set()
+        for score, entry, fragment in candidates:
+            section = 'important' if score > 0 else 'other'
+            cost = fragment['tokens']
+            if (entry['table'], section) not in opened_sections:
+                cost += self.section_titles[section][1]
+            if used + cost > token_budget:
+                continue
+            used += cost
+            opened_sections.add((entry['table'], section))
+            entry['selected'].append(fragment)
+            entry['scores'][fragment['name']] = score
+
+        # 조립 (기본 키 → 외래 키 → 중요 컬럼 → 기타 컬럼)
+        lines = [text for text, _ in self.table_list_lines] + [""]
+        omitted_columns = 0
+        for entry in plan:
+            table = entry['table']
+            lines.append(self.table_headers[table][0])
+            scores = entry['scores']
+            groups = {'pk': [], 'fk': [], 'important': [], 'other': []}
+            for fragment in entry['selected']:
+                if fragment['kind'] != 'other':
+                    groups[fragment['kind']].append(fragment['text'])
+                elif scores.get(fragment['name'], 0) > 0:
+                    groups['important'].append(fragment['text'])
+                else:
+                    groups['other'].append(fragment['text'])
+            for section in ('pk', 'fk', 'important', 'other'):
+                if groups[section]:
+                    lines.append(self.section_titles[section][0])
+                    lines.extend(groups[section])
+            skipped = len(self.columns[table]) - len(entry['selected'])
+            used -= self.summary_reserve
+            if skipped:
+                summary = self._line(f"### 생략된 컬럼: {skipped}개")
+                lines.append(summary[0])
+                used += summary[1]
+                omitted_columns += skipped
+            lines.append("")
+        if join_lines:
+            lines.append(self.join_title[0])
+            lines.extend(join_lines)
+        if value_lines:
+            if join_lines:
+                lines.append("")
+            lines.append(self.value_title[0])
+            lines.extend(value_lines)
+
+        return {
+            'text': "\n".join(lines),
+            'tokens': used,
+            'token_budget': token_budget,
+            'tables': [entry['table'] for entry in plan],
+            'omitted_tables': omitted_tables,
+            'omitted_columns': omitted_columns,
+            'joins': join_lines,
+            'values': value_lines
+        }
@@ -1,10 +1,109 @@
 from sqlalchemy import create_engine, MetaData, inspect, text
 from sqlalchemy.pool import QueuePool
-from utils import cache_result
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from cache import cached_method, method_cache, prime_method_cache
+from join_planner import JoinPlanner
+from result_stream import collect_rows
 from collections import defaultdict
 
+# 전체 스키마 일괄 조회 (테이블 수와 관계없이 4회 조회)
+REFLECTION_QUERIES = {
+    'tables': (
+        "SELECT TABLE_NAME FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE' "
+        "ORDER BY TABLE_NAME"
+    ),
+    'columns': (
+        "SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_DEFAULT, EXTRA, COLUMN_COMMENT "
+        "FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() "
+        "ORDER BY TABLE_NAME, ORDINAL_POSITION"
+    ),
+    'keys': (
+        "SELECT k.TABLE_NAME, k.CONSTRAINT_NAME, k.COLUMN_NAME, k.REFERENCED_TABLE_SCHEMA, "
+        "k.REFERENCED_TABLE_NAME, k.REFERENCED_COLUMN_NAME, r.UPDATE_RULE, r.DELETE_RULE "
+        "FROM information_schema.KEY_COLUMN_USAGE k "
+        "LEFT JOIN information_schema.REFERENTIAL_CONSTRAINTS r "
+        "ON r.CONSTRAINT_SCHEMA = k.CONSTRAINT_SCHEMA AND r.CONSTRAINT_NAME = k.CONSTRAINT_NAME "
+        "AND r.TABLE_NAME = k.TABLE_NAME "
+        "WHERE k.TABLE_SCHEMA = DATABASE() "
+        "AND (k.CONSTRAINT_NAME = 'PRIMARY' OR k.REFERENCED_TABLE_NAME IS NOT NULL) "
+        "ORDER BY k.TABLE_NAME, k.CONSTRAINT_NAME, k.ORDINAL_POSITION"
+    ),
+    'indexes': (
+        "SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME, NON_UNIQUE "
+        "FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND INDEX_NAME <> 'PRIMARY' "
+        "ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX"
+    ),
+}
+
+def assemble_schema(rows, database_name=None):
+    """information_schema 조회 결과를 inspector와 같은 형식의 테이블별 정보로 변환"""
+    schema_info = {}
+    for (table,) in rows['tables']:
+        schema_info[table] = {
+            "columns": [],
+            "foreign_keys": [],
+            "primary_keys": {"constrained_columns": [], "name": None},
+            "indices": [],
+            "full_name": f"{database_name}.{table}",
+        }
+
+    for table, column, column_type, nullable, default, extra, comment in rows['columns']:
+        if table not in schema_info:
+            continue  # 뷰 등
+        schema_info[table]["columns"].append({
+            "name": column,
+            "type": str(column_type).upper(),
+            "nullable": nullable == 'YES',
+            "default": default,
+            "autoincrement": 'auto_increment' in (extra or '').lower(),
+            "comment": comment or None,
+        })
+
+    foreign_keys = {}
+    for table, name, column, ref_schema, ref_table, ref_column, update_rule, delete_rule in rows['keys']:
+        if table not in schema_info:
+            continue
+        if name == 'PRIMARY':
+            primary_keys = schema_info[table]["primary_keys"]
+            primary_keys["constrained_columns"].append(column)
+            primary_keys["name"] = name
+            continue
+        fk = foreign_keys.get((table, name))
+        if fk is None:
+            options = {}
+            # 기본 동작(RESTRICT/NO ACTION)이 아닌 경우만 기록 (inspector와 동일)
+            if update_rule and update_rule not in ('RESTRICT', 'NO ACTION'):
+                options['onupdate'] = update_rule
+            if delete_rule and delete_rule not in ('RESTRICT', 'NO ACTION'):
+                options['ondelete'] = delete_rule
+            fk = foreign_keys[(table, name)] = {
+                "name": name,
+                "constrained_columns": [],
+                "referred_schema": ref_schema if ref_schema != database_name else None,
+                "referred_table": ref_table,
+                "referred_columns": [],
+                "options": options,
+            }
+            schema_info[table]["foreign_keys"].append(fk)
+        fk["constrained_columns"].append(column)
+        fk["referred_columns"].append(ref_column)
+
+    indices = {}
+    for table, name, column, non_unique in rows['indexes']:
+        if table not in schema_info:
+            continue
+        index = indices.get((table, name))
+        if index is None:
+            index = indices[(table, name)] = {"name": name, "column_names": [], "unique": not int(non_unique)}
+            schema_info[table]["indices"].append(index)
+        index["column_names"].append(column)
+    return schema_info
+
 class DatabaseConnector:
-    def __init__(self, connection_string, json_loader, pool_size=5):
+    def __init__(self, connection_string, json_loader, pool_size=5, parallel_reflection=False):
         # 연결 풀링 설정으로 DB 연결
         self.engine = create_engine(
             connection_string, 
@@ -18,15 +117,16 @@ class DatabaseConnector:
         self.metadata = MetaData()
         self.inspector = inspect(self.engine)
         self.compressor = None  # 스키마 압축
-        self._schema_cache = {}  # 스키마 캐싱
         self._relation_graph = None  # 테이블 관계 그래프
+        self._join_planner = None  # 조인 경로 계획기
+        self.parallel_reflection = parallel_reflection  # 스키마 일괄 조회를 연결 풀의 여러 연결로 동시 실행
         
-    @cache_result(expires_after=3600)
+    @cached_method(max_entries=256, ttl=3600)
     def get_all_tables(self):
         """데이터베이스의 모든 테이블 이름 조회"""
         return self.inspector.get_table_names()
     
-    @cache_result(expires_after=3600)
+    @cached_method(max_entries=256, ttl=3600)
     def get_table_details(self, table_name):
         """특정 테이블의 컬럼 정보 조회"""
         columns = self.inspector.get_columns(table_name)
@@ -41,12 +141,44 @@ class DatabaseConnector:
             "indices": indices 
         }
     
-    @cache_result(expires_after=3600)
+    def reflect_schema(self, parallel=None):
+        """information_schema 일괄 조회로 전체 스키마 수집 (테이블별 inspector 조회 대체)"""
+        parallel = self.parallel_reflection if parallel is None else parallel
+
+        def fetch(name, connection=None):
+            if connection is not None:
+                return connection.execute(text(REFLECTION_QUERIES[name])).fetchall()
+            with self.engine.connect() as connection:
+                return connection.execute(text(REFLECTION_QUERIES[name])).fetchall()
+
+        if parallel:
+            # 조회마다 연결 풀의 다른 연결 사용
+            with ThreadPoolExecutor(max_workers=len(REFLECTION_QUERIES), thread_name_prefix="reflect") as executor:
+                futures = {name: executor.submit(fetch, name) for name in REFLECTION_QUERIES}
+                rows = {name: future.result() for name, future in futures.items()}
+        else:
+            with self.engine.connect() as connection:
+                rows = {name: fetch(name, connection) for name in REFLECTION_QUERIES}
+        return assemble_schema(rows, self.engine.url.database)
+
+    @cached_method(max_entries=256, ttl=3600)
     def get_full_schema(self):
         """전체 데이터베이스 스키마 정보를 수집하여 반환"""
-        if self._schema_cache:
-            return self._schema_cache
-            
+        try:
+            schema_info = self.reflect_schema()
+        except Exception as e:
+            # information_schema를 읽을 수 없으면 테이블별 inspector 조회
+            print(f"스키마 일괄 조회 중 오류: {str(e)}")
+            return self._inspect_full_schema()
+
+        # 테이블 목록/테이블별 조회도 같은 결과 사용
+        prime_method_cache(self, 'get_all_tables', list(schema_info))
+        for table, details in schema_info.items():
+            prime_method_cache(self, 'get_table_details', details, table)
+        return schema_info
+
+    def _inspect_full_schema(self):
+        """테이블별 inspector 조회로 전체 스키마 수집"""
         schema_info = {}
         database_name = self.engine.url.database  # 데이터베이스 이름 추출
         tables = self.get_all_tables()
@@ -56,9 +188,64 @@ class DatabaseConnector:
             details['full_name'] = f"{database_name}.{table}" # 정규화 테이블 이름
             schema_info[table] = details
             
-        self._schema_cache = schema_info
         return schema_info
     
+    def invalidate_schema_cache(self, table_name=None):
+        """스키마 캐시 무효화 (table_name 지정 시 해당 테이블만)"""
+        table_cache = method_cache(self, 'get_table_details')
+        if table_name and table_cache:
+            table_cache.invalidate(((table_name,), ()))
+        elif table_cache:
+            table_cache.clear()
+        for name in ('get_all_tables', 'get_full_schema'):
+            cache = method_cache(self, name)
+            if cache:
+                cache.clear()
+        self._relation_graph = None
+        self._join_planner = None
+    
+    def preload_schema(self, schema_info):
+        """스냅샷 등에서 복원한 스키마 정보를 캐시에 등록 (inspector 반영 생략)"""
+        prime_method_cache(self, 'get_all_tables', list(schema_info))
+        for table, details in schema_info.items():
+            prime_method_cache(self, 'get_table_details', details, table)
+        prime_method_cache(self, 'get_full_schema', schema_info)
+        self._relation_graph = None
+        self._join_planner = None
+    
+    def schema_probe_hash(self):
+        """information_schema 단일 조회로 실제 스키마 지문 계산 (실패 시 None)"""
+        try:
+            with self.engine.connect() as connection:
+                columns = connection.execute(text(
+                    "SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY "
+                    "FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() "
+                    "ORDER BY TABLE_NAME, ORDINAL_POSITION"
+                )).fetchall()
+                references = connection.execute(text(
+                    "SELECT TABLE_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME "
+                    "FROM information_schema.KEY_COLUMN_USAGE WHERE TABLE_SCHEMA = DATABASE() "
+                    "AND REFERENCED_TABLE_NAME IS NOT NULL "
+                    "ORDER BY TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION"
+                )).fetchall()
+        except Exception as e:
+            print(f"스키마 지문 조회 중 오류: {str(e)}")
+            return None
+        digest = hashlib.sha256()
+        for row in list(columns) + list(references):
+            digest.update("|".join(str(value) for value in row).encode())
+            digest.update(b"\n")
+        return digest.hexdigest()
+    
+    def cache_stats(self):
+        """스키마 캐시 적중/미스/제거 통계"""
+        stats = {}
+        for name in ('get_all_tables', 'get_table_details', 'get_full_schema'):
+            cache = method_cache(self, name)
+            if cache:
+                stats[name] = cache.stats()
+        return stats
+    
     def build_relation_graph(self):
         """테이블 간 관계 그래프"""
         if self._relation_graph:
@@ -84,36 +271,40 @@ class DatabaseConnector:
         self._relation_graph = graph
         return graph
     
+    def set_json_loader(self, json_loader, join_planner=None):
+        """데이터 명세서 재적재 결과로 교체 (관계 그래프와 조인 계획은 새로 구성)"""
+        self.json_loader = json_loader
+        self._relation_graph = None
+        self._join_planner = join_planner
+    
+    def get_join_planner(self):
+        """DB 외래 키와 데이터 명세서 관계를 병합한 조인 경로 계획기"""
+        if self._join_planner:
+            return self._join_planner
+        try:
+            schema_info = self.get_full_schema()
+        except Exception as e:
+            print(f"스키마 조회 중 오류: {str(e)}")
+            schema_info = None
+        self._join_planner = JoinPlanner.from_sources(
+            self.json_loader.metadata,
+            schema_info=schema_info,
+            relation_graph=self.json_loader.relation_graph
+        )
+        return self._join_planner
+    
     def get_compressed_schema(self, query_keywords):
         """한국어 키워드 기반 스키마 필터링"""
-        # 1단계: 직접 매칭 테이블 검색
-        direct_tables = [
-            table for table in self.get_all_tables()
-            if any(kw in self.json_loader.metadata[table]['description']
-                for kw in query_keywords)
-        ]
-        
-        # 2단계: 컬럼 설명 기반 확장 검색
-        column_based_tables = []
-        for table, details in self.json_loader.metadata.items():
-            if any(any(kw in col_info['description'] or kw in col_info.get('note', '')
-                    for col_info in details['columns'].values())
-                for kw in query_keywords):
-                column_based_tables.append(table)
+        # 1~2단계: 테이블 설명 및 컬럼 설명 매칭 (역색인 조회)
+        related_tables = set(self.json_loader.schema_index.search(
+            query_keywords, fields=('description',)
+        ))
         
-        # 3단계: 테이블 관계 기반 확장
-        related_tables = set(direct_tables + column_based_tables)
+        # 3단계: 매칭된 테이블을 잇는 최소 조인 경로의 테이블만 추가
         if related_tables:
-            relation_graph = self.build_relation_graph()
-            
-            # 직접 관련된 테이블과 연관된 이웃 테이블들도 추가
-            neighbors = set()
-            for table in related_tables:
-                if table in relation_graph:
-                    neighbors.update(relation_graph[table])
-            related_tables.update(neighbors)
+            return self.get_join_planner().plan(sorted(related_tables))['tables']
         
-        return list(related_tables)
+        return []
     
     def schema_to_prompt_format(self, filtered_tables=None):
         """Perplexity API에 전달할 형식으로 스키마 정보 변환"""
@@ -166,24 +357,50 @@ class DatabaseConnector:
         
         return "\n\n".join(formatted_schema)
     
-    def execute_query(self, sql_query, max_rows=100):
-        """SQL 쿼리 실행 및 결과 반환"""
+    def stream_query(self, sql_query, batch_size=500, status=None):
+        """풀에서 받은 연결의 서버 측 커서로 실행하여 결과를 dict 행 묶음 단위로 반환 (결과 크기와 관계없이 메모리 일정)"""
+        with self.engine.connect() as connection:
+            # 생성된 쓰기 구문도 즉시 반영되도록 자동 커밋 (풀 반환 시 격리 수준 복원)
+            connection = connection.execution_options(
+                stream_results=True, max_row_buffer=batch_size, isolation_level="AUTOCOMMIT"
+            )
+            result = connection.execute(text(sql_query))
+            if status is not None:
+                # 결과 집합이 없는 구문은 영향받은 행 수만 기록
+                status['rows_affected'] = None if result.returns_rows else result.rowcount
+            if not result.returns_rows:
+                return
+            complete = False
+            try:
+                for batch in result.mappings().partitions(batch_size):
+                    yield [dict(row) for row in batch]
+                complete = True
+            finally:
+                if not complete:
+                    # 중간에 멈춘 경우 남은 결과를 읽지 않고 연결 폐기
+                    connection.invalidate()
+
+    def execute_query(self, sql_query, max_rows=100, max_bytes=None):
+        """SQL 쿼리 실행 및 결과 반환 (상한까지만 수신, has_more는 실제 남은 행 기준)"""
         try:
             with self.engine.connect() as connection:
-                result = connection.execute(text(sql_query))
-                rows = result.fetchmany(max_rows)
+                result = connection.execution_options(stream_results=True).execute(text(sql_query))
                 columns = result.keys()
+                collected = collect_rows(result.partitions(min(max_rows or 500, 500)), max_rows, max_bytes)
+                if collected['truncated']:
+                    connection.invalidate()
                 
                 return {
                     'columns': columns,
-                    'rows': rows,
-                    'row_count': len(rows),
-                    'has_more': result.rowcount > len(rows) if result.rowcount >= 0 else False
+                    'rows': collected['rows'],
+                    'row_count': collected['row_count'],
+                    'has_more': collected['truncated'],
+                    'truncated_by': collected['truncated_by']
                 }
         except Exception as e:
             raise Exception(f"쿼리 실행 오류: {str(e)}")
             
-    def analyze_query(self, sql_query):
+    def analyze_query(self, sql_query, raise_on_error=False):
         """SQL 쿼리 분석 (EXPLAIN)"""
         try:
             with self.engine.connect() as connection:
@@ -191,4 +408,6 @@ class DatabaseConnector:
                 return result.fetchall()
         # 분석할 수 없는 쿼리인 경우
         except Exception as e:
+            if raise_on_error:
+                raise
             return None  
\ No newline at end of file
@@ -0,0 +1,217 @@
+import os
+import time
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+import numpy as np
+
+# 작업 프로세스별 임베딩 모델 (초기화 시 1회 로드)
+_model = None
+
+def _init_worker(model_name, threads):
+    """작업 프로세스 초기화 (프로세스당 연산 스레드 수 제한 후 모델 로드)"""
+    global _model
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    from sentence_transformers import SentenceTransformer
+    _model = SentenceTransformer(model_name, device='cpu')
+
+def _encode(texts):
+    """정규화된 임베딩 (한 번의 배치 순전파)"""
+    embeddings = _model.encode(texts, convert_to_numpy=True, normalize_embeddings=True, batch_size=len(texts))
+    return embeddings.astype('float32')
+
+def _dimension():
+    return _model.get_sentence_embedding_dimension()
+
+class EmbeddingService:
+    """동시 인코딩 요청을 짧은 시간 모아 작업 프로세스에서 한 번에 인코딩하는 마이크로 배치 서비스"""
+    BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+    WAIT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+    def __init__(self, model_name, workers=None, batch_window_ms=5, max_batch=64, metrics=None,
+                 mp_context="spawn"):
+        self.model_name = model_name
+        self.workers = int(workers or max(1, min(4, (os.cpu_count() or 2) // 2)))
+        self.batch_window = float(batch_window_ms) / 1000  # 첫 요청 이후 추가 요청을 기다리는 시간
+        self.max_batch = max_batch
+        self.metrics = metrics                              # MetricsRegistry (없으면 stats()로만 확인)
+        self.dimension = None
+        self._context = multiprocessing.get_context(mp_context)
+        self._queue = queue.Queue()                         # (텍스트, Future, 요청 시각)
+        self._slots = threading.Semaphore(self.workers)     # 진행 중 배치 수 제한 (작업 프로세스 수)
+        self._executor = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        self.error = None                                   # 시작 실패 원인 (실패 상태)
+        self._stats = {'requests': 0, 'batches': 0, 'batched_texts': 0, 'in_flight': 0, 'errors': 0}
+
+    def start(self):
+        """작업 프로세스 생성 및 모델 로드 완료까지 대기 (이미 시작했으면 무시, 실패 시 예외)"""
+        with self._start_lock:
+            if self._executor is not None:
+                return self
+            # 작업 프로세스가 코어를 나눠 쓰도록 프로세스당 연산 스레드 수 제한
+            threads = max(1, (os.cpu_count() or 1) // self.workers)
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=self._context,
+                initializer=_init_worker,
+                initargs=(self.model_name, threads)
+            )
+            try:
+                # 모든 작업 프로세스에서 모델을 미리 로드
+                warmups = [executor.submit(_dimension) for _ in range(self.workers)]
+                dimension = warmups[0].result()
+                for future in warmups[1:]:
+                    future.result()
+            except Exception as e:
+                # 모델/패키지가 없어 초기화에 실패하면 풀을 정리하고 실패 상태로 표시
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.error = e
+                raise
+            self.error = None
+            self.dimension = dimension
+            self._executor = executor
+            self._thread = threading.Thread(target=self._collect, name="embedding-batcher", daemon=True)
+            self._thread.start()
+        return self
+
+    @property
+    def running(self):
+        """요청 수집 스레드 실행 여부"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, text):
+        """인코딩 요청 (Future 결과: 정규화된 1차원 벡터)"""
+        if self._closed:
+            raise RuntimeError("임베딩 서비스가 종료되었습니다.")
+        if self.error is not None:
+            # 시작에 실패한 서비스는 요청마다 작업 프로세스를 다시 만들지 않음 (재시도는 start() 호출)
+            raise RuntimeError(f"임베딩 서비스 시작 실패: {str(self.error)}")
+        if self._executor is None:
+            self.start()
+        if not self.running:
+            # 처리되지 않을 요청이 대기열에 쌓이지 않도록 거부
+            raise RuntimeError("임베딩 서비스 수집 스레드가 실행 중이 아닙니다.")
+        future = Future()
+        self._queue.put((text, future, time.monotonic()))
+        with self._stats_lock:
+            self._stats['requests'] += 1
+        self._gauge('embedding_queue_depth', self._queue.qsize(), "대기 중인 인코딩 요청 수")
+        return future
+
+    def encode(self, texts, timeout=None):
+        """여러 텍스트 인코딩 (다른 요청과 함께 배치 처리)"""
+        futures = [self.submit(text) for text in texts]
+        return np.array([future.result(timeout) for future in futures], dtype='float32').reshape(len(texts), -1)
+
+    def _collect(self):
+        """요청 수집 루프: 작업 프로세스가 비면 대기 중인 요청을 배치로 묶어 전송"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            # 모든 작업 프로세스가 바쁘면 기다리는 동안 쌓인 요청이 다음 배치에 합쳐짐
+            self._slots.acquire()
+            batch = [item]
+            deadline = time.monotonic() + self.batch_window
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._dispatch(batch)
+            if stop:
+                return
+
+    def _dispatch(self, batch):
+        """배치를 작업 프로세스로 전송하고 완료 시 요청별 Future에 결과 전달"""
+        now = time.monotonic()
+        texts = list(dict.fromkeys(text for text, _, _ in batch))
+        with self._stats_lock:
+            self._stats['batches'] += 1
+            self._stats['batched_texts'] += len(batch)
+            self._stats['in_flight'] += 1
+            in_flight = self._stats['in_flight']
+        if self.metrics:
+            self.metrics.observe('embedding_batch_size', len(batch), buckets=self.BATCH_BUCKETS,
+                                 help_text="배치당 인코딩 요청 수")
+            for _, _, enqueued in batch:
+                self.metrics.observe('embedding_queue_wait_seconds', now - enqueued, buckets=self.WAIT_BUCKETS,
+                                     help_text="인코딩 요청 대기 시간")
+        self._gauge('embedding_queue_depth', self._queue.qsize(), "대기 중인 인코딩 요청 수")
+        self._gauge('embedding_batches_in_flight', in_flight, "작업 프로세스에서 처리 중인 배치 수")
+
+        def done(result):
+            self._slots.release()
+            with self._stats_lock:
+                self._stats['in_flight'] -= 1
+                in_flight = self._stats['in_flight']
+            self._gauge('embedding_batches_in_flight', in_flight, "작업 프로세스에서 처리 중인 배치 수")
+            error = result.exception()
+            if error is not None:
+                with self._stats_lock:
+                    self._stats['errors'] += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                return
+            vectors = dict(zip(texts, result.result()))
+            for text, future, _ in batch:
+                if not future.done():
+                    future.set_result(vectors[text])
+
+        try:
+            self._executor.submit(_encode, texts).add_done_callback(done)
+        except Exception as e:
+            # 작업 프로세스 풀이 종료/손상된 경우
+            self._slots.release()
+            with self._stats_lock:
+                self._stats['in_flight'] -= 1
+                self._stats['errors'] += 1
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def _gauge(self, name, value, help_text):
+        if self.metrics:
+            self.metrics.set_gauge(name, value, help_text=help_text)
+
+    def stats(self):
+        """요청/배치 통계와 현재 대기열 길이"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['workers'] = self.workers
+        stats['running'] = self.running
+        stats['error'] = str(self.error) if self.error is not None else None
+        stats['mean_batch_size'] = stats['batched_texts'] / stats['batches'] if stats['batches'] else 0.0
+        return stats
+
+    def close(self):
+        """수집 스레드와 작업 프로세스 종료 (대기 중인 요청은 실패 처리)"""
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and not item[1].done():
+                item[1].set_exception(RuntimeError("임베딩 서비스가 종료되었습니다."))
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,228 @@
+import math
+import time
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from schema_index import SchemaInvertedIndex
+
+def tokenize(text):
+    """BM25 색인어 (한글 구간은 문자 bigram, 영문/숫자는 토큰, '_'로 구분된 이름은 분리)"""
+    tokens = []
+    for run in SchemaInvertedIndex._runs(text or ''):
+        if run.isascii():
+            tokens.append(run)
+        else:
+            tokens.extend(SchemaInvertedIndex._grams(run))
+    return tokens
+
+class BM25Corpus:
+    """문서 목록에 대한 Okapi BM25 점수 계산"""
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)  # 색인어 -> [(문서 id, 빈도)]
+        self.lengths = []
+        for doc_id, tokens in enumerate(documents):
+            self.lengths.append(len(tokens))
+            for term, count in Counter(tokens).items():
+                self.postings[term].append((doc_id, count))
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        total = len(self.lengths)
+        self.idf = {
+            term: math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def scores(self, query_tokens):
+        """질의 색인어가 등장하는 문서의 점수 (문서 id -> 점수)"""
+        scores = defaultdict(float)
+        for term in set(query_tokens):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, count in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / (self.average_length or 1))
+                scores[doc_id] += idf * count * (self.k1 + 1) / (count + norm)
+        return scores
+
+class BM25Index:
+    """테이블 단위(이름, 설명, 컬럼 이름/설명)와 컬럼 단위 BM25 색인"""
+    def __init__(self, metadata, k1=1.5, b=0.75):
+        self.tables = []
+        self.columns = []
+        table_docs, column_docs = [], []
+        for table, details in metadata.items():
+            tokens = tokenize(table) + tokenize(details.get('description', ''))
+            for column, col_info in details.get('columns', {}).items():
+                column_tokens = tokenize(column) + tokenize(col_info.get('description', ''))
+                tokens.extend(column_tokens)
+                self.columns.append((table, column))
+                column_docs.append(tokenize(table) + column_tokens)
+            self.tables.append(table)
+            table_docs.append(tokens)
+        self.table_corpus = BM25Corpus(table_docs, k1, b)
+        self.column_corpus = BM25Corpus(column_docs, k1, b)
+
+    def search(self, text):
+        """(테이블 점수 목록, 컬럼 점수 목록) 점수 내림차순"""
+        tokens = tokenize(text)
+        tables = sorted(
+            ((self.tables[i], score) for i, score in self.table_corpus.scores(tokens).items()),
+            key=lambda x: (-x[1], x[0])
+        )
+        columns = sorted(
+            ((self.columns[i], score) for i, score in self.column_corpus.scores(tokens).items()),
+            key=lambda x: (-x[1], x[0])
+        )
+        return tables, columns
+
+def reciprocal_rank_fusion(rankings, k=60, weights=None):
+    """순위 목록들의 RRF 점수 (항목 -> 점수)"""
+    scores = defaultdict(float)
+    for name, ranking in rankings.items():
+        weight = (weights or {}).get(name, 1.0)
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] += weight / (k + rank)
+    return scores
+
+class HybridRetriever:
+    """키워드 역색인, BM25 어휘 검색, 임베딩 검색을 RRF로 합친 테이블/컬럼 검색기"""
+    SEMANTIC_WORKERS = 2  # 임베딩 검색 작업 스레드 수 (모두 사용 중이면 새 검색을 넣지 않음)
+    def __init__(self, json_loader, embedder=None, table_k=5, column_k=10, candidate_k=20,
+                 rrf_k=60, weights=None, parallel=True, budget_ms=None):
+        self.json_loader = json_loader
+        self.embedder = embedder          # SchemaEmbedder (준비 전이거나 없으면 BM25만 사용)
+        self.table_k = table_k
+        self.column_k = column_k
+        self.candidate_k = candidate_k    # 각 검색기에서 가져올 후보 수
+        self.rrf_k = rrf_k
+        # BM25는 키워드 순위를 보완하는 정도로 반영 (골든 질의 recall@3 기준)
+        self.weights = weights or {'keyword': 1.0, 'lexical': 0.5, 'semantic': 1.0}
+        self.budget_ms = budget_ms        # 임베딩 검색을 기다리는 최대 시간 (None이면 제한 없음)
+        self.bm25 = BM25Index(json_loader.metadata)
+        self._executor = None
+        self._semantic_slots = None
+        if parallel:
+            self._executor = ThreadPoolExecutor(max_workers=self.SEMANTIC_WORKERS, thread_name_prefix="retriever")
+            # 예산 초과로 기다리지 않게 된 검색도 끝날 때까지 슬롯 점유
+            self._semantic_slots = threading.BoundedSemaphore(self.SEMANTIC_WORKERS)
+
+    def updated(self, json_loader):
+        """새 메타데이터로 BM25 색인을 다시 만든 검색기 (작업 스레드 풀 공유)"""
+        retriever = HybridRetriever.__new__(HybridRetriever)
+        retriever.__dict__.update(self.__dict__)
+        retriever.json_loader = json_loader
+        retriever.bm25 = BM25Index(json_loader.metadata)
+        return retriever
+
+    def _keyword(self, keywords):
+        """확장 키워드의 역색인 점수 순위 (기존 테이블 탐색과 같은 가중치)"""
+        scores = self.json_loader.schema_index.search(
+            keywords or [],
+            fields=('table_name', 'description'),
+            weights={'table_name': 2.0, 'description': 1.5}
+        )
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+        return [table for table, score in ranked[:self.candidate_k] if score > 0], []
+
+    def _lexical(self, question, keywords):
+        """BM25 검색 (질의 + 확장 키워드)"""
+        text = " ".join([question] + sorted(keywords or []))
+        tables, columns = self.bm25.search(text)
+        return [table for table, _ in tables[:self.candidate_k]], [column for column, _ in columns[:self.candidate_k * 2]]
+
+    def _semantic(self, question):
+        """임베딩 검색 (테이블 점수는 테이블/컬럼 유사도 중 큰 값)"""
+        results = self.embedder.search_schema(question, table_k=self.candidate_k, column_k=self.candidate_k * 2)
+        table_scores = {}
+        column_scores = []
+        for table, info in results.items():
+            best = max([info['table_score']] + [column['score'] for column in info['columns']])
+            table_scores[table] = best
+            column_scores.extend(((table, column['column']), column['score']) for column in info['columns'])
+        tables = [table for table, _ in sorted(table_scores.items(), key=lambda x: (-x[1], x[0]))]
+        columns = [column for column, _ in sorted(column_scores, key=lambda x: (-x[1], x[0]))]
+        return tables, columns
+
+    def retrieve(self, question, keywords=None, table_k=None, column_k=None, budget_ms=None):
+        """순위가 매겨진 테이블/컬럼과 검색기별 소요 시간"""
+        start = time.perf_counter()
+        budget_ms = self.budget_ms if budget_ms is None else budget_ms
+        use_semantic = self.embedder is not None and self.embedder.is_ready
+        timings = {}
+        timed_out = False
+        saturated = False
+
+        # 임베딩 검색은 작업 스레드에서 먼저 시작하고 BM25는 현재 스레드에서 계산
+        future = None
+        if use_semantic and self._executor:
+            if self._semantic_slots.acquire(blocking=False):
+                future = self._executor.submit(self._timed, self._semantic, question)
+                future.add_done_callback(lambda _: self._semantic_slots.release())
+            else:
+                # 이전 검색들이 작업 스레드를 모두 사용 중이면 대기열에 쌓지 않고 어휘 검색 결과만 사용
+                saturated = True
+        keyword, timings['keyword_ms'] = self._timed(self._keyword, keywords)
+        lexical, timings['lexical_ms'] = self._timed(self._lexical, question, keywords)
+
+        semantic = None
+        if use_semantic:
+            remaining = None
+            if budget_ms is not None:
+                remaining = max(0.0, budget_ms / 1000 - (time.perf_counter() - start))
+            if future is not None:
+                try:
+                    semantic, timings['semantic_ms'] = future.result(timeout=remaining)
+                except FutureTimeoutError:
+                    # 예산 초과 시 BM25 결과만 사용 (진행 중인 검색은 백그라운드에서 끝남)
+                    timed_out = True
+            elif saturated:
+                pass
+            elif remaining is None or remaining > 0:
+                semantic, timings['semantic_ms'] = self._timed(self._semantic, question)
+            else:
+                timed_out = True
+
+        rankings = {'keyword': keyword, 'lexical': lexical}
+        if semantic is not None:
+            rankings['semantic'] = semantic
+        table_scores = reciprocal_rank_fusion({name: tables for name, (tables, _) in rankings.items()},
+                                              self.rrf_k, self.weights)
+        column_scores = reciprocal_rank_fusion({name: columns for name, (_, columns) in rankings.items()},
+                                               self.rrf_k, self.weights)
+        ranks = {name: {table: rank for rank, table in enumerate(tables, start=1)}
+                 for name, (tables, _) in rankings.items()}
+
+        tables = [
+            {'table': table, 'score': score,
+             'ranks': {name: ranked.get(table) for name, ranked in ranks.items()}}
+            for table, score in sorted(table_scores.items(), key=lambda x: (-x[1], x[0]))[:table_k or self.table_k]
+        ]
+        columns = [
+            {'table': table, 'column': column, 'score': score}
+            for (table, column), score in sorted(column_scores.items(), key=lambda x: (-x[1], x[0]))[:column_k or self.column_k]
+        ]
+        timings['total_ms'] = (time.perf_counter() - start) * 1000
+        return {
+            'tables': tables,
+            'columns': columns,
+            'sources': list(rankings),
+            'timed_out': timed_out,
+            'semantic_unavailable': not use_semantic,  # 임베딩 모델이 없거나 준비 전
+            'semantic_saturated': saturated,           # 이전 검색이 작업 스레드를 모두 사용 중
+            'timings': timings,
+        }
+
+    def tables(self, question, keywords=None, table_k=None):
+        """검색된 테이블 이름 목록"""
+        return [item['table'] for item in self.retrieve(question, keywords, table_k=table_k)['tables']]
+
+    @staticmethod
+    def _timed(func, *args):
+        start = time.perf_counter()
+        value = func(*args)
+        return value, (time.perf_counter() - start) * 1000
+
+    def close(self):
+        if self._executor:
+            self._executor.shutdown(wait=False)
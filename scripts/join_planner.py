@@ -0,0 +1,244 @@
+import heapq
+from collections import defaultdict
+
+def infer_foreign_keys(metadata):
+    """데이터 명세서의 (FK) 표시와 컬럼 이름으로 외래 키 추정"""
+    primary_keys = {
+        table: [col for col, info in details['columns'].items() if info.get('is_primary')]
+        for table, details in metadata.items()
+    }
+    # 단일 컬럼 PK 테이블 (예: match_info.match_id, trait_info.trait_id)
+    single_keys = {table: keys[0] for table, keys in primary_keys.items() if len(keys) == 1}
+
+    inferred = []
+    for table, details in metadata.items():
+        # 복합 PK 전체를 컬럼으로 가진 경우 (예: match_user_stat -> match_user_basic,
+        # match_user_basic -> match_team_info의 (match_id, team_id))
+        # 더 긴 키를 공유하는 테이블끼리는 부모 테이블을 거치지 않고 직접 연결 (행 중복 방지)
+        for target, keys in primary_keys.items():
+            if target != table and len(keys) > 1 and set(keys) <= set(details['columns']):
+                inferred.append((table, target, [(key, key) for key in keys]))
+
+        foreign = [col for col, info in details['columns'].items() if info.get('is_foreign')]
+
+        # 단일 PK 참조 (같은 이름, PK 이름 포함, 테이블명 접두어)
+        for col in foreign:
+            for target, key in single_keys.items():
+                if target == table:
+                    continue
+                stem = target[:-len('_info')] if target.endswith('_info') else target
+                if col == key or key in col or col.startswith(f"{stem}_") or f"_{stem}_" in col:
+                    inferred.append((table, target, [(col, key)]))
+    return inferred
+
+class JoinPlanner:
+    """외래 키 관계 그래프 기반 조인 경로 계획기"""
+    # 조인 비용 (같은 조인 수라면 match_id + user_id 처럼 여러 컬럼으로 묶인 조인 우선)
+    COMPOSITE_COST = 1.0
+    SINGLE_COST = 1.1
+    def __init__(self, tables):
+        self.tables = sorted(tables)
+        self.edges = defaultdict(dict)  # 테이블 -> {이웃 테이블: [조인 후보 [(왼쪽 컬럼, 오른쪽 컬럼)]]} (긴 키 우선)
+        self.distances = {}             # 출발 테이블 -> {도착 테이블: 조인 비용}
+        self._parents = {}              # 출발 테이블 -> {도착 테이블: 직전 테이블}
+
+    @classmethod
+    def from_sources(cls, metadata, schema_info=None, relation_graph=None):
+        """DB 외래 키, 데이터 명세서 추정 외래 키, 테이블 관계 그래프 병합"""
+        tables = set(metadata) | set(schema_info or {})
+        planner = cls(tables)
+
+        # 실제 DB 외래 키 (컬럼 정보 포함, 우선 적용)
+        for table, details in (schema_info or {}).items():
+            for fk in details.get('foreign_keys', []):
+                pairs = list(zip(fk['constrained_columns'], fk['referred_columns']))
+                planner.add_edge(table, fk['referred_table'], pairs)
+
+        for table, target, pairs in infer_foreign_keys(metadata):
+            planner.add_edge(table, target, pairs)
+
+        # 컬럼 정보가 없는 관계는 같은 이름의 PK 컬럼으로 연결
+        for table, related in (relation_graph or {}).items():
+            for target in related:
+                if table in metadata and target in metadata:
+                    shared = [
+                        col for col, info in metadata[target]['columns'].items()
+                        if info.get('is_primary') and col in metadata[table]['columns']
+                    ]
+                    if shared:
+                        planner.add_edge(table, target, [(col, col) for col in shared])
+
+        planner.compute_paths()
+        return planner
+
+    def add_edge(self, table, target, pairs):
+        """조인 후보 등록 (같은 테이블 쌍의 다른 컬럼 조합은 별도 후보로 유지, 긴 키 우선)"""
+        if table == target or not pairs:
+            return
+        candidates = self.edges[table].get(target, [])
+        # 더 긴 키 후보의 일부인 조인은 행을 중복시키므로 후보에서 제외
+        if any(set(pairs) <= set(existing) for existing in candidates):
+            return
+        candidates = [existing for existing in candidates if not set(existing) < set(pairs)]
+        candidates.append(list(pairs))
+        candidates.sort(key=len, reverse=True)
+        self.edges[table][target] = candidates
+        self.edges[target][table] = [[(right, left) for left, right in existing] for existing in candidates]
+
+    def _cost(self, left, right):
+        return self.COMPOSITE_COST if len(self.edges[left][right][0]) > 1 else self.SINGLE_COST
+
+    def compute_paths(self):
+        """모든 테이블 쌍의 최단 조인 경로 계산"""
+        for source in self.tables:
+            distances = {source: 0.0}
+            parents = {source: None}
+            queue = [(0.0, source)]
+            while queue:
+                distance, current = heapq.heappop(queue)
+                if distance > distances[current]:
+                    continue
+                for neighbor in sorted(self.edges.get(current, {})):
+                    candidate = distance + self._cost(current, neighbor)
+                    if candidate < distances.get(neighbor, float('inf')) - 1e-9:
+                        distances[neighbor] = candidate
+                        parents[neighbor] = current
+                        heapq.heappush(queue, (candidate, neighbor))
+            self.distances[source] = distances
+            self._parents[source] = parents
+
+    def path(self, source, target):
+        """최단 조인 경로의 테이블 목록 (연결되지 않으면 None)"""
+        parents = self._parents.get(source)
+        if parents is None or target not in parents:
+            return None
+        path = [target]
+        while path[-1] != source:
+            path.append(parents[path[-1]])
+        return path[::-1]
+
+    @staticmethod
+    def _condition(left, right, pairs):
+        return " AND ".join(f"{left}.{left_col} = {right}.{right_col}" for left_col, right_col in pairs)
+
+    def join_condition(self, left, right):
+        """두 테이블의 조인 조건 문자열 (가장 긴 키 후보)"""
+        return self._condition(left, right, self.edges[left][right][0])
+
+    def join_alternatives(self, left, right):
+        """같은 테이블 쌍의 다른 조인 조건 (예: 부위별 장비 컬럼)"""
+        return [self._condition(left, right, pairs) for pairs in self.edges[left][right][1:]]
+
+    def plan(self, tables):
+        """대상 테이블을 잇는 최소 연결 부분 그래프 (Steiner 트리 근사)"""
+        terminals = [table for table in dict.fromkeys(tables) if table in self.distances]
+        unknown = [table for table in dict.fromkeys(tables) if table not in self.distances]
+
+        # 1단계: 최단 경로 거리(metric closure) 위에서 대상 테이블의 최소 신장 트리 (Prim)
+        tree_edges = set()
+        visited = set()
+        unreachable = []
+        for root in terminals:
+            if root in visited:
+                continue
+            visited.add(root)
+            component = [root]
+            while True:
+                best = None
+                for source in component:
+                    for target in terminals:
+                        if target in visited:
+                            continue
+                        distance = self.distances[source].get(target)
+                        if distance is None:
+                            continue
+                        if best is None or distance < best[0]:
+                            best = (distance, source, target)
+                if best is None:
+                    break
+                _, source, target = best
+                visited.add(target)
+                component.append(target)
+                # 2단계: 트리 간선을 실제 최단 경로로 펼치기
+                path = self.path(source, target)
+                for left, right in zip(path, path[1:]):
+                    tree_edges.add(tuple(sorted((left, right))))
+            if len(component) == 1 and len(terminals) > 1:
+                unreachable.append(root)
+
+        # 3단계: 펼친 부분 그래프의 신장 트리로 중복 조인 제거 후 대상이 아닌 잎 노드 정리
+        tree_edges = self._spanning_tree(tree_edges)
+        tree_edges = self._prune_leaves(tree_edges, set(terminals))
+
+        ordered = list(terminals)
+        for left, right in sorted(tree_edges):
+            for table in (left, right):
+                if table not in ordered:
+                    ordered.append(table)
+        joins = [
+            {'left': left, 'right': right, 'condition': self.join_condition(left, right),
+             'alternatives': self.join_alternatives(left, right)}
+            for left, right in self._join_order(tree_edges, ordered)
+        ]
+        return {
+            'tables': ordered + unknown,
+            'joins': joins,
+            'connectors': [table for table in ordered if table not in terminals],
+            'unreachable': unreachable,
+        }
+
+    @staticmethod
+    def _spanning_tree(edges):
+        """간선 집합의 신장 트리 (경로가 겹쳐 생긴 순환 제거)"""
+        parent = {}
+
+        def find(node):
+            parent.setdefault(node, node)
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        tree = set()
+        for left, right in sorted(edges):
+            root_left, root_right = find(left), find(right)
+            if root_left != root_right:
+                parent[root_left] = root_right
+                tree.add((left, right))
+        return tree
+
+    @staticmethod
+    def _prune_leaves(edges, terminals):
+        """대상 테이블이 아닌 잎 노드 반복 제거"""
+        edges = set(edges)
+        while True:
+            degree = defaultdict(int)
+            for left, right in edges:
+                degree[left] += 1
+                degree[right] += 1
+            leaves = {node for node, count in degree.items() if count == 1 and node not in terminals}
+            if not leaves:
+                return edges
+            edges = {edge for edge in edges if edge[0] not in leaves and edge[1] not in leaves}
+
+    @staticmethod
+    def _join_order(edges, ordered):
+        """대상 테이블 순서를 따라 이미 포함된 테이블에서 뻗어나가는 조인 순서"""
+        remaining = set(edges)
+        included = set()
+        order = []
+        for root in ordered:
+            if root in included:
+                continue
+            included.add(root)
+            progress = True
+            while progress:
+                progress = False
+                for left, right in sorted(remaining):
+                    if left in included or right in included:
+                        source, target = (left, right) if left in included else (right, left)
+                        order.append((source, target))
+                        included.add(target)
+                        remaining.discard((left, right))
+                        progress = True
+        return order
@@ -1,6 +1,8 @@
 import json
+import re
 from collections import defaultdict
-from utils import cache_result
+from cache import cached_method
+from schema_index import SchemaInvertedIndex
 
 class JsonSchemaLoader:
     def __init__(self, json_path):
@@ -10,30 +12,41 @@ class JsonSchemaLoader:
             self.tables = {table['table_name']: table for table in self.raw_data.get('tables', [])}
             self._build_metadata()
             self._build_relation_graph()
+            self._build_schema_index()
         except Exception as e:
             print(f"JSON 파일 로드 중 오류 발생: {str(e)}")
             self.raw_data = {"tables": []}
             self.tables = {}
             self.metadata = defaultdict(dict)
             self.relation_graph = defaultdict(set)
+            self.schema_index = SchemaInvertedIndex({})
 
     def _build_metadata(self):
         """JSON 메타데이터 구축"""
-        self.metadata = defaultdict(dict)
-        for table in self.raw_data.get('tables', []):
+        self.metadata = self.parse_metadata(self.raw_data)
+
+    @staticmethod
+    def parse_table(table):
+        """테이블 하나의 메타데이터"""
+        details = {'description': table.get('description', ''), 'columns': {}}
+        for col in table.get('columns', []):
+            details['columns'][col['name']] = {
+                'type': col.get('type', ''),
+                'description': f"{col.get('description', '')} {col.get('note', '')}".strip(),
+                'is_primary': bool(re.search(r'\(PK(/FK)?\)', col.get('description', ''))),
+                'is_foreign': bool(re.search(r'\((PK/)?FK\)', col.get('description', '')))
+            }
+        return details
+
+    @classmethod
+    def parse_metadata(cls, raw_data):
+        """JSON 데이터 전체의 메타데이터"""
+        metadata = defaultdict(dict)
+        for table in raw_data.get('tables', []):
             table_name = table.get('table_name', '')
-            if not table_name:
-                continue
-            self.metadata[table_name]['description'] = table.get('description', '')
-            self.metadata[table_name]['columns'] = {}
-            for col in table.get('columns', []):
-                col_info = {
-                    'type': col.get('type', ''),
-                    'description': f"{col.get('description', '')} {col.get('note', '')}".strip(),
-                    'is_primary': '(PK)' in col.get('description', ''),
-                    'is_foreign': '(FK)' in col.get('description', '')
-                }
-                self.metadata[table_name]['columns'][col['name']] = col_info
+            if table_name:
+                metadata[table_name] = cls.parse_table(table)
+        return metadata
 
     def _build_relation_graph(self):
         """테이블 관계 그래프 구축"""
@@ -46,16 +59,21 @@ class JsonSchemaLoader:
                         self.relation_graph[table].add(referred_table)
                         self.relation_graph[referred_table].add(table)
 
-    @cache_result()
+    def updated(self, raw_data, metadata, tables):
+        """새 JSON 데이터로 지정한 테이블만 다시 구성한 새 로더 (기존 로더는 그대로 유지)"""
+        loader = JsonSchemaLoader.__new__(JsonSchemaLoader)
+        loader.raw_data = raw_data
+        loader.tables = {table['table_name']: table for table in raw_data.get('tables', [])}
+        loader.metadata = metadata
+        loader._build_relation_graph()
+        loader.schema_index = self.schema_index.updated(metadata, tables)
+        return loader
+
+    def _build_schema_index(self):
+        """테이블/컬럼 설명 역색인 구축"""
+        self.schema_index = SchemaInvertedIndex(self.metadata)
+
+    @cached_method(max_entries=1024, ttl=None)
     def get_related_tables(self, keyword):
-        """키워드 기반 관련 테이블 탐색"""
-        related = []
-        for table, details in self.metadata.items():
-            if keyword in details['description']:
-                related.append(table)
-                continue
-            for _, col_info in details['columns'].items():
-                if keyword in col_info['description']:
-                    related.append(table)
-                    break
-        return list(set(related))
+        """키워드 기반 관련 테이블 탐색 (테이블 및 컬럼 설명)"""
+        return list(self.schema_index.tables(keyword, fields=('description',)))
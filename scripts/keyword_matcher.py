@@ -0,0 +1,162 @@
+import json
+import re
+from collections import defaultdict, deque
+
+class KeywordMatcher:
+    """Aho-Corasick 오토마톤 기반 다중 키워드 매칭기"""
+    # 스키마 설명에서 용어로 쓰지 않는 단어
+    description_stopwords = {
+        '에서', '에게', '으로', '가장', '다른', '있는', '하는', '되는',
+        '경우', '이후', '이전', '시점', '여부', '번째',
+    }
+
+    def __init__(self):
+        self._goto = [{}]       # 상태별 문자 전이
+        self._fail = [0]        # 실패 링크
+        self._base_output = [[]]  # 상태에서 바로 끝나는 패턴 id 목록
+        self._output = [[]]     # 실패 링크 출력까지 병합한 패턴 id 목록 (compile 시 계산)
+        self.patterns = []      # 패턴 id -> 용어
+        self.expansions = []    # 패턴 id -> 확장 키워드 집합
+        self._pattern_ids = {}
+        self._compiled = False
+
+    @staticmethod
+    def _normalize_char(ch):
+        """영문만 소문자로 변환 (한글 위치 보존)"""
+        return ch.lower() if ch.isascii() else ch
+
+    def add(self, term, expansions=()):
+        """패턴 등록 (같은 용어는 확장 키워드 병합)"""
+        term = ''.join(self._normalize_char(ch) for ch in term.strip())
+        if not term:
+            return
+        if term in self._pattern_ids:
+            self.expansions[self._pattern_ids[term]].update(expansions)
+            return
+
+        state = 0
+        for ch in term:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._base_output.append([])
+                self._output.append([])
+            state = next_state
+
+        pattern_id = len(self.patterns)
+        self.patterns.append(term)
+        self.expansions.append(set(expansions))
+        self._base_output[state].append(pattern_id)
+        self._pattern_ids[term] = pattern_id
+        self._compiled = False
+
+    def __contains__(self, term):
+        """등록된 용어인지 확인"""
+        return ''.join(self._normalize_char(ch) for ch in term.strip()) in self._pattern_ids
+
+    def compile(self):
+        """실패 링크 계산 (BFS, 다시 호출해도 병합 출력은 패턴별 출력에서 새로 계산)"""
+        self._output = [list(output) for output in self._base_output]
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(ch, 0)
+                # 실패 링크 상태의 출력 병합
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+        self._compiled = True
+        return self
+
+    @staticmethod
+    def _is_word_char(ch):
+        return ch.isascii() and (ch.isalnum() or ch == '_')
+
+    def find_all(self, text):
+        """텍스트를 한 번 순회하며 모든 패턴의 위치와 확장 키워드 반환"""
+        if not self._compiled:
+            self.compile()
+
+        matches = []
+        state = 0
+        for i, raw_ch in enumerate(text):
+            ch = self._normalize_char(raw_ch)
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+
+            for pattern_id in self._output[state]:
+                term = self.patterns[pattern_id]
+                start = i - len(term) + 1
+                end = i + 1
+                # 영문 패턴은 단어 경계에서만 매칭 (한글은 조사가 붙어도 매칭)
+                if term.isascii():
+                    if start > 0 and self._is_word_char(text[start - 1]):
+                        continue
+                    if end < len(text) and self._is_word_char(text[end]):
+                        continue
+                matches.append({
+                    'term': term,
+                    'start': start,
+                    'end': end,
+                    'expansions': self.expansions[pattern_id]
+                })
+
+        matches.sort(key=lambda m: (m['start'], -m['end']))
+        return matches
+
+    @classmethod
+    def from_sources(cls, mapping_path, metadata, max_term_tables=3):
+        """키워드 매핑 파일과 JSON 메타데이터로 오토마톤 구축"""
+        matcher = cls()
+
+        # 게임 용어 매핑 (키와 동의어 모두 패턴으로 등록)
+        try:
+            with open(mapping_path, 'r', encoding='utf-8') as file:
+                keyword_expansions = json.load(file)
+        except Exception as e:
+            print(f"키워드 매핑 파일 로드 중 오류 발생: {str(e)}")
+            keyword_expansions = {}
+
+        for key, values in keyword_expansions.items():
+            group = [key] + [v for v in values if '*' not in v]
+            for term in group:
+                matcher.add(term, values)
+
+        # 테이블명 / 컬럼명
+        for table, details in metadata.items():
+            matcher.add(table, [table])
+            for col in details.get('columns', {}):
+                matcher.add(col, [col, table])
+
+        # 테이블 / 컬럼 설명의 한글 용어
+        term_targets = defaultdict(set)
+        term_tables = defaultdict(set)
+        for table, details in metadata.items():
+            for term in re.findall(r'[가-힣]{2,}', details.get('description', '')):
+                term_targets[term].add(table)
+                term_tables[term].add(table)
+            for col, col_info in details.get('columns', {}).items():
+                for term in re.findall(r'[가-힣]{2,}', col_info.get('description', '')):
+                    term_targets[term].update((col, table))
+                    term_tables[term].add(table)
+
+        # 여러 테이블에 걸친 일반 용어(식별자, 횟수 등)는 제외
+        for term, targets in term_targets.items():
+            if term in cls.description_stopwords:
+                continue
+            if len(term_tables[term]) <= max_term_tables:
+                matcher.add(term, targets)
+
+        return matcher.compile()
@@ -0,0 +1,90 @@
+import re
+import json
+import time
+import asyncio
+from abc import ABC, abstractmethod
+from llm_client import PerplexityClient
+
+class LLMBackend(ABC):
+    """QueryGenerator가 사용하는 LLM 백엔드 인터페이스"""
+    @abstractmethod
+    def stream(self, messages, temperature=0.2, max_tokens=1024):
+        """응답 텍스트 청크를 순서대로 반환하는 제너레이터 (close 시 연결 종료)"""
+
+    def complete(self, messages, **params):
+        """전체 응답 텍스트 반환"""
+        return "".join(self.stream(messages, **params))
+
+    async def acomplete(self, messages, **params):
+        """전체 응답 텍스트 반환 (비동기)"""
+        return await asyncio.to_thread(self.complete, messages, **params)
+
+    def close(self):
+        """리소스 정리"""
+
+class PerplexityBackend(LLMBackend):
+    """Perplexity Chat Completions SSE 백엔드"""
+    def __init__(self, client=None, model="sonar-pro", **client_options):
+        self.client = client or PerplexityClient(**client_options)
+        self.model = model
+
+    def stream(self, messages, temperature=0.2, max_tokens=1024):
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
+        return self.client.stream_chat(payload)
+
+    async def acomplete(self, messages, temperature=0.2, max_tokens=1024):
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
+        return await self.client.acomplete(payload)
+
+    def close(self):
+        self.client.close()
+
+def load_fixtures(fixtures_path):
+    """질의별 고정 응답 파일 로드"""
+    with open(fixtures_path, 'r', encoding='utf-8') as f:
+        fixtures = json.load(f)
+    return fixtures.get('responses', []), fixtures.get('default', '')
+
+def match_fixture(responses, default, prompt):
+    """프롬프트의 자연어 질의와 일치하는 고정 응답 선택"""
+    question = prompt
+    found = re.search(r'자연어 질의:\s*(.+)', prompt)
+    if found:
+        question = found.group(1).strip()
+    for fixture in responses:
+        if fixture['question'] == question or fixture['question'] in question:
+            return fixture['response']
+    return default
+
+def split_tokens(text, chunk_size=4):
+    """응답을 토큰 단위와 비슷한 크기의 청크로 분할"""
+    return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+class FixtureBackend(LLMBackend):
+    """네트워크 없이 고정 응답을 스트리밍하는 결정적 백엔드"""
+    def __init__(self, fixtures_path, latency=0.0, tokens_per_second=None):
+        self.responses, self.default = load_fixtures(fixtures_path)
+        self.latency = latency                       # 첫 토큰까지 지연(초)
+        self.tokens_per_second = tokens_per_second   # None이면 지연 없이 전송
+
+    def stream(self, messages, temperature=0.2, max_tokens=1024):
+        prompt = messages[-1]['content'] if messages else ''
+        response = match_fixture(self.responses, self.default, prompt)
+        if self.latency:
+            time.sleep(self.latency)
+        for token in split_tokens(response)[:max_tokens]:
+            if self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+            yield token
@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+class LLMClientError(Exception):
+    """LLM API 호출 실패"""
+
+class Cancellation:
+    """비동기 호출이 취소/시간 초과되었을 때 워커 스레드의 응답을 닫기 위한 상태"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._response = None
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def wait(self, timeout):
+        """취소되면 즉시 반환 (취소 여부 반환)"""
+        return self._event.wait(timeout)
+
+    def attach(self, response):
+        """진행 중인 응답 등록 (이미 취소되었으면 바로 닫음)"""
+        with self._lock:
+            self._response = response
+            if self._event.is_set():
+                response.close()
+
+    def cancel(self):
+        """취소 표시 후 수신 중인 응답을 닫아 읽기 대기를 중단"""
+        with self._lock:
+            self._event.set()
+            if self._response is not None:
+                self._response.close()
+
+class PerplexityClient:
+    """연결 풀 기반 Perplexity API 클라이언트 (동기/비동기)"""
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(self, api_key=None, api_url="https://api.perplexity.ai/chat/completions",
+                 pool_size=10, max_in_flight=8, connect_timeout=5, read_timeout=30,
+                 total_timeout=120, max_retries=3, backoff_base=0.5, backoff_max=8.0):
+        self.api_key = api_key or os.getenv("PERPLEXITY_API_KEY")
+        self.api_url = api_url
+        self.connect_timeout = connect_timeout  # 연결 제한 시간(초)
+        self.read_timeout = read_timeout        # 청크 간 읽기 제한 시간(초)
+        self.total_timeout = total_timeout      # 요청 전체 제한 시간(초)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # keep-alive 연결 재사용을 위한 세션
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # 동시 요청 수 제한
+        self.max_in_flight = max_in_flight
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._async_in_flight = None
+
+    def _headers(self):
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    def _backoff(self, attempt, retry_after=None):
+        """지터가 적용된 지수 백오프 대기 시간"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, delay)
+
+    def _post(self, payload, deadline, cancellation=None):
+        """재시도를 포함한 스트리밍 POST 요청"""
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if cancellation is not None and cancellation.cancelled:
+                raise LLMClientError("요청이 취소되었습니다.")
+            try:
+                response = self.session.post(
+                    self.api_url,
+                    headers=self._headers(),
+                    json=payload,
+                    stream=payload.get("stream", False),
+                    timeout=(self.connect_timeout, min(self.read_timeout, remaining))
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = e
+                retry_after = None
+            else:
+                if response.status_code not in self.RETRY_STATUS:
+                    response.raise_for_status()
+                    return response
+                last_error = requests.HTTPError(f"{response.status_code} 응답", response=response)
+                retry_after = response.headers.get("Retry-After")
+                response.close()
+
+            if attempt < self.max_retries:
+                delay = self._backoff(attempt, retry_after)
+                if time.monotonic() + delay >= deadline:
+                    break
+                if cancellation is not None:
+                    if cancellation.wait(delay):
+                        raise LLMClientError("요청이 취소되었습니다.")
+                else:
+                    time.sleep(delay)
+
+        raise LLMClientError(f"API 호출 실패: {str(last_error) if last_error else '제한 시간 초과'}")
+
+    def _acquire(self, deadline, cancellation=None):
+        """동시 요청 슬롯 획득 (취소되면 대기 중단)"""
+        if cancellation is None:
+            return self._in_flight.acquire(timeout=self.total_timeout)
+        while not cancellation.cancelled:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if self._in_flight.acquire(timeout=min(remaining, 0.1)):
+                if cancellation.cancelled:
+                    self._in_flight.release()
+                    break
+                return True
+        raise LLMClientError("요청이 취소되었습니다.")
+
+    def stream_chat(self, payload, cancellation=None):
+        """SSE 스트리밍 응답의 텍스트 청크를 순서대로 반환 (cancellation: 비동기 호출 취소 상태)"""
+        deadline = time.monotonic() + self.total_timeout
+        if not self._acquire(deadline, cancellation):
+            raise LLMClientError("동시 요청 한도 초과로 대기 시간이 만료되었습니다.")
+        try:
+            payload = dict(payload, stream=True)
+            response = self._post(payload, deadline, cancellation)
+            if cancellation is not None:
+                cancellation.attach(response)
+            try:
+                for line in response.iter_lines():
+                    if cancellation is not None and cancellation.cancelled:
+                        raise LLMClientError("요청이 취소되었습니다.")
+                    if time.monotonic() > deadline:
+                        raise LLMClientError("API 응답 제한 시간을 초과했습니다.")
+                    if not line:
+                        continue
+                    line_text = line.decode('utf-8')
+                    if not line_text.startswith('data: '):
+                        continue
+                    if line_text[6:].strip() == '[DONE]':
+                        break
+                    try:
+                        data = json.loads(line_text[6:])
+                    except ValueError:
+                        continue
+                    if data.get('choices'):
+                        chunk = data['choices'][0].get('delta', {}).get('content', '')
+                        if chunk:
+                            yield chunk
+            except LLMClientError:
+                raise
+            except Exception as e:
+                if cancellation is not None and cancellation.cancelled:
+                    # 다른 스레드에서 응답을 닫아 읽기가 중단된 경우
+                    raise LLMClientError("요청이 취소되었습니다.")
+                if isinstance(e, requests.RequestException):
+                    raise LLMClientError(f"스트리밍 응답 수신 실패: {str(e)}")
+                raise
+            finally:
+                response.close()
+        finally:
+            self._in_flight.release()
+
+    def complete(self, payload, cancellation=None):
+        """스트리밍 응답을 모아 전체 텍스트 반환"""
+        return "".join(self.stream_chat(payload, cancellation))
+
+    async def acomplete(self, payload):
+        """비동기 호출 (워커 스레드에서 실행, 취소/시간 초과 시 응답을 닫고 동시 요청 슬롯 반환)"""
+        if self._async_in_flight is None:
+            self._async_in_flight = asyncio.Semaphore(self.max_in_flight)
+        cancellation = Cancellation()
+        async with self._async_in_flight:
+            try:
+                return await asyncio.wait_for(
+                    asyncio.to_thread(self.complete, payload, cancellation),
+                    timeout=self.total_timeout
+                )
+            except asyncio.TimeoutError:
+                cancellation.cancel()
+                raise LLMClientError("API 응답 제한 시간을 초과했습니다.")
+            except asyncio.CancelledError:
+                cancellation.cancel()
+                raise
+
+    def close(self):
+        """세션 연결 종료"""
+        self.session.close()
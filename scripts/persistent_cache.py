@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from utils import normalize_question
+
+def compute_schema_fingerprint(json_path, schema_info=None):
+    """데이터 명세서(JSON)와 실제 DB 스키마의 지문 계산"""
+    digest = hashlib.sha256()
+    with open(json_path, 'rb') as f:
+        digest.update(f.read())
+
+    # 실제 스키마 (테이블, 컬럼, 외래키)
+    for table in sorted(schema_info or {}):
+        details = schema_info[table]
+        digest.update(table.encode())
+        for column in details.get('columns', []):
+            digest.update(f"{column['name']}:{column['type']}".encode())
+        for fk in details.get('foreign_keys', []):
+            digest.update(f"{fk['constrained_columns']}->{fk['referred_table']}".encode())
+    return digest.hexdigest()
+
+class PersistentCache:
+    """SQLite(WAL) 기반 다중 프로세스 공유 SQL 캐시"""
+    def __init__(self, db_path="./cache/sql_cache.db", fingerprint="", ttl=7 * 24 * 3600):
+        self.db_path = db_path
+        self.fingerprint = fingerprint  # 스키마 지문 (변경 시 기존 항목 무효화)
+        self.ttl = ttl
+        self._local = threading.local()  # 스레드별 연결
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sql_cache (
+                cache_key TEXT PRIMARY KEY,
+                question TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        conn.commit()
+        self.purge()
+
+    def _connect(self):
+        """현재 스레드의 SQLite 연결"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def _key(self, question):
+        """정규화된 질의 + 스키마 지문 기반 키"""
+        normalized = normalize_question(question)
+        return hashlib.sha256(f"{self.fingerprint}:{normalized}".encode()).hexdigest()
+
+    def get(self, question):
+        """캐시된 값 조회"""
+        try:
+            row = self._connect().execute(
+                "SELECT value, created_at FROM sql_cache WHERE cache_key = ? AND fingerprint = ?",
+                (self._key(question), self.fingerprint)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"캐시 조회 중 오류: {str(e)}")
+            return None
+        if row is None or time.time() - row[1] >= self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def set(self, question, value):
+        """값 저장 (다른 프로세스와 공유)"""
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO sql_cache (cache_key, question, fingerprint, value, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self._key(question), normalize_question(question), self.fingerprint,
+                 json.dumps(value, ensure_ascii=False), time.time())
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"캐시 저장 중 오류: {str(e)}")
+
+    def purge(self):
+        """다른 스키마 지문 및 만료 항목 삭제"""
+        try:
+            conn = self._connect()
+            conn.execute(
+                "DELETE FROM sql_cache WHERE fingerprint != ? OR created_at < ?",
+                (self.fingerprint, time.time() - self.ttl)
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"캐시 정리 중 오류: {str(e)}")
+
+    def migrate(self, fingerprint, keep=None):
+        """스키마 지문 변경 시 영향받지 않는 항목(keep(question, value)가 참)만 새 지문으로 이전"""
+        try:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT question, value, created_at FROM sql_cache WHERE fingerprint = ?",
+                (self.fingerprint,)
+            ).fetchall()
+            self.fingerprint = fingerprint
+            kept = [
+                (self._key(question), question, fingerprint, value, created_at)
+                for question, value, created_at in rows
+                if keep is None or keep(question, json.loads(value))
+            ]
+            conn.executemany(
+                "INSERT OR REPLACE INTO sql_cache (cache_key, question, fingerprint, value, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                kept
+            )
+            conn.execute("DELETE FROM sql_cache WHERE fingerprint != ?", (fingerprint,))
+            conn.commit()
+            return len(rows) - len(kept)
+        except sqlite3.Error as e:
+            print(f"캐시 이전 중 오류: {str(e)}")
+            self.fingerprint = fingerprint
+            return None
+
+    def clear(self):
+        """전체 캐시 삭제"""
+        conn = self._connect()
+        conn.execute("DELETE FROM sql_cache")
+        conn.commit()
+
+    def close(self):
+        """현재 스레드의 연결 종료"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
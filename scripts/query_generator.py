@@ -1,19 +1,46 @@
 import os
-import requests
 import re
-import time
 import hashlib
-import json
-from collections import defaultdict
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from cache import LRUCache
+from context_builder import SchemaContextBuilder
+from keyword_matcher import KeywordMatcher
+from llm_backend import PerplexityBackend
+from sql_stream import SQLStreamParser
+from tracing import span, start_span, annotate
+from utils import estimate_tokens, normalize_question
 
 class QueryGenerator:
-    def __init__(self, db_connector, json_loader):
+    def __init__(self, db_connector, json_loader, semantic_cache=None, persistent_cache=None,
+                 context_token_budget=2000, backend=None, keyword_matcher=None, context_builder=None,
+                 retriever=None, value_index=None):
         self.api_key = os.getenv("PERPLEXITY_API_KEY")
         self.db_connector = db_connector
         self.json_loader = json_loader
         self.api_url = "https://api.perplexity.ai/chat/completions"
-        self.response_cache = {}  # 응답 캐싱
+        # LLM 백엔드 (기본: 연결 풀/재시도/타임아웃을 갖춘 Perplexity SSE 클라이언트)
+        self.backend = backend or PerplexityBackend(api_key=self.api_key, api_url=self.api_url)
+        self.generation_params = {
+            "temperature": 0.2,  # 더 보수적인 답변을 위해 낮은 temperature로 설정
+            "max_tokens": 1024
+        }
         self.cache_ttl = 3600
+        self.response_cache = LRUCache(max_entries=1000, ttl=self.cache_ttl)  # 응답 캐싱
+        self.semantic_cache = semantic_cache  # 유사 질문 캐싱 (SemanticCache)
+        self.persistent_cache = persistent_cache  # 프로세스 간 공유 캐싱 (PersistentCache)
+        # 키워드 매칭 오토마톤 (시작 시 1회 구축, 스냅샷에서 복원한 경우 재사용)
+        self.keyword_matcher = keyword_matcher or KeywordMatcher.from_sources(
+            "./mapping/keyword_mapping.json",
+            self.json_loader.metadata
+        )
+        # 테이블/컬럼 프롬프트 조각 (시작 시 1회 계산, 스냅샷에서 복원한 경우 재사용)
+        self.context_builder = context_builder or SchemaContextBuilder(self.json_loader)
+        self.context_token_budget = context_token_budget
+        # 테이블 검색기 (HybridRetriever, 없으면 키워드 역색인 점수만 사용)
+        self.retriever = retriever
+        # 범주형/이름 컬럼 값 색인 (ValueIndex, 질문 속 값을 컬럼 값으로 변환)
+        self.value_index = value_index
         
     def _extract_keywords(self, query):
         """한국어 키워드 추출"""
@@ -39,115 +66,59 @@ class QueryGenerator:
         # 중요 키워드와 일반 키워드 합치기
         all_keywords = set(important_words) | keywords
         
-        # 키워드 확장(유사어, 관련어 추가) -> 추후 개선 예정
-        with open("./mapping/keyword_mapping.json", 'r', encoding='utf-8') as file:
-            keyword_expansions = json.load(file)
-            
+        # 키워드 확장(게임 용어 및 스키마 설명 매칭, 조사가 붙은 경우 포함)
         expanded_keywords = set(all_keywords)
-        for kw in all_keywords:
-            if kw in keyword_expansions:
-                expanded_keywords.update(keyword_expansions[kw])
+        for match in self.match_keywords(query):
+            expanded_keywords.add(match['term'])
+            expanded_keywords.update(match['expansions'])
         
         return expanded_keywords
+    
+    def match_keywords(self, query):
+        """질의에서 등록된 용어의 위치와 확장 키워드 탐색"""
+        return self.keyword_matcher.find_all(query)
         
     def _find_related_tables(self, keywords):
         """JSON 설명 기반 테이블 탐색"""
-        table_scores = defaultdict(float)
-        
-        for kw in keywords:
-            # 테이블 이름 매칭
-            for table in self.json_loader.metadata:
-                if kw.lower() in table.lower():
-                    table_scores[table] += 2.0
-            
-            # JSON 로더의 관계 그래프 활용
-            related_tables = self.json_loader.get_related_tables(kw)
-            for table in related_tables:
-                table_scores[table] += 1.5
+        # 테이블 이름 매칭 2.0, 테이블/컬럼 설명 매칭 1.5 (역색인 조회)
+        table_scores = self.json_loader.schema_index.search(
+            keywords,
+            fields=('table_name', 'description'),
+            weights={'table_name': 2.0, 'description': 1.5}
+        )
 
-        sorted_tables = sorted(table_scores.items(), key=lambda x: x[1], reverse=True)
+        sorted_tables = sorted(table_scores.items(), key=lambda x: (-x[1], x[0]))
         return [table for table, score in sorted_tables if score > 0]
     
-    def _build_contextual_prompt(self, query, tables):
+    def _resolve_values(self, query):
+        """질문에 언급된 컬럼 값 (값 색인이 없으면 빈 목록)"""
+        if self.value_index is None:
+            return []
+        return self.value_index.resolve(query)
+
+    def _build_schema_context(self, query, tables, keywords=None, values=None):
+        """토큰 예산 안에서 스키마 컨텍스트 구성 (사용 토큰 수 포함)"""
+        # 관련 테이블을 잇는 최소 조인 경로 (필요한 연결 테이블은 뒤에 추가)
+        join_plan = self.db_connector.get_join_planner().plan(tables)
+        return self.context_builder.build(
+            query, join_plan['tables'],
+            keywords=keywords,
+            joins=join_plan['joins'],
+            token_budget=self.context_token_budget,
+            values=values
+        )
+    
+    def _build_contextual_prompt(self, query, tables, keywords=None):
         """맥락 기반 프롬프트 구성"""
-        # 기본 컨텍스트 구성
-        context = []
-        
-        # 테이블 관계 그래프 구축
-        relation_graph = self.db_connector.build_relation_graph()
-        # 전체 테이블 목록 먼저 제공
-        all_tables = list(self.json_loader.metadata.keys())
-        context.append("## 사용 가능한 전체 테이블 목록:")
-        context.append(f"테이블명: {', '.join(all_tables)}")
-        context.append("")
-        # 테이블별 중요도 순으로 정렬
-        for table in tables:
-            # 테이블 정보
-            desc = self.json_loader.metadata[table]['description']
-            context.append(f"## {table} 테이블: {desc}")
-            
-            # 주요 컬럼 정보(PK, FK, 키워드 관련 컬럼)
-            primary_keys = []
-            foreign_keys = []
-            important_columns = []
-            other_columns = []
-            
-            for col, info in self.json_loader.metadata[table]['columns'].items():
-                col_desc = f"{col}: {info['description']}"
-                if info.get('note'):
-                    col_desc += f" ({info['note']})"
-                    
-                if info.get('is_primary'):
-                    primary_keys.append(col_desc)
-                elif info.get('is_foreign'):
-                    foreign_keys.append(col_desc)
-                elif any(kw in info['description'].lower() for kw in query.lower().split()):
-                    important_columns.append(col_desc)
-                else:
-                    other_columns.append(col_desc)
-            
-            # 중요도 순서대로 컬럼 정보 추출
-            if primary_keys:
-                context.append("### 기본 키(PK):")
-                context.extend([f" - {col}" for col in primary_keys])
-                
-            if foreign_keys:
-                context.append("### 외래 키(FK):")
-                context.extend([f" - {col}" for col in foreign_keys])
-                
-            if important_columns:
-                context.append("### 중요 컬럼:")
-                context.extend([f" - {col}" for col in important_columns])
-            
-            # 나머지 컬럼은 너무 많으면 생략
-            if len(other_columns) <= 5:
-                context.append("### 기타 컬럼:")
-                context.extend([f" - {col}" for col in other_columns])
-            else:
-                context.append(f"### 기타 컬럼: {len(other_columns)}개 (생략)")
-            
-            # 테이블 관계 정보 추출
-            if table in relation_graph:
-                related = relation_graph[table]
-                if related:
-                    context.append(f"### {table} 테이블 관계:")
-                    context.append(f" - 관련 테이블: {', '.join(related)}")
-            
-            context.append("")
-        
-        return "\n".join(context)
+        return self._build_schema_context(query, tables, keywords)['text']
     
     def _get_cached_response(self, query_hash):
         """캐시된 응답 가져오기"""
-        if query_hash in self.response_cache:
-            cache_time, response = self.response_cache[query_hash]
-            if time.time() - cache_time < self.cache_ttl:
-                return response
-        return None
+        return self.response_cache.get(query_hash)
     
     def _cache_response(self, query_hash, response):
         """응답 캐싱"""
-        self.response_cache[query_hash] = (time.time(), response)
+        self.response_cache.set(query_hash, response)
     
     def _compress_prompt(self, prompt):
         """프롬프트 압축"""
@@ -179,29 +150,59 @@ class QueryGenerator:
         
         return '\n'.join(compressed_lines)
     
-    def generate_sql_query(self, natural_language_query):
-        '''자연어 질의를 SQL 쿼리로 변환'''
-        # 쿼리 해시 계산(캐싱용)
-        query_hash = hashlib.md5(natural_language_query.encode()).hexdigest()
-        
-        # 캐싱 응답 확인
-        cached_result = self._get_cached_response(query_hash)
-        if cached_result:
-            return cached_result
-        
+    def _build_messages(self, natural_language_query, shared=None):
+        """자연어 질의에 대한 LLM 메시지와 스키마 컨텍스트 구성"""
         # 키워드 추출
-        keywords = self._extract_keywords(natural_language_query)
+        with span("extract_keywords") as current:
+            keywords = self._extract_keywords(natural_language_query)
+            if current:
+                current.set(keywords=len(keywords))
 
-        # 연관 테이블 찾기
-        related_tables = self._find_related_tables(keywords)
+        # 질문 속 값 찾기 (예: '쾌청' -> weather_main = 10002)
+        with span("resolve_values") as current:
+            values = self._resolve_values(natural_language_query)
+            # 값이 속한 컬럼은 중요 컬럼으로 표시
+            keywords = keywords | {value['column'] for value in values}
+            if current:
+                current.set(values=len(values))
+
+        # 연관 테이블 찾기 (배치 처리 시 같은 키워드 조합은 결과 공유)
+        with span("find_related_tables") as current:
+            if self.retriever is not None:
+                # 질문 문장 자체를 검색하므로 키워드 조합 단위로 공유하지 않음
+                retrieval = self.retriever.retrieve(natural_language_query, keywords)
+                related_tables = [item['table'] for item in retrieval['tables']]
+                if current:
+                    current.set(sources=retrieval['sources'], retrieval_timed_out=retrieval['timed_out'],
+                                semantic_unavailable=retrieval['semantic_unavailable'],
+                                semantic_saturated=retrieval['semantic_saturated'])
+            elif shared is None:
+                related_tables = self._find_related_tables(keywords)
+            else:
+                key = frozenset(keywords)
+                related_tables = shared.get(key)
+                if related_tables is None:
+                    related_tables = shared[key] = self._find_related_tables(keywords)
+            # 스키마 용어가 아닌 값(캐릭터 이름, 날씨 이름 등)이 속한 테이블 추가
+            value_tables = [
+                value['table'] for value in values
+                if value['term'] not in self.keyword_matcher and value['table'] not in related_tables
+            ]
+            if value_tables:
+                related_tables = list(related_tables) + list(dict.fromkeys(value_tables))
+            if current:
+                current.set(tables=list(related_tables))
         
-        # 컨텍스트 구성
-        schema_context = self._build_contextual_prompt(natural_language_query, related_tables)
+        # 컨텍스트 구성 (토큰 예산 적용)
+        with span("build_context") as current:
+            schema_context = self._build_schema_context(natural_language_query, related_tables, keywords, values)
+            if current:
+                current.set(context_tokens=schema_context['tokens'],
+                            omitted_tables=len(schema_context['omitted_tables']))
         
         # 프롬프트
         prompt = f"""
         [데이터베이스 컨텍스트]
-        {schema_context}
         [사고 과정]
         1. 질문을 분석하여 필요한 정보가 무엇인지 파악
         2. 위에 제시된 데이터베이스 컨텍스트에서 관련된 테이블과 컬럼을 식별
@@ -225,61 +226,159 @@ class QueryGenerator:
         생성할 SQL 쿼리 (Markdown 없이):
         """
         
-        # 프롬프트 압축
-        compressed_prompt = self._compress_prompt(prompt)
+        # 프롬프트 압축 (스키마 컨텍스트는 사전 계산된 조각이므로 지시문만 압축)
+        compressed_prompt = self._compress_prompt(prompt).replace(
+            "[데이터베이스 컨텍스트]", f"[데이터베이스 컨텍스트]\n{schema_context['text']}", 1
+        )
+        schema_context['prompt_tokens'] = estimate_tokens(compressed_prompt)
+        annotate(prompt_tokens=schema_context['prompt_tokens'], prompt_chars=len(compressed_prompt))
 
-        # API 페이로드
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "model": "sonar-pro",
-            "messages": [
-                {
-                    "role": "system", 
-                    "content": "사용자가 입력한 한국어 자연어 질문을 기반으로, 주어진 데이터베이스 스키마의 영어로 된 테이블명과 컬럼명을 정확히 식별하고 적절한 MySQL 쿼리를 생성하는 것이 목적입니다. 복잡한 질의에는 서브쿼리, 조인, 집계 함수 등을 적절히 활용하세요."
-                },
-                {
-                    "role": "user", 
-                    "content": compressed_prompt
-                }
-            ],
-            "temperature": 0.2,  # 더 보수적인 답변을 위해 낮은 temperature로 설정
-            "max_tokens": 1024,
-            "stream": True  # 스트리밍 활성화(True: 응답이 생성되는 즉시 부분적으로 실시간으로 전송)
-        }
+        messages = [
+            {
+                "role": "system", 
+                "content": "사용자가 입력한 한국어 자연어 질문을 기반으로, 주어진 데이터베이스 스키마의 영어로 된 테이블명과 컬럼명을 정확히 식별하고 적절한 MySQL 쿼리를 생성하는 것이 목적입니다. 복잡한 질의에는 서브쿼리, 조인, 집계 함수 등을 적절히 활용하세요."
+            },
+            {
+                "role": "user", 
+                "content": compressed_prompt
+            }
+        ]
+        return messages, schema_context
+    
+    def stream_sql_query(self, natural_language_query, rate_limiter=None, shared=None):
+        '''SQL 쿼리를 생성되는 대로 조각 단위로 반환'''
+        # 쿼리 해시 계산(캐싱용)
+        query_hash = hashlib.md5(natural_language_query.encode()).hexdigest()
+        
+        # 캐싱 응답 확인
+        cached_result = self._get_cached_response(query_hash)
+        if cached_result:
+            annotate(sql_cache='memory')
+            yield cached_result
+            return
+        
+        # 디스크 캐싱 확인 (재시작 및 다른 프로세스에서 생성된 결과)
+        if self.persistent_cache:
+            cached_result = self.persistent_cache.get(natural_language_query)
+            if cached_result:
+                annotate(sql_cache='persistent')
+                self._cache_response(query_hash, cached_result)
+                yield cached_result
+                return
+        
+        # 유사 질문 캐싱 확인 (임베딩 모델 준비 전에는 키워드 기반 경로만 사용)
+        question_embedding = None
+        use_semantic = bool(self.semantic_cache and self.semantic_cache.ready)
+        if use_semantic:
+            with span("semantic_cache"):
+                question_embedding = self.semantic_cache.encode(natural_language_query)
+                cached_result = self.semantic_cache.lookup(natural_language_query, question_embedding)
+            if cached_result:
+                annotate(sql_cache='semantic')
+                self._cache_response(query_hash, cached_result)
+                yield cached_result
+                return
+        
+        annotate(sql_cache='miss')
+        messages, _ = self._build_messages(natural_language_query, shared)
+        parser = SQLStreamParser()
+        fragments = []
+        
+        # API 할당량 제한 (캐시 미스인 경우에만 토큰 소모)
+        if rate_limiter:
+            rate_limiter.acquire()
         
+        # 스트리밍 API 호출 (SQL 문장이 완료되면 응답을 바로 종료)
+        # 조각을 반환하는 동안 실행 흐름이 끊기므로 현재 구간을 바꾸지 않는 구간 사용
+        llm_span = start_span("llm")
+        response_chars = 0
+        chunks = self.backend.stream(messages, **self.generation_params)
         try:
-            # 스트리밍 API 호출
-            response = requests.post(self.api_url, headers=headers, json=payload, stream=True)
-            response.raise_for_status()
-            
-            # 스트리밍 응답 처리
-            full_response = ""
-            
-            for line in response.iter_lines():
-                if line:
-                    line_text = line.decode('utf-8')
-                    if line_text.startswith('data: '):
-                        try:
-                            data = json.loads(line_text[6:])
-                            if data.get('choices'):
-                                chunk = data['choices'][0].get('delta', {}).get('content', '')
-                                if chunk:
-                                    full_response += chunk
-                                    # 추후 실시간으로 처리할 수 있는 로직 추가하기
-                        except:
-                            pass
-            
-            # 캐싱 및 후처리
-            sql_query = self._extract_sql(full_response)
-            self._cache_response(query_hash, sql_query)
-            
-            return sql_query
+            for chunk in chunks:
+                response_chars += len(chunk)
+                fragment = parser.feed(chunk)
+                if fragment:
+                    fragments.append(fragment)
+                    yield fragment
+                if parser.done:
+                    break
+        finally:
+            chunks.close()
+            if llm_span:
+                llm_span.set(response_chars=response_chars, stopped_early=parser.done)
+                llm_span.finish()
+        
+        # SQL 시작을 찾지 못한 경우 전체 응답에서 추출
+        found = parser.found
+        tail = parser.finish()
+        if not found:
+            tail = self._extract_sql(tail)
+        if tail:
+            fragments.append(tail)
+            yield tail
+        
+        # 캐싱
+        sql_query = "".join(fragments).strip()
+        self._cache_response(query_hash, sql_query)
+        if self.persistent_cache:
+            self.persistent_cache.set(natural_language_query, sql_query)
+        if use_semantic:
+            self.semantic_cache.add(natural_language_query, sql_query, question_embedding)
+    
+    def generate_sql_query(self, natural_language_query, on_fragment=None):
+        '''자연어 질의를 SQL 쿼리로 변환 (on_fragment가 있으면 생성되는 조각마다 호출)'''
+        try:
+            fragments = []
+            for fragment in self.stream_sql_query(natural_language_query):
+                fragments.append(fragment)
+                if on_fragment:
+                    on_fragment(fragment)
+            return "".join(fragments).strip()
         except Exception as e:
             return f"쿼리 생성 중 오류 발생: {str(e)}"
     
+    def generate_batch(self, questions, max_workers=4, rate_limiter=None):
+        '''여러 질의를 동시에 SQL로 변환하고 완료되는 순서대로 반환'''
+        # 동일 질의 제거 (정규화 기준)
+        groups = {}
+        for index, question in enumerate(questions):
+            groups.setdefault(normalize_question(question), []).append(index)
+        
+        # 키워드별 연관 테이블 탐색 결과 공유
+        shared = {}
+        
+        def generate(question):
+            return "".join(self.stream_sql_query(question, rate_limiter, shared)).strip()
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(generate, questions[indices[0]]): indices
+                for indices in groups.values()
+            }
+            for future in as_completed(futures):
+                try:
+                    sql_query, error = future.result(), None
+                except Exception as e:
+                    sql_query, error = None, f"쿼리 생성 중 오류 발생: {str(e)}"
+                for index in futures[future]:
+                    yield {
+                        "index": index,
+                        "natural_language_query": questions[index],
+                        "generated_sql": sql_query,
+                        "error": error
+                    }
+    
+    async def agenerate_sql_query(self, natural_language_query):
+        '''자연어 질의를 SQL 쿼리로 변환 (비동기)'''
+        # 스트리밍 응답 수신은 연결 풀을 공유하는 워커 스레드에서 처리
+        return await asyncio.to_thread(self.generate_sql_query, natural_language_query)
+    
+    def close(self):
+        """LLM 백엔드 연결 및 검색기 작업 스레드 종료"""
+        self.backend.close()
+        if self.retriever is not None:
+            self.retriever.close()
+    
     def _extract_sql(self, response_text):
         """응답에서 SQL 쿼리 추출"""
         # SQL 블록 추출
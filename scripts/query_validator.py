@@ -2,8 +2,10 @@ import re
 import sqlparse
 
 class QueryValidator:
-    def __init__(self, inspector):
+    def __init__(self, inspector, schema_source=None):
         self.inspector = inspector
+        # 전체 스키마 조회 함수 (예: DatabaseConnector.get_full_schema, 없으면 inspector 조회)
+        self.schema_source = schema_source
         self.forbidden_patterns = [
             r'DROP\s+TABLE',                    # 테이블 삭제
             r'DROP\s+DATABASE',                 # 데이터베이스 삭제
@@ -27,7 +29,7 @@ class QueryValidator:
         
         # 테이블 추출
         used_tables = self._extract_tables(sql_query)
-        existing_tables = self.inspector.get_table_names()
+        existing_tables = self._table_names()
         
         # 존재하지 않는 테이블 확인
         invalid_tables = [table for table in used_tables if table not in existing_tables]
@@ -39,6 +41,28 @@ class QueryValidator:
         
         return True
     
+    def _schema(self):
+        """캐시된 전체 스키마 (조회 실패 시 None)"""
+        if self.schema_source is None:
+            return None
+        try:
+            return self.schema_source()
+        except Exception as e:
+            print(f"스키마 조회 중 오류: {str(e)}")
+            return None
+    
+    def _table_names(self):
+        schema_info = self._schema()
+        if schema_info is None:
+            return self.inspector.get_table_names()
+        return list(schema_info)
+    
+    def _columns(self, table):
+        schema_info = self._schema()
+        if schema_info is None:
+            return self.inspector.get_columns(table)
+        return schema_info[table]['columns']
+    
     def _check_safety(self, sql_query):
         '''안전하지 않은 SQL 패턴 검사'''
         upper_query = sql_query.upper()
@@ -85,7 +109,7 @@ class QueryValidator:
         table_columns = {}
         for table in tables:
             try:
-                columns = self.inspector.get_columns(table)
+                columns = self._columns(table)
                 table_columns[table] = [col['name'].lower() for col in columns]
             except:
                 # 테이블을 찾을 수 없는 경우(validate_tables에서 확인)
@@ -0,0 +1,38 @@
+import time
+import threading
+
+class TokenBucket:
+    """토큰 버킷 기반 호출 속도 제한 (스레드 안전)"""
+    def __init__(self, rate, capacity=None):
+        self.rate = rate                      # 초당 충전 토큰 수
+        self.capacity = capacity or max(1, rate)  # 최대 버스트 크기
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute, burst=None):
+        """분당 요청 수 기준 생성 (API 할당량 설정용)"""
+        return cls(requests_per_minute / 60.0, burst)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1, timeout=None):
+        """토큰을 얻을 때까지 대기 (timeout 초과 시 False)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
@@ -0,0 +1,156 @@
+import re
+import time
+import zlib
+import pickle
+import hashlib
+import threading
+import sqlparse
+from sqlparse import sql, tokens as T
+from sqlalchemy import text
+from cache import LRUCache
+
+def sql_fingerprint(sql_query):
+    """주석/공백/키워드 대소문자/끝 세미콜론을 정규화한 SQL 해시"""
+    normalized = sqlparse.format(sql_query, strip_comments=True, keyword_case='upper')
+    normalized = re.sub(r'\s+', ' ', normalized).strip().rstrip(';').strip()
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+def is_cacheable(sql_query):
+    """결과를 캐싱할 수 있는 단일 조회 구문인지 확인"""
+    statements = [s for s in sqlparse.parse(sql_query) if s.token_first(skip_cm=True) is not None]
+    return len(statements) == 1 and statements[0].get_type() == 'SELECT'
+
+# 버전 고정 판단 시 WHERE 최상위에 허용하는 키워드 (OR 등이 있으면 고정으로 보지 않음)
+ALLOWED_WHERE_KEYWORDS = {'WHERE', 'AND', 'NOT', 'IS', 'NULL', 'NOT NULL', 'IN', 'LIKE', 'BETWEEN'}
+
+def version_pin(sql_query):
+    """유일한 SELECT의 WHERE 최상위 AND 조건 'version_major = N'의 N (없거나 모호하면 None)"""
+    # CASE, 서브쿼리, NOT, OR, HAVING 안의 비교는 결과를 특정 버전으로 한정하지 않으므로 제외
+    statement = sqlparse.parse(sql_query)[0]
+    selects = [t for t in statement.flatten() if t.ttype is T.DML and t.normalized == 'SELECT']
+    if len(selects) != 1:
+        return None  # 서브쿼리, UNION, CTE
+    where = next((t for t in statement.tokens if isinstance(t, sql.Where)), None)
+    if where is None:
+        return None
+    versions = set()
+    previous = None
+    for token in where.tokens:
+        if token.is_whitespace or token.ttype in T.Comment:
+            continue
+        if token.ttype in T.Keyword and token.normalized not in ALLOWED_WHERE_KEYWORDS:
+            return None  # OR, XOR 등
+        if isinstance(token, sql.Comparison) and not (previous is not None and previous.normalized == 'NOT'):
+            left, right = token.left, token.right
+            operator = [t for t in token.tokens if t.ttype is T.Operator.Comparison]
+            if (isinstance(left, sql.Identifier) and left.get_real_name() == 'version_major'
+                    and right.ttype in T.Literal.Number.Integer and operator and operator[0].value == '='):
+                versions.add(int(right.value))
+        previous = token
+    return versions.pop() if len(versions) == 1 else None
+
+class DataVersionProbe:
+    """데이터 버전 조회 (최신 match_id, 최신 매치의 게임 버전, 테이블 갱신 시각), 짧은 주기로 재사용"""
+    QUERY = (
+        "SELECT m.match_id, m.version_major, "
+        "(SELECT MAX(UPDATE_TIME) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()) "
+        "FROM match_info m ORDER BY m.match_id DESC LIMIT 1"
+    )
+
+    def __init__(self, db_connector, interval=5.0):
+        self.db_connector = db_connector
+        self.interval = interval    # 조회 결과 재사용 시간(초)
+        self._lock = threading.Lock()
+        self._checked_at = None
+        self._value = None
+        self.probes = 0
+
+    def current(self):
+        """{'data_version', 'current_version'} (조회 실패 시 None)"""
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is not None and now - self._checked_at < self.interval:
+                return self._value
+            try:
+                with self.db_connector.engine.connect() as connection:
+                    row = connection.execute(text(self.QUERY)).fetchone()
+                if row is None:
+                    value = {'data_version': 'empty', 'current_version': None}
+                else:
+                    match_id, version_major, updated_at = row
+                    value = {'data_version': f"{match_id}:{updated_at}", 'current_version': version_major}
+            except Exception as e:
+                print(f"데이터 버전 조회 중 오류: {str(e)}")
+                value = None
+            self.probes += 1
+            self._checked_at = now
+            self._value = value
+            return value
+
+class ResultCache:
+    """SQL 지문 + 데이터 버전 기반 쿼리 결과 캐시 (크기 제한 LRU, 압축 저장)"""
+    def __init__(self, probe, max_bytes=64 * 1024 * 1024, ttl=600, closed_version_ttl=7 * 24 * 3600,
+                 compress=True, compress_min_bytes=1024, max_entries=10000):
+        self.probe = probe                            # DataVersionProbe
+        self.ttl = ttl                                # 진행 중 데이터 결과의 만료 시간(초)
+        self.closed_version_ttl = closed_version_ttl  # 종료된 게임 버전 결과의 만료 시간(초)
+        self.compress = compress
+        self.compress_min_bytes = compress_min_bytes  # 이보다 작은 결과는 압축하지 않음
+        # 값: (압축 여부, 직렬화된 결과) - 크기는 저장된 바이트 수 기준
+        self.cache = LRUCache(max_entries=max_entries, ttl=ttl, max_bytes=max_bytes,
+                              sizeof=lambda value: len(value[1]))
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+
+    def closed_version(self, sql_query, current_version):
+        """현재 버전보다 이전 버전으로 고정된 조회면 해당 버전 (아니면 None)"""
+        if current_version is None:
+            return None
+        version = version_pin(sql_query)
+        if version is not None and version < int(current_version):
+            return version
+        return None
+
+    def key(self, sql_query):
+        """(캐시 키, TTL) - 캐싱할 수 없으면 (None, None)"""
+        if not is_cacheable(sql_query):
+            return None, None
+        state = self.probe.current()
+        if state is None:
+            return None, None
+        fingerprint = sql_fingerprint(sql_query)
+        version = self.closed_version(sql_query, state['current_version'])
+        if version is not None:
+            # 종료된 버전의 경기는 더 추가되지 않으므로 데이터 버전과 무관
+            return (fingerprint, f"closed:{version}"), self.closed_version_ttl
+        return (fingerprint, state['data_version']), self.ttl
+
+    def get(self, key):
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        compressed, payload = entry
+        return pickle.loads(zlib.decompress(payload) if compressed else payload)
+
+    def set(self, key, value, ttl=None):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        raw_size = len(payload)
+        compressed = self.compress and raw_size >= self.compress_min_bytes
+        if compressed:
+            payload = zlib.compress(payload, 1)
+        # 압축률 통계는 LRU와 같은 잠금 안에서 갱신 (동시 저장 시 누락 방지)
+        with self.cache.lock:
+            self.cache.set(key, (compressed, payload), self.ttl if ttl is None else ttl)
+            self.raw_bytes += raw_size
+            self.stored_bytes += len(payload)
+
+    def stats(self):
+        """적중/미스/제거 통계와 압축률"""
+        with self.cache.lock:
+            stats = self.cache.stats()
+            stats['compression_ratio'] = self.stored_bytes / self.raw_bytes if self.raw_bytes else 1.0
+        stats['probes'] = self.probe.probes
+        return stats
+
+    def clear(self):
+        self.cache.clear()
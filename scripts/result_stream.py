@@ -0,0 +1,45 @@
+def row_bytes(row):
+    """결과 행 크기 근사치 (문자열은 UTF-8 바이트 수, 그 외 값은 문자열 길이)"""
+    values = row.values() if isinstance(row, dict) else row
+    size = 0
+    for value in values:
+        if value is None:
+            size += 1
+        elif isinstance(value, (bytes, bytearray)):
+            size += len(value)
+        elif isinstance(value, str):
+            size += len(value.encode('utf-8'))
+        else:
+            size += len(str(value))
+    return size
+
+def collect_rows(batches, max_rows=None, max_bytes=None):
+    """행/바이트 상한까지만 결과 수집 (상한을 넘는 행이 실제로 있을 때만 잘림으로 표시)"""
+    rows = []
+    size = 0
+    truncated_by = None
+    try:
+        for batch in batches:
+            for row in batch:
+                if max_rows is not None and len(rows) >= max_rows:
+                    truncated_by = 'rows'
+                    break
+                row_size = row_bytes(row)
+                if max_bytes is not None and size + row_size > max_bytes:
+                    truncated_by = 'bytes'
+                    break
+                rows.append(row)
+                size += row_size
+            if truncated_by:
+                break
+    finally:
+        # 남은 묶음을 읽지 않도록 생성기 종료
+        if hasattr(batches, 'close'):
+            batches.close()
+    return {
+        'rows': rows,
+        'row_count': len(rows),
+        'bytes': size,
+        'truncated': truncated_by is not None,
+        'truncated_by': truncated_by,
+    }
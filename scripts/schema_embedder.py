@@ -1,20 +1,149 @@
+import os
+import time
+import uuid
+import hashlib
+import threading
 import numpy as np
-from sentence_transformers import SentenceTransformer
-import faiss
 import json
+from cache import LRUCache
+
+# sentence_transformers(torch)와 faiss는 가져오는 데만 수 초가 걸리므로 실제로 필요할 때 불러옴
+
+def entry_hash(text):
+    """설명문 내용 해시 (임베딩 재사용 키)"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
 
 class SchemaEmbedder:
-    def __init__(self, json_loader):
-        self.model = SentenceTransformer(
-            'sentence-transformers/paraphrase-multilingual-mpnet-base-v2',
-            device='cpu'
-        )
+    MODEL_NAME = 'sentence-transformers/paraphrase-multilingual-mpnet-base-v2'
+    STORE_VERSION = 2  # 2: 정규화된 벡터
+
+    def __init__(self, json_loader, cache_dir=None, query_cache_size=1024, embedding_service=None):
         self.json_loader = json_loader
+        self.cache_dir = cache_dir  # 설명 임베딩 저장 디렉터리 (None이면 저장하지 않음)
         self.table_index = None
         self.column_index = None
         self.table_data = []
         self.column_data = []
-        faiss.omp_set_num_threads(4)
+        self.last_encoded = 0  # 마지막 구축 시 새로 인코딩한 설명 수
+        self.query_cache = LRUCache(max_entries=query_cache_size, ttl=None)  # 질문 -> 정규화된 임베딩
+        self._model = None
+        self.embedding_service = embedding_service  # EmbeddingService (있으면 작업 프로세스에서 배치 인코딩)
+        self._model_lock = threading.Lock()
+        self._build_lock = threading.RLock()   # 인덱스 구축/갱신 직렬화
+        self._ready = threading.Event()        # 모델과 인덱스 준비 완료
+        self._warmup_thread = None
+        self._ready_callbacks = []             # 준비 완료 시 호출할 함수 (구축 잠금 보유 상태에서 호출)
+        self._state = 'idle'                   # idle / loading / ready / failed
+        self._error = None
+        self._timings = {}
+
+    @property
+    def model(self):
+        """임베딩 모델 (처음 사용할 때 로드)"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    from sentence_transformers import SentenceTransformer
+                    import faiss
+                    faiss.omp_set_num_threads(4)
+                    self._model = SentenceTransformer(self.MODEL_NAME, device='cpu')
+                    self._timings['model_load_seconds'] = round(time.perf_counter() - start, 3)
+        return self._model
+
+    @property
+    def is_ready(self):
+        """의미 기반 검색 사용 가능 여부 (모델 로드 및 인덱스 구축 완료)"""
+        return self._ready.is_set()
+
+    def start_warmup(self):
+        """백그라운드 스레드에서 모델 로드 및 인덱스 구축 (이미 시작했으면 무시)"""
+        if self._warmup_thread is None and not self.is_ready:
+            self._state = 'loading'
+            self._warmup_thread = threading.Thread(target=self._warmup, name="schema-embedder-warmup", daemon=True)
+            self._warmup_thread.start()
+        return self
+
+    def _warmup(self):
+        start = time.perf_counter()
+        try:
+            self._load_encoder()
+            with self._build_lock:
+                if self.table_index is None:
+                    json_loader = self.json_loader
+                    self.build_index()
+                    # 구축 중 스키마가 다시 적재되었으면 바뀐 설명 반영
+                    if self.json_loader is not json_loader:
+                        self.refresh_index()
+                self._timings['warmup_seconds'] = round(time.perf_counter() - start, 3)
+                self._state = 'ready'
+                self._ready.set()
+                callbacks, self._ready_callbacks = self._ready_callbacks, []
+                self._run_callbacks(callbacks)
+        except Exception as e:
+            print(f"임베딩 모델 준비 중 오류: {str(e)}")
+            self._state = 'failed'
+            self._error = str(e)
+
+    def on_ready(self, callback):
+        """준비 완료 후 인덱스 구축 잠금을 보유한 채 callback 호출 (이미 준비되었으면 즉시 호출)"""
+        with self._build_lock:
+            if not self.is_ready:
+                self._ready_callbacks.append(callback)
+                return
+            self._run_callbacks([callback])
+
+    @staticmethod
+    def _run_callbacks(callbacks):
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"임베딩 준비 완료 처리 중 오류: {str(e)}")
+
+    def export_index(self):
+        """(테이블 항목, 컬럼 항목, 테이블 벡터, 컬럼 벡터) - 구축 중이면 완료까지 대기, 인덱스가 없으면 None"""
+        with self._build_lock:
+            if self.table_index is None or self.column_index is None:
+                return None
+            return (
+                list(self.table_data),
+                list(self.column_data),
+                self.table_index.reconstruct_n(0, self.table_index.ntotal),
+                self.column_index.reconstruct_n(0, self.column_index.ntotal),
+            )
+
+    def wait_ready(self, timeout=None):
+        """준비될 때까지 대기 (준비 여부 반환)"""
+        return self._ready.wait(timeout)
+
+    def status(self):
+        """준비 상태 정보"""
+        return {
+            'state': self._state,
+            'ready': self.is_ready,
+            'model_loaded': self._model is not None or bool(self.embedding_service and self.embedding_service.dimension),
+            'tables': self.table_index.ntotal if self.table_index is not None else 0,
+            'columns': self.column_index.ntotal if self.column_index is not None else 0,
+            'error': self._error,
+            **self._timings,
+        }
+
+    def model_fingerprint(self):
+        """임베딩 모델 지문 (모델이 바뀌면 저장된 벡터 폐기)"""
+        return f"{self.MODEL_NAME}:{self._load_encoder()}"
+
+    def _load_encoder(self):
+        """인코더 준비 (임베딩 서비스 또는 현재 프로세스의 모델) 후 임베딩 차원 반환"""
+        if self.embedding_service is not None:
+            return self.embedding_service.start().dimension
+        return self.model.get_sentence_embedding_dimension()
+
+    def _encode(self, texts):
+        """정규화된 임베딩 (임베딩 서비스가 있으면 다른 요청과 함께 배치 인코딩)"""
+        if self.embedding_service is not None:
+            return self.embedding_service.encode(texts)
+        return self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True).astype('float32')
 
     def _generate_table_descriptions(self):
         """테이블 레벨 설명문 생성"""
@@ -66,63 +195,221 @@ class SchemaEmbedder:
                 self.column_data.append((table, col, col_desc))
 
     def build_index(self):
-        """FAISS 인덱스 구축 (테이블 및 컬럼 별도)"""
-        # 테이블 레벨 인덱스
+        """FAISS 인덱스 구축 (테이블 및 컬럼 별도, 저장된 임베딩 재사용)"""
+        with self._build_lock:
+            return self._build_index()
+
+    def _build_index(self):
+        self.table_data, self.column_data = [], []
         self._generate_table_descriptions()
-        table_texts = [desc[1] for desc in self.table_data]
-        table_embeddings = self.model.encode(table_texts, convert_to_numpy=True)
-        
-        table_dimension = table_embeddings.shape[1]
-        self.table_index = faiss.IndexFlatL2(table_dimension)
-        self.table_index.add(table_embeddings.astype('float32'))
-        
-        # 컬럼 레벨 인덱스
         self._generate_column_descriptions()
-        column_texts = [desc[2] for desc in self.column_data]
-        column_embeddings = self.model.encode(column_texts, convert_to_numpy=True)
-        
-        column_dimension = column_embeddings.shape[1]
-        self.column_index = faiss.IndexFlatL2(column_dimension)
-        self.column_index.add(column_embeddings.astype('float32'))
+        cached = self.load_embeddings()
+        self.table_index, table_encoded = self._build_flat_index([desc for _, desc in self.table_data], cached)
+        self.column_index, column_encoded = self._build_flat_index([desc for _, _, desc in self.column_data], cached)
+        self.last_encoded = table_encoded + column_encoded
+        # 새로 인코딩한 설명이 있거나 저장된 항목 구성이 다르면 다시 저장
+        if self.last_encoded or len(cached) != len(self.table_data) + len(self.column_data):
+            self.save_embeddings()
+        return self.last_encoded
+
+    def _build_flat_index(self, texts, cached):
+        """캐시된 벡터(설명 해시 -> 벡터)를 재사용하고 새 설명만 인코딩하여 인덱스 구성"""
+        hashes = [entry_hash(text) for text in texts]
+        missing = {h: text for h, text in zip(hashes, texts) if h not in cached}
+        if missing:
+            vectors = self._encode(list(missing.values()))
+            cached = dict(cached)
+            cached.update(zip(missing, vectors))
+        return self.index_from_vectors([cached[h] for h in hashes]), len(missing)
+
+    @staticmethod
+    def index_from_vectors(vectors):
+        """정규화된 벡터의 내적(코사인 유사도) 인덱스"""
+        import faiss
+        matrix = np.ascontiguousarray(np.array(vectors, dtype='float32'))
+        index = faiss.IndexFlatIP(matrix.shape[1])
+        index.add(matrix)
+        return index
+
+    def refresh_index(self, json_loader=None):
+        """메타데이터 변경 후 설명이 바뀐 항목만 다시 인코딩 (인코딩한 항목 수 반환)"""
+        with self._build_lock:
+            return self._refresh_index(json_loader)
+
+    def _refresh_index(self, json_loader=None):
+        if json_loader is not None:
+            self.json_loader = json_loader
+        if self.table_index is None:
+            return self._build_index()
+
+        cached = self._indexed_embeddings()
+        previous = (self.table_data, self.column_data)
+        self.table_data, self.column_data = [], []
+        self._generate_table_descriptions()
+        self._generate_column_descriptions()
+        table_data, column_data = self.table_data, self.column_data
+        self.table_data, self.column_data = previous
+
+        table_index, table_encoded = self._build_flat_index([desc for _, desc in table_data], cached)
+        column_index, column_encoded = self._build_flat_index([desc for _, _, desc in column_data], cached)
+        # 새 목록과 인덱스를 모두 만든 뒤 참조만 교체
+        self.table_data, self.table_index = table_data, table_index
+        self.column_data, self.column_index = column_data, column_index
+        self.last_encoded = table_encoded + column_encoded
+        if self.last_encoded:
+            self.save_embeddings()
+        return self.last_encoded
+
+    def _indexed_embeddings(self):
+        """현재 인덱스의 벡터 (설명 해시 -> 벡터)"""
+        cached = {}
+        for texts, index in (([desc for _, desc in self.table_data], self.table_index),
+                             ([desc for _, _, desc in self.column_data], self.column_index)):
+            if index is not None and index.ntotal:
+                cached.update(zip(map(entry_hash, texts), index.reconstruct_n(0, index.ntotal)))
+        return cached
+
+    def save_embeddings(self):
+        """테이블/컬럼 설명 임베딩과 항목 정보를 디스크에 저장"""
+        if not self.cache_dir or self.table_index is None:
+            return False
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            token = uuid.uuid4().hex[:8]
+            manifest = {
+                'version': self.STORE_VERSION,
+                'model': self.model_fingerprint(),
+                'tables': [{'table': table, 'hash': entry_hash(desc)} for table, desc in self.table_data],
+                'columns': [
+                    {'table': table, 'column': column, 'hash': entry_hash(desc)}
+                    for table, column, desc in self.column_data
+                ],
+            }
+            for kind, index in (('tables', self.table_index), ('columns', self.column_index)):
+                # 매니페스트 교체 전까지 기존 파일을 읽는 프로세스가 있을 수 있으므로 새 이름으로 기록
+                file_name = f"{kind}.{token}.npy"
+                np.save(os.path.join(self.cache_dir, file_name), index.reconstruct_n(0, index.ntotal))
+                manifest[f'{kind}_file'] = file_name
+
+            manifest_path = os.path.join(self.cache_dir, 'manifest.json')
+            tmp_path = f"{manifest_path}.{token}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.replace(tmp_path, manifest_path)
+
+            # 이전 벡터 파일 정리
+            current = {manifest['tables_file'], manifest['columns_file']}
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.npy') and name not in current:
+                    os.remove(os.path.join(self.cache_dir, name))
+            return True
+        except Exception as e:
+            print(f"임베딩 저장 중 오류: {str(e)}")
+            return False
+
+    def load_embeddings(self):
+        """저장된 임베딩 (설명 해시 -> 벡터, 메모리 매핑). 모델 지문이 다르면 빈 dict"""
+        if not self.cache_dir:
+            return {}
+        manifest_path = os.path.join(self.cache_dir, 'manifest.json')
+        if not os.path.exists(manifest_path):
+            return {}
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') != self.STORE_VERSION or manifest.get('model') != self.model_fingerprint():
+                return {}
+            cached = {}
+            for kind in ('tables', 'columns'):
+                vectors = np.load(os.path.join(self.cache_dir, manifest[f'{kind}_file']), mmap_mode='r')
+                if len(vectors) != len(manifest[kind]):
+                    return {}
+                for row, entry in enumerate(manifest[kind]):
+                    cached[entry['hash']] = vectors[row]
+            return cached
+        except Exception as e:
+            print(f"임베딩 로드 중 오류: {str(e)}")
+            return {}
+
+    def encode_queries(self, queries):
+        """질문 임베딩 (정규화, 질문별 LRU 캐시). 캐시에 없는 질문만 한 번에 인코딩"""
+        vectors = {}
+        missing = []
+        for query in dict.fromkeys(queries):
+            cached = self.query_cache.get(query)
+            if cached is None:
+                missing.append(query)
+            else:
+                vectors[query] = cached
+        if missing:
+            for query, vector in zip(missing, self._encode(missing)):
+                self.query_cache.set(query, vector)
+                vectors[query] = vector
+        return np.array([vectors[query] for query in queries], dtype='float32').reshape(len(queries), -1)
+
+    def encode_query(self, query):
+        """질문 하나의 임베딩 (1 x 차원)"""
+        return self.encode_queries([query])
+
+    @staticmethod
+    def _search(index, data, embeddings, k):
+        """인덱스 검색 결과를 (항목, 코사인 유사도) 목록으로 변환"""
+        if index is None or not index.ntotal or not len(embeddings):
+            return [[] for _ in range(len(embeddings))]
+        scores, indices = index.search(embeddings, min(k, index.ntotal))
+        return [
+            [(data[idx], float(score)) for idx, score in zip(row_indices, row_scores) if idx >= 0]
+            for row_indices, row_scores in zip(indices, scores)
+        ]
+
+    def _table_results(self, embeddings, k):
+        return [
+            [{'table': table, 'description': desc, 'similarity_score': score}
+             for (table, desc), score in hits]
+            for hits in self._search(self.table_index, self.table_data, embeddings, k)
+        ]
+
+    def _column_results(self, embeddings, k):
+        return [
+            [{'table': table, 'column': column, 'description': desc, 'similarity_score': score}
+             for (table, column, desc), score in hits]
+            for hits in self._search(self.column_index, self.column_data, embeddings, k)
+        ]
 
     def search_tables(self, query, k=5):
         """테이블 레벨 검색"""
-        query_embedding = self.model.encode([query], convert_to_numpy=True)
-        distances, indices = self.table_index.search(query_embedding.astype('float32'), k)
-        
-        results = []
-        for idx, distance in zip(indices[0], distances[0]):
-            table, desc = self.table_data[idx]
-            results.append({
-                'table': table,
-                'description': desc,
-                'similarity_score': float(1 / (1 + distance))  # 거리를 유사도로 변환
-            })
-        
-        return results
+        return self.search_tables_many([query], k)[0]
+
+    def search_tables_many(self, queries, k=5):
+        """여러 질문의 테이블 레벨 검색 (한 번에 인코딩 및 검색)"""
+        return self._table_results(self.encode_queries(queries), k)
 
     def search_columns(self, query, k=10):
         """컬럼 레벨 검색"""
-        query_embedding = self.model.encode([query], convert_to_numpy=True)
-        distances, indices = self.column_index.search(query_embedding.astype('float32'), k)
-        
-        results = []
-        for idx, distance in zip(indices[0], distances[0]):
-            table, column, desc = self.column_data[idx]
-            results.append({
-                'table': table,
-                'column': column,
-                'description': desc,
-                'similarity_score': float(1 / (1 + distance))
-            })
-        
-        return results
+        return self.search_columns_many([query], k)[0]
+
+    def search_columns_many(self, queries, k=10):
+        """여러 질문의 컬럼 레벨 검색 (한 번에 인코딩 및 검색)"""
+        return self._column_results(self.encode_queries(queries), k)
 
     def search_schema(self, query, table_k=3, column_k=5):
         """통합 스키마 검색 (테이블 + 컬럼)"""
-        table_results = self.search_tables(query, table_k)
-        column_results = self.search_columns(query, column_k)
-        
+        return self.search_schema_many([query], table_k, column_k)[0]
+
+    def search_schema_many(self, queries, table_k=3, column_k=5):
+        """여러 질문의 통합 스키마 검색 (질문당 한 번만 인코딩)"""
+        embeddings = self.encode_queries(queries)
+        return [
+            self._merge_schema_results(table_results, column_results)
+            for table_results, column_results in zip(
+                self._table_results(embeddings, table_k),
+                self._column_results(embeddings, column_k)
+            )
+        ]
+
+    @staticmethod
+    def _merge_schema_results(table_results, column_results):
+        """테이블/컬럼 검색 결과를 테이블 단위로 병합"""
         # 테이블 단위로 정리
         table_columns = {}
         
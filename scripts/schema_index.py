@@ -0,0 +1,188 @@
+import re
+from collections import defaultdict
+from cache import LRUCache
+
+class SchemaInvertedIndex:
+    """테이블/컬럼 이름과 설명에 대한 역색인 (한글 문자 n-gram + 영문 토큰)"""
+    # 필드별 기본 가중치
+    FIELD_WEIGHTS = {
+        'table_name': 2.0,
+        'description': 1.5,
+        'column_name': 1.0,
+    }
+    _run_pattern = re.compile(r'[가-힣]+|[a-z0-9]+')
+    ASCII_GRAM = 3          # 영문 색인어의 부분 문자열 맵에 넣는 최대 길이
+    ASCII_MEMO_SIZE = 4096  # 영문 부분 문자열 조회 결과 보관 수 (사용자 입력 기준이므로 상한 유지)
+
+    def __init__(self, metadata):
+        self.docs = []                    # 문서 id -> (테이블, 컬럼, 필드, 소문자 텍스트)
+        self.postings = defaultdict(set)  # 색인어 -> 문서 id 집합
+        self._ascii_terms = self._ascii_memo()  # 영문 부분 문자열 -> 해당 문자열을 포함하는 색인어 (조회 시 채움)
+        self._table_docs = defaultdict(list)  # 테이블 -> 문서 id 목록
+        for table, details in metadata.items():
+            self._add_table(table, details)
+        self._index_vocabulary()
+
+    @classmethod
+    def _ascii_memo(cls):
+        return LRUCache(max_entries=cls.ASCII_MEMO_SIZE, ttl=None)
+
+    def __getstate__(self):
+        # 조회 메모는 잠금을 포함하므로 스냅샷에서 제외
+        state = dict(self.__dict__)
+        state.pop('_ascii_terms', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._ascii_terms = self._ascii_memo()
+
+    def _index_vocabulary(self):
+        """영문 색인어 목록과 부분 문자열(최대 ASCII_GRAM 글자) -> 색인어 맵 구성"""
+        self._vocabulary = [term for term in self.postings if term.isascii()]
+        grams = defaultdict(set)
+        for term in self._vocabulary:
+            for n in range(1, self.ASCII_GRAM + 1):
+                for i in range(len(term) - n + 1):
+                    grams[term[i:i + n]].add(term)
+        self._ascii_grams = dict(grams)
+
+    def _add_table(self, table, details):
+        """테이블 이름, 설명 및 컬럼 문서 등록"""
+        self._add(table, None, 'table_name', table)
+        self._add(table, None, 'description', details.get('description', ''))
+        for column, col_info in details.get('columns', {}).items():
+            self._add(table, column, 'column_name', column)
+            self._add(table, column, 'description', col_info.get('description', ''))
+
+    def updated(self, metadata, tables):
+        """지정한 테이블만 다시 색인한 새 인덱스 (기존 인덱스는 조회 중에도 그대로 유지)"""
+        index = SchemaInvertedIndex.__new__(SchemaInvertedIndex)
+        index.docs = list(self.docs)
+        index.postings = defaultdict(set, {term: set(docs) for term, docs in self.postings.items()})
+        index._ascii_terms = index._ascii_memo()
+        index._table_docs = defaultdict(list, {table: list(ids) for table, ids in self._table_docs.items()})
+        for table in tables:
+            # 기존 문서 제거 (id는 재사용하지 않음)
+            for doc_id in index._table_docs.pop(table, []):
+                text = index.docs[doc_id][3]
+                for term in index._terms(text):
+                    docs = index.postings.get(term)
+                    if docs is not None:
+                        docs.discard(doc_id)
+                        if not docs:
+                            del index.postings[term]
+                index.docs[doc_id] = None
+            if table in metadata:
+                index._add_table(table, metadata[table])
+        index._index_vocabulary()
+        return index
+
+    @classmethod
+    def _runs(cls, text):
+        """한글 연속 구간과 영문/숫자 토큰 분리"""
+        return cls._run_pattern.findall(text.lower())
+
+    @staticmethod
+    def _grams(run):
+        """한글 구간의 문자 bigram (한 글자는 그대로)"""
+        if len(run) < 2:
+            return [run]
+        return [run[i:i + 2] for i in range(len(run) - 1)]
+
+    def _add(self, table, column, field, text):
+        """문서 등록"""
+        text = (text or '').strip().lower()
+        if not text:
+            return
+        doc_id = len(self.docs)
+        self.docs.append((table, column, field, text))
+        self._table_docs[table].append(doc_id)
+        for term in self._terms(text):
+            self.postings[term].add(doc_id)
+
+    def _terms(self, text):
+        """문서 색인어 (영문 토큰, 한글 unigram/bigram)"""
+        terms = set()
+        for run in self._runs(text):
+            if run.isascii():
+                terms.add(run)
+            else:
+                # 한 글자 키워드도 찾을 수 있도록 unigram 함께 색인
+                terms.update(run)
+                terms.update(self._grams(run))
+        return terms
+
+    def _ascii_postings(self, run):
+        """영문 조각을 포함하는 모든 토큰의 문서 집합 (부분 문자열 매칭)"""
+        terms = self._ascii_terms.get(run)
+        if terms is None:
+            n = self.ASCII_GRAM
+            if len(run) <= n:
+                terms = list(self._ascii_grams.get(run, ()))
+            else:
+                # 조각의 모든 n-gram을 포함하는 색인어만 확인
+                sets = sorted((self._ascii_grams.get(run[i:i + n], set()) for i in range(len(run) - n + 1)), key=len)
+                terms = [term for term in set(sets[0]).intersection(*sets[1:]) if run in term]
+            self._ascii_terms.set(run, terms)
+        docs = set()
+        for term in terms:
+            docs |= self.postings[term]
+        return docs
+
+    def _candidates(self, keyword):
+        """색인어 교집합으로 후보 문서 선별"""
+        sets = []
+        for run in self._runs(keyword):
+            if run.isascii():
+                sets.append(self._ascii_postings(run))
+            else:
+                sets.extend(self.postings.get(gram, set()) for gram in self._grams(run))
+        if not sets:
+            # 색인되지 않는 문자(기호 등)만 있는 경우 전체 문서에서 확인
+            return {doc_id for doc_id, doc in enumerate(self.docs) if doc is not None}
+        sets.sort(key=len)
+        candidates = set(sets[0])
+        for docs in sets[1:]:
+            candidates &= docs
+            if not candidates:
+                break
+        return candidates
+
+    def lookup(self, keyword, fields=None):
+        """키워드를 부분 문자열로 포함하는 문서의 (테이블, 컬럼, 가중치) 목록"""
+        keyword = keyword.strip().lower()
+        if not keyword:
+            return []
+        postings = []
+        for doc_id in sorted(self._candidates(keyword)):
+            table, column, field, text = self.docs[doc_id]
+            if fields and field not in fields:
+                continue
+            # n-gram 교집합은 순서를 보장하지 않으므로 원문으로 최종 확인
+            if keyword in text:
+                postings.append((table, column, self.FIELD_WEIGHTS[field]))
+        return postings
+
+    def tables(self, keyword, fields=None):
+        """키워드가 등장하는 테이블 집합"""
+        return {table for table, _, _ in self.lookup(keyword, fields)}
+
+    def search(self, keywords, fields=None, weights=None):
+        """여러 키워드의 점수 합산 (키워드마다 테이블별로 필드당 한 번 가산)"""
+        weights = dict(self.FIELD_WEIGHTS, **(weights or {}))
+        scores = defaultdict(float)
+        for keyword in keywords:
+            keyword = keyword.strip().lower()
+            if not keyword:
+                continue
+            matched = set()
+            for doc_id in self._candidates(keyword):
+                table, _, field, text = self.docs[doc_id]
+                if fields and field not in fields:
+                    continue
+                if (table, field) not in matched and keyword in text:
+                    matched.add((table, field))
+            for table, field in matched:
+                scores[table] += weights[field]
+        return dict(scores)
@@ -0,0 +1,186 @@
+import os
+import re
+import json
+import threading
+from json_schema_loader import JsonSchemaLoader
+from join_planner import JoinPlanner
+from keyword_matcher import KeywordMatcher
+from schema_snapshot import content_hash
+
+def diff_metadata(old, new):
+    """테이블/컬럼 단위 메타데이터 변경 사항"""
+    diff = {
+        'added_tables': sorted(set(new) - set(old)),
+        'removed_tables': sorted(set(old) - set(new)),
+        'changed_tables': {},
+    }
+    for table in sorted(set(old) & set(new)):
+        old_columns, new_columns = old[table]['columns'], new[table]['columns']
+        changes = {
+            'description': old[table].get('description') != new[table].get('description'),
+            'added_columns': sorted(set(new_columns) - set(old_columns)),
+            'removed_columns': sorted(set(old_columns) - set(new_columns)),
+            'changed_columns': sorted(
+                col for col in set(old_columns) & set(new_columns)
+                if old_columns[col] != new_columns[col]
+            ),
+            # 순서만 바뀐 경우에도 프롬프트 조각은 다시 계산
+            'column_order': list(old_columns) != list(new_columns),
+        }
+        if any(changes.values()):
+            diff['changed_tables'][table] = changes
+    return diff
+
+def affected_tables(diff):
+    """변경의 영향을 받는 테이블 목록"""
+    return diff['added_tables'] + diff['removed_tables'] + list(diff['changed_tables'])
+
+class SchemaReloader:
+    """데이터 명세서/키워드 매핑 파일 변경을 감지하여 실행 중인 앱에 증분 반영"""
+    def __init__(self, app, interval=2.0):
+        self.app = app
+        self.interval = interval
+        self.paths = {'json': app.json_path, 'mapping': app.mapping_path}
+        self._signatures = self._read_signatures()
+        self._lock = threading.Lock()  # 재적재 작업끼리만 직렬화 (요청 처리는 잠그지 않음)
+        self._stop = threading.Event()
+        self._thread = None
+        self.reloads = 0
+        self.last_diff = None
+        self.last_error = None
+
+    def _read_signatures(self):
+        """파일별 (수정 시각, 크기)"""
+        signatures = {}
+        for name, path in self.paths.items():
+            try:
+                stat = os.stat(path)
+                signatures[name] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                signatures[name] = None
+        return signatures
+
+    def start(self):
+        """백그라운드 감시 시작"""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self):
+        """파일이 바뀌었으면 재적재 (변경 내용 반환)"""
+        signatures = self._read_signatures()
+        if signatures == self._signatures:
+            return None
+        changed = {name for name in signatures if signatures[name] != self._signatures.get(name)}
+        return self.reload(mapping_changed='mapping' in changed, signatures=signatures)
+
+    def reload(self, mapping_changed=False, signatures=None):
+        """메타데이터 비교 후 영향받는 구성 요소만 다시 만들어 교체"""
+        with self._lock:
+            try:
+                diff = self._reload(mapping_changed)
+            except Exception as e:
+                # 잘못된 JSON 등은 기존 상태를 유지하고 다음 변경을 기다림
+                print(f"스키마 재적재 중 오류: {str(e)}")
+                self.last_error = str(e)
+                self._signatures = signatures or self._read_signatures()
+                return None
+            self._signatures = signatures or self._read_signatures()
+            self.last_diff = diff
+            self.last_error = None
+            return diff
+
+    def _reload(self, mapping_changed):
+        app = self.app
+        generator = app.query_generator
+        old_loader = app.json_loader
+
+        with open(self.paths['json'], 'r', encoding='utf-8') as f:
+            raw_data = json.load(f)
+        metadata = JsonSchemaLoader.parse_metadata(raw_data)
+        diff = diff_metadata(old_loader.metadata, metadata)
+        diff['mapping_changed'] = mapping_changed
+        tables = affected_tables(diff)
+        if not tables and not mapping_changed:
+            return diff
+
+        # 변경 없는 테이블은 기존 메타데이터 객체 재사용
+        for table in metadata:
+            if table not in tables:
+                metadata[table] = old_loader.metadata[table]
+
+        # 1. 메타데이터, 관계 그래프, 역색인 (변경 테이블만 재색인)
+        loader = old_loader.updated(raw_data, metadata, tables)
+        # 2. 키워드 오토마톤 (실패 링크가 전체 패턴에 걸쳐 있으므로 재구성)
+        keyword_matcher = KeywordMatcher.from_sources(self.paths['mapping'], metadata)
+        # 3. 프롬프트 조각 (변경 테이블만 재계산)
+        context_builder = generator.context_builder.updated(loader, tables)
+        # 4. 조인 경로 (DB 스키마 캐시 재사용)
+        try:
+            schema_info = app.db_connector.get_full_schema()
+        except Exception:
+            schema_info = None
+        join_planner = JoinPlanner.from_sources(metadata, schema_info, loader.relation_graph)
+        # 5. 설명 임베딩 (바뀐 설명만 재인코딩)
+        # 유사 질문 캐시와 하이브리드 검색기가 공유하는 임베딩 모델 (둘 중 하나만 사용해도 갱신)
+        embedder = app.embedder
+        if embedder is not None and tables:
+            if embedder.is_ready:
+                diff['reencoded'] = embedder.refresh_index(loader)
+            else:
+                # 준비 중이면 준비 스레드가 새 메타데이터로 구축
+                embedder.json_loader = loader
+
+        # 6. 테이블 검색기 BM25 색인
+        retriever = generator.retriever.updated(loader) if generator.retriever is not None else None
+
+        # 새 객체를 모두 만든 뒤 참조만 교체 (처리 중인 요청은 기존 객체로 끝까지 진행)
+        app.json_loader = loader
+        app.db_connector.set_json_loader(loader, join_planner)
+        generator.json_loader = loader
+        generator.keyword_matcher = keyword_matcher
+        generator.context_builder = context_builder
+        generator.retriever = retriever
+        # 값 색인 (명세서의 범주형 값 반영, DB에서 읽은 값은 유지)
+        if generator.value_index is not None and tables:
+            generator.value_index.set_metadata(metadata)
+
+        diff['invalidated'] = self._invalidate_caches(tables, mapping_changed)
+        self.reloads += 1
+
+        # 다음 시작 시 사용할 스냅샷 갱신
+        if app.snapshot_path:
+            # 임베딩 준비 전이면 임베딩 없이 저장 (준비 완료 시 새 해시로 다시 저장)
+            app.snapshot_source_hash = content_hash([self.paths['json'], self.paths['mapping']])
+            app._write_snapshot(app.snapshot_source_hash, app.schema_db_hash, embedder)
+        return diff
+
+    def _invalidate_caches(self, tables, mapping_changed):
+        """변경 테이블을 참조하는 SQL 캐시 항목 제거 (매핑 변경 시 전체)"""
+        app = self.app
+        generator = app.query_generator
+        if mapping_changed or not tables:
+            # 키워드 확장은 모든 질의에 영향
+            is_affected = lambda sql: True
+        else:
+            pattern = re.compile(r'\b(' + '|'.join(re.escape(t) for t in tables) + r')\b', re.IGNORECASE)
+            is_affected = lambda sql: bool(pattern.search(sql or ''))
+
+        counts = {'memory': generator.response_cache.invalidate_where(lambda key, sql: is_affected(sql))}
+        if generator.semantic_cache:
+            counts['semantic'] = generator.semantic_cache.invalidate_where(lambda question, sql: is_affected(sql))
+        if generator.persistent_cache:
+            # 스키마 지문이 바뀌므로 영향받지 않는 항목은 새 지문으로 이전
+            counts['persistent'] = generator.persistent_cache.migrate(
+                app._schema_fingerprint(), keep=lambda question, sql: not is_affected(sql)
+            )
+        return counts
@@ -0,0 +1,306 @@
+import os
+import json
+import mmap
+import time
+import pickle
+import struct
+import hashlib
+import argparse
+import numpy as np
+from json_schema_loader import JsonSchemaLoader
+from keyword_matcher import KeywordMatcher
+from context_builder import SchemaContextBuilder
+
+MAGIC = b"NL2SQLSS"
+FORMAT_VERSION = 1
+ALIGNMENT = 64  # 임베딩 배열 정렬 단위 (mmap 후 그대로 사용)
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# 스냅샷에 저장되는 객체를 만드는 모듈 (코드가 바뀌면 스냅샷 재생성)
+CODE_MODULES = (
+    "json_schema_loader.py",
+    "schema_index.py",
+    "keyword_matcher.py",
+    "context_builder.py",
+    "utils.py",
+    "schema_snapshot.py",
+    "schema_embedder.py",
+    "cache.py",
+    "join_planner.py",
+    "value_index.py",
+)
+
+def content_hash(paths):
+    """파일 내용 해시 (없는 파일은 빈 내용으로 처리)"""
+    digest = hashlib.sha256()
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(b"<missing>")
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def code_hash():
+    """스냅샷 구성 코드의 해시"""
+    return content_hash([os.path.join(SCRIPT_DIR, name) for name in CODE_MODULES])
+
+def _plain(value):
+    """SQLAlchemy 타입 등 버전에 묶이는 객체를 기본 자료형으로 변환"""
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+def _state(obj, exclude=()):
+    """객체 속성 (메서드 캐시 및 참조 객체 제외)"""
+    return {
+        key: value for key, value in vars(obj).items()
+        if key != '_method_caches' and key not in exclude
+    }
+
+def _restore(cls, state, **refs):
+    """__init__ 없이 저장된 속성으로 객체 복원"""
+    obj = cls.__new__(cls)
+    obj.__dict__.update(state)
+    obj.__dict__.update(refs)
+    return obj
+
+def write_snapshot(path, json_loader, keyword_matcher, context_builder, source_hash,
+                   schema_info=None, db_hash=None, embedder=None):
+    """스키마 스냅샷 파일 저장 (헤더 + 섹션별 pickle/float32 배열)"""
+    sections = {
+        'json_schema': pickle.dumps(_state(json_loader), protocol=pickle.HIGHEST_PROTOCOL),
+        'keyword_matcher': pickle.dumps(_state(keyword_matcher), protocol=pickle.HIGHEST_PROTOCOL),
+        'prompt_fragments': pickle.dumps(
+            _state(context_builder, exclude=('json_loader',)), protocol=pickle.HIGHEST_PROTOCOL
+        ),
+    }
+    if schema_info is not None:
+        sections['db_schema'] = pickle.dumps(_plain(schema_info), protocol=pickle.HIGHEST_PROTOCOL)
+
+    arrays = {}
+    # 인덱스 구축/갱신 중이면 끝날 때까지 기다려 두 인덱스를 같은 시점 기준으로 저장
+    exported = embedder.export_index() if embedder is not None else None
+    if exported is not None:
+        table_data, column_data, table_vectors, column_vectors = exported
+        sections['embedding_entries'] = pickle.dumps({
+            'table_data': table_data,
+            'column_data': column_data,
+        }, protocol=pickle.HIGHEST_PROTOCOL)
+        for name, vectors in (('table_embeddings', table_vectors), ('column_embeddings', column_vectors)):
+            arrays[name] = np.ascontiguousarray(vectors, dtype=np.float32)
+
+    # 섹션 배치 (헤더 크기를 알 수 없으므로 상대 위치로 계산 후 보정)
+    layout, blobs, cursor = {}, [], 0
+    for name, data in sections.items():
+        layout[name] = {'kind': 'pickle', 'offset': cursor, 'length': len(data),
+                        'sha256': hashlib.sha256(data).hexdigest()}
+        blobs.append(data)
+        cursor += len(data)
+    for name, array in arrays.items():
+        padding = -cursor % ALIGNMENT
+        blobs.append(b"\0" * padding)
+        cursor += padding
+        data = array.tobytes()
+        layout[name] = {'kind': 'array', 'offset': cursor, 'length': len(data),
+                        'dtype': 'float32', 'shape': list(array.shape),
+                        'sha256': hashlib.sha256(data).hexdigest()}
+        blobs.append(data)
+        cursor += len(data)
+
+    header = {
+        'format_version': FORMAT_VERSION,
+        'created_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'source_hash': source_hash,
+        'code_hash': code_hash(),
+        'db_hash': db_hash,
+        'content_hash': hashlib.sha256(
+            "".join(layout[name]['sha256'] for name in sorted(layout)).encode()
+        ).hexdigest(),
+        'sections': layout,
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    prefix_length = len(MAGIC) + 8 + len(header_bytes)
+    base = prefix_length + (-prefix_length % ALIGNMENT)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<II", FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (base - prefix_length))
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, path)
+    return header
+
+class SchemaSnapshot:
+    """mmap으로 여는 스키마 스냅샷 (섹션은 필요할 때 역직렬화)"""
+    def __init__(self, path, verify=True):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self._mm[:len(MAGIC)] != MAGIC:
+                raise ValueError("스냅샷 파일 형식이 아닙니다.")
+            version, header_length = struct.unpack_from("<II", self._mm, len(MAGIC))
+            if version != FORMAT_VERSION:
+                raise ValueError(f"지원하지 않는 스냅샷 버전: {version}")
+            start = len(MAGIC) + 8
+            self.header = json.loads(self._mm[start:start + header_length].decode('utf-8'))
+            prefix_length = start + header_length
+            self._base = prefix_length + (-prefix_length % ALIGNMENT)
+            if verify:
+                self.verify()
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def source_hash(self):
+        return self.header.get('source_hash')
+
+    @property
+    def db_hash(self):
+        return self.header.get('db_hash')
+
+    def is_current(self, source_hash):
+        """데이터 명세서/매핑 파일과 구성 코드가 스냅샷과 같은지 확인"""
+        return self.source_hash == source_hash and self.header.get('code_hash') == code_hash()
+
+    def has(self, name):
+        return name in self.header['sections']
+
+    def _view(self, name):
+        info = self.header['sections'][name]
+        start = self._base + info['offset']
+        return info, start, start + info['length']
+
+    def verify(self):
+        """섹션별 내용 해시 확인"""
+        for name in self.header['sections']:
+            info, start, end = self._view(name)
+            if hashlib.sha256(self._mm[start:end]).hexdigest() != info['sha256']:
+                raise ValueError(f"스냅샷 섹션 해시 불일치: {name}")
+
+    def section(self, name):
+        """pickle 섹션 역직렬화"""
+        _, start, end = self._view(name)
+        return pickle.loads(self._mm[start:end])
+
+    def array(self, name):
+        """float32 배열 섹션 (mmap 영역을 복사 없이 참조, 읽기 전용)"""
+        info, start, _ = self._view(name)
+        count = int(np.prod(info['shape']))
+        return np.frombuffer(self._mm, dtype=info['dtype'], count=count, offset=start).reshape(info['shape'])
+
+    def restore_loader(self):
+        """JsonSchemaLoader 복원 (메타데이터, 관계 그래프, 역색인)"""
+        return _restore(JsonSchemaLoader, self.section('json_schema'))
+
+    def restore_keyword_matcher(self):
+        return _restore(KeywordMatcher, self.section('keyword_matcher'))
+
+    def restore_context_builder(self, json_loader):
+        return _restore(SchemaContextBuilder, self.section('prompt_fragments'), json_loader=json_loader)
+
+    def db_schema(self):
+        """저장된 실제 DB 스키마 (없으면 None)"""
+        return self.section('db_schema') if self.has('db_schema') else None
+
+    def apply_embeddings(self, embedder):
+        """저장된 설명 임베딩으로 SchemaEmbedder 인덱스 구성 (재인코딩 생략)"""
+        if not self.has('embedding_entries'):
+            return False
+        entries = self.section('embedding_entries')
+        embedder.table_data = list(entries['table_data'])
+        embedder.column_data = list(entries['column_data'])
+        for name, attr in (('table_embeddings', 'table_index'), ('column_embeddings', 'column_index')):
+            setattr(embedder, attr, embedder.index_from_vectors(self.array(name)))
+        return True
+
+    def close(self):
+        mm = getattr(self, '_mm', None)
+        if mm is not None:
+            try:
+                mm.close()
+            except BufferError:
+                # 배열이 아직 mmap 영역을 참조하는 경우 GC에 맡김
+                pass
+        self._file.close()
+
+def open_snapshot(path, source_hash):
+    """최신 스냅샷이면 열어서 반환 (없거나 해시가 다르면 None)"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        snapshot = SchemaSnapshot(path)
+    except Exception as e:
+        print(f"스냅샷 로드 중 오류: {str(e)}")
+        return None
+    if not snapshot.is_current(source_hash):
+        snapshot.close()
+        return None
+    return snapshot
+
+def compile_snapshot(output, json_path, mapping_path, db_connector=None, embedder=None):
+    """전체 구성 후 스냅샷 저장"""
+    json_loader = embedder.json_loader if embedder else JsonSchemaLoader(json_path)
+    keyword_matcher = KeywordMatcher.from_sources(mapping_path, json_loader.metadata)
+    context_builder = SchemaContextBuilder(json_loader)
+    schema_info, db_hash = None, None
+    if db_connector is not None:
+        db_connector.json_loader = json_loader
+        db_hash = db_connector.schema_probe_hash()
+        schema_info = db_connector.get_full_schema()
+    if embedder is not None:
+        embedder.build_index()
+    return write_snapshot(
+        output, json_loader, keyword_matcher, context_builder,
+        source_hash=content_hash([json_path, mapping_path]),
+        schema_info=schema_info, db_hash=db_hash, embedder=embedder
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="스키마 스냅샷 컴파일/확인")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compile_parser = subparsers.add_parser("compile", help="스냅샷 생성")
+    compile_parser.add_argument("--output", default="./cache/schema_snapshot.bin")
+    compile_parser.add_argument("--json", default="./docs/data_discription.json")
+    compile_parser.add_argument("--mapping", default="./mapping/keyword_mapping.json")
+    compile_parser.add_argument("--no-db", action="store_true", help="DB 스키마 반영 생략")
+    compile_parser.add_argument("--embeddings", action="store_true", help="설명 임베딩 포함")
+    compile_parser.add_argument("--embedding-cache", default="./cache/schema_embeddings", help="설명 임베딩 저장 디렉터리")
+    info_parser = subparsers.add_parser("info", help="스냅샷 헤더 출력")
+    info_parser.add_argument("path", nargs="?", default="./cache/schema_snapshot.bin")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        start = time.perf_counter()
+        snapshot = SchemaSnapshot(args.path)
+        loaded_ms = (time.perf_counter() - start) * 1000
+        print(json.dumps(snapshot.header, ensure_ascii=False, indent=2))
+        print(f"로드 및 검증: {loaded_ms:.2f}ms")
+        snapshot.close()
+    else:
+        db_connector = None
+        if not args.no_db:
+            from dotenv import load_dotenv
+            from db_connector import DatabaseConnector
+            load_dotenv()
+            connection_string = (
+                f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
+                f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+            )
+            db_connector = DatabaseConnector(connection_string, None)
+        embedder = None
+        if args.embeddings:
+            from schema_embedder import SchemaEmbedder
+            embedder = SchemaEmbedder(JsonSchemaLoader(args.json), cache_dir=args.embedding_cache)
+        header = compile_snapshot(args.output, args.json, args.mapping, db_connector, embedder)
+        print(f"스냅샷 저장: {args.output} ({', '.join(header['sections'])})")
@@ -0,0 +1,118 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+
+class SemanticCache:
+    """질문 임베딩 유사도 기반 SQL 캐시"""
+    def __init__(self, embedder, threshold=0.92, max_entries=1000, ttl=3600, k=5):
+        self.embedder = embedder          # SchemaEmbedder (다국어 임베딩 모델 재사용)
+        self.threshold = threshold        # 캐시 적중 최소 코사인 유사도
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.k = k
+        self.index = None
+        self.entries = OrderedDict()      # id -> 캐시 항목 (LRU 순서)
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        """임베딩 모델 준비 여부 (준비 전에는 캐시를 거치지 않음)"""
+        return self.embedder.is_ready
+
+    @staticmethod
+    def _numbers(question):
+        """질문에 포함된 숫자 (버전, 순위 등)"""
+        return frozenset(re.findall(r'\d+', question))
+
+    def encode(self, question):
+        """질문 임베딩 (정규화하여 내적이 코사인 유사도가 되도록, 스키마 검색과 캐시 공유)"""
+        return self.embedder.encode_query(question)
+
+    def _remove(self, entry_ids):
+        """인덱스와 항목에서 제거"""
+        if not entry_ids:
+            return
+        self.index.remove_ids(np.array(entry_ids, dtype='int64'))
+        for entry_id in entry_ids:
+            self.entries.pop(entry_id, None)
+
+    def _evict(self):
+        """만료 항목 및 용량 초과 항목 제거"""
+        now = time.time()
+        expired = [i for i, e in self.entries.items() if now - e['time'] >= self.ttl]
+        self._remove(expired)
+        overflow = len(self.entries) - self.max_entries
+        if overflow > 0:
+            self._remove(list(self.entries.keys())[:overflow])
+
+    def lookup(self, question, embedding=None):
+        """유사한 질문의 캐시된 SQL 반환"""
+        if self.index is None or not self.entries:
+            return None
+        if embedding is None:
+            embedding = self.encode(question)
+
+        with self._lock:
+            if not self.entries:
+                return None
+            k = min(self.k, len(self.entries))
+            scores, ids = self.index.search(embedding, k)
+            numbers = self._numbers(question)
+            now = time.time()
+            expired = []
+            result = None
+            for score, entry_id in zip(scores[0], ids[0]):
+                if entry_id < 0 or score < self.threshold:
+                    break
+                entry = self.entries.get(int(entry_id))
+                if entry is None:
+                    continue
+                if now - entry['time'] >= self.ttl:
+                    expired.append(int(entry_id))
+                    continue
+                # 숫자가 다른 질문(예: 46 버전 / 45 버전)은 다른 쿼리
+                if entry['numbers'] != numbers:
+                    continue
+                self.entries.move_to_end(int(entry_id))
+                result = entry['sql']
+                break
+            self._remove(expired)
+            return result
+
+    def add(self, question, sql, embedding=None):
+        """질문과 생성된 SQL 저장"""
+        if embedding is None:
+            embedding = self.encode(question)
+
+        with self._lock:
+            if self.index is None:
+                import faiss
+                self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(embedding.shape[1]))
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self.index.add_with_ids(embedding, np.array([entry_id], dtype='int64'))
+            self.entries[entry_id] = {
+                'question': question,
+                'sql': sql,
+                'numbers': self._numbers(question),
+                'time': time.time()
+            }
+            self._evict()
+
+    def invalidate_where(self, predicate):
+        """predicate(question, sql)가 참인 항목 제거"""
+        with self._lock:
+            removed = [i for i, e in self.entries.items() if predicate(e['question'], e['sql'])]
+            self._remove(removed)
+            return len(removed)
+
+    def clear(self):
+        """캐시 초기화"""
+        with self._lock:
+            if self.index is not None:
+                self.index.reset()
+            self.entries.clear()
@@ -0,0 +1,185 @@
+import re
+
+SQL_KEYWORDS = ('SELECT', 'WITH', 'INSERT', 'WHERE', 'FROM', 'JOIN')
+KEYWORD_LINE = re.compile(r'(%s)\b' % '|'.join(SQL_KEYWORDS), re.IGNORECASE)
+# 키워드로 시작하지만 SQL이 아닌 설명 문장에 흔한 영어 단어 ("From the schema above, ...")
+PROSE_WORDS = {'the', 'an', 'is', 'are', 'these', 'this', 'those', 'that', 'following',
+               'above', 'below', 'here', 'we', 'you', 'will', 'would', 'can', 'should'}
+
+def looks_like_sql(line):
+    """SQL 키워드로 시작하는 한 줄이 설명 문장이 아닌 SQL 형태인지 확인"""
+    # 따옴표/백틱 안의 값은 제외하고 판정
+    text = re.sub(r"'(?:[^'\\]|\\.)*'?|\"(?:[^\"\\]|\\.)*\"?|`[^`]*`?", "''", line).strip()
+    if not KEYWORD_LINE.match(text):
+        return False
+    if re.search(r'[가-힣]', text) or re.search(r'[:.?!]$', text):
+        return False
+    return not any(word in PROSE_WORDS for word in re.findall(r'[a-z]+', text.lower()))
+
+class SQLStreamParser:
+    """LLM 스트리밍 응답에서 SQL을 점진적으로 추출하는 파서"""
+    def __init__(self):
+        self.mode = 'preamble'   # preamble: SQL 시작 전, sql: SQL 본문
+        self.fenced = False      # 코드 블록(```) 내부 여부
+        self.done = False        # 문장 완료 또는 코드 블록 종료
+        self._raw = []           # SQL을 찾지 못한 경우를 위한 원본 응답
+        self._line = ''          # preamble 줄 버퍼
+        self._skip_line = False  # SQL이 아닌 줄 건너뛰기
+        self._pending = ''       # 다음 청크까지 판정을 보류한 문자
+        self._quote = None       # 문자열/식별자 따옴표
+        self._escape = False
+        self._comment = None     # 주석 종류('--', '/*')
+        self._prev = ''
+        self._started = False    # SQL 첫 글자 출력 여부
+
+    def feed(self, chunk):
+        """청크를 처리하고 새로 확정된 SQL 조각 반환"""
+        if self.done or not chunk:
+            return ''
+        self._raw.append(chunk)
+        return self._consume(chunk)
+
+    def _consume(self, chunk):
+        text = self._pending + chunk
+        self._pending = ''
+        out = []
+        i = 0
+
+        while i < len(text) and not self.done:
+            if self.mode == 'preamble':
+                text, i = self._scan_preamble(text, i)
+                continue
+
+            ch = text[i]
+            # 주석 내부
+            if self._comment:
+                out.append(ch)
+                if self._comment == '--' and ch == '\n':
+                    self._comment = None
+                elif self._comment == '/*' and ch == '/' and self._prev == '*':
+                    self._comment = None
+                self._prev = ch
+                i += 1
+                continue
+
+            # 문자열 / 백틱 식별자 내부
+            if self._quote:
+                out.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\' and self._quote != '`':
+                    self._escape = True
+                elif ch == self._quote:
+                    self._quote = None
+                self._prev = ch
+                i += 1
+                continue
+
+            if ch == '`':
+                rest = text[i:i + 3]
+                if rest == '```':
+                    self.done = True
+                    break
+                if len(rest) < 3 and rest == '`' * len(rest) and i + len(rest) == len(text):
+                    # 코드 블록 종료 여부는 다음 청크에서 판정
+                    self._pending = rest
+                    break
+                self._quote = '`'
+            elif ch in ('-', '/') and i + 1 == len(text):
+                # 주석 시작 여부는 다음 청크에서 판정
+                self._pending = ch
+                break
+            elif ch == '-' and text[i + 1] == '-':
+                self._comment = '--'
+            elif ch == '/' and text[i + 1] == '*':
+                self._comment = '/*'
+            elif ch == '#':
+                self._comment = '--'
+            elif ch in ("'", '"'):
+                self._quote = ch
+            elif ch == ';':
+                out.append(ch)
+                self.done = True
+                break
+
+            if not self._started and ch.isspace():
+                i += 1
+                continue
+            self._started = True
+            out.append(ch)
+            self._prev = ch
+            i += 1
+
+        return ''.join(out)
+
+    def _scan_preamble(self, text, i):
+        """SQL 시작 전 텍스트를 줄 단위로 판정"""
+        nl = text.find('\n', i)
+        end = len(text) if nl < 0 else nl + 1
+
+        if self._skip_line:
+            self._skip_line = nl < 0
+            return text, end
+
+        self._line += text[i:end]
+        stripped = self._line.lstrip()
+        upper = stripped.upper()
+
+        # 코드 블록 시작
+        if stripped.startswith('```'):
+            if nl < 0:
+                return text, end  # 언어 태그 확정 대기
+            rest = stripped[3:]
+            tag = re.match(r'[A-Za-z]+(?=\s|$)', rest)
+            if tag and tag.group().upper() not in SQL_KEYWORDS:
+                # ```sql SELECT ... 처럼 언어 태그 뒤에 SQL이 이어지는 경우 태그 제거
+                rest = rest[tag.end():]
+            self._line = ''
+            self.mode = 'sql'
+            self.fenced = True
+            if rest.strip():
+                # ```SELECT ... 처럼 같은 줄에 SQL이 시작된 경우
+                return rest + text[end:], 0
+            return text, end
+
+        # SQL 키워드로 시작하는 줄 (줄이 끝날 때까지 모아 설명 문장이 아닌지 확인)
+        if KEYWORD_LINE.match(stripped):
+            if nl < 0:
+                return text, end
+            self._line = ''
+            if looks_like_sql(stripped):
+                self.mode = 'sql'
+                return stripped + text[end:], 0
+            return text, end
+
+        # 아직 판정할 수 없는 줄
+        if nl < 0 and (not stripped or '```'.startswith(stripped)
+                       or any(kw.startswith(upper) for kw in SQL_KEYWORDS)):
+            return text, end
+
+        # SQL이 아닌 줄
+        self._line = ''
+        self._skip_line = nl < 0
+        return text, end
+
+    @property
+    def found(self):
+        """SQL 시작 위치 발견 여부"""
+        return self.mode == 'sql'
+
+    def finish(self):
+        """스트림 종료 시 남은 조각 반환"""
+        if self.done:
+            return ''
+        head = ''
+        if self.mode == 'preamble' and self._line.strip():
+            # 줄바꿈 없이 끝난 마지막 줄 판정 (```SELECT ...``` 또는 SQL 한 줄)
+            line, self._line = self._line, ''
+            head = self._consume(line + '\n').rstrip('\n')
+            if self.done:
+                return head
+        self.done = True
+        if self.mode == 'sql':
+            return head + (self._pending if self._started else self._pending.lstrip())
+        # SQL을 찾지 못한 경우 원본 응답 반환
+        return ''.join(self._raw).strip()
@@ -19,10 +19,34 @@ db_config = {
 # TextToSQLApp 초기화
 @st.cache_resource
 def get_app():    
-    return TextToSQLApp(db_config)
+    return TextToSQLApp(
+        db_config,
+        use_semantic_cache=os.getenv("USE_SEMANTIC_CACHE", "false").lower() == "true",
+        trace_path=os.getenv("TRACE_PATH"),
+        metrics_path=os.getenv("METRICS_PATH"),
+        metrics_port=os.getenv("METRICS_PORT"),
+        schema_watch_interval=os.getenv("SCHEMA_WATCH_INTERVAL"),
+        table_retriever=os.getenv("TABLE_RETRIEVER", "keyword"),
+        retrieval_budget_ms=os.getenv("RETRIEVAL_BUDGET_MS"),
+        embedding_workers=os.getenv("EMBEDDING_WORKERS"),
+        embedding_batch_window_ms=os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"),
+        value_refresh_interval=os.getenv("VALUE_INDEX_REFRESH_INTERVAL", "3600"),
+        parallel_schema_reflection=os.getenv("SCHEMA_REFLECTION_PARALLEL", "false").lower() == "true",
+        max_result_rows=os.getenv("MAX_RESULT_ROWS", "10000"),
+        max_result_bytes=os.getenv("MAX_RESULT_BYTES", str(16 * 1024 * 1024)),
+        result_cache_bytes=os.getenv("RESULT_CACHE_BYTES", str(64 * 1024 * 1024)),
+        result_cache_ttl=os.getenv("RESULT_CACHE_TTL", "600")
+    )
 
 app = get_app()
 
+# 임베딩 모델 준비 상태 (준비 전에는 키워드 기반 검색만 사용)
+semantic_status = app.status()['semantic']
+if semantic_status['state'] == 'loading':
+    st.caption("임베딩 모델 준비 중: 유사 질문 캐시는 준비가 끝나면 사용됩니다.")
+elif semantic_status['state'] == 'failed':
+    st.caption(f"임베딩 모델 준비 실패: {semantic_status['error']}")
+
 # 자연어 질의 입력 영역
 
 natural_language_query = st.text_area(
@@ -39,11 +63,19 @@ if st.button("쿼리 생성"):
     if natural_language_query:
         # 진행 상태 표시
         with st.spinner("쿼리 처리 중..."):
-            result = app.process_query(natural_language_query)
-            
-            # 생성된 SQL 쿼리 출력
+            # 생성되는 SQL 쿼리를 실시간으로 출력
+            # (같은 질의를 동시에 요청한 다른 사용자는 생성 완료 후 결과를 공유받음)
             st.subheader("생성된 SQL 쿼리")
-            st.code(result["generated_sql"], language="sql")
+            sql_placeholder = st.empty()
+            streamed = []
+            
+            def show_fragment(fragment):
+                streamed.append(fragment)
+                sql_placeholder.code("".join(streamed), language="sql")
+            
+            # 생성, 검증, 실행을 한 번의 추적 구간에서 처리
+            result = app.process_query(natural_language_query, on_fragment=show_fragment)
+            sql_placeholder.code(result["generated_sql"], language="sql")
             
             # 쿼리 실행 결과 출력 (체크박스가 선택된 경우에만)
             if execute_query:
@@ -54,7 +86,14 @@ if st.button("쿼리 생성"):
                     if not result["execution_result"]:
                         st.info("결과가 없습니다.")
                     else:
+                        if result.get("truncated"):
+                            st.warning(f"결과가 상한({'행 수' if result['truncated_by'] == 'rows' else '크기'})을 넘어 "
+                                       f"처음 {len(result['execution_result'])}개 행만 표시합니다.")
                         st.json(result["execution_result"])
+            
+            # 단계별 소요 시간 출력
+            with st.expander("단계별 소요 시간(ms)"):
+                st.json(result["timings"])
     else:
         st.warning("자연어 질의를 입력해주세요.")
 
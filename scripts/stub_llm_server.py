@@ -0,0 +1,113 @@
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from llm_backend import load_fixtures, match_fixture, split_tokens
+
+class StubLLMServer:
+    """Perplexity 스트리밍 프로토콜(SSE)을 흉내내는 로컬 테스트 서버"""
+    def __init__(self, fixtures_path, host="127.0.0.1", port=8765, latency=0.3, tokens_per_second=50):
+        self.responses, self.default = load_fixtures(fixtures_path)
+        self.latency = latency                       # 첫 토큰까지 지연(초)
+        self.tokens_per_second = tokens_per_second   # 초당 전송 토큰 수
+        self.requests_served = 0
+        self.disconnects = 0                         # 클라이언트의 조기 종료 횟수
+        self._count_lock = threading.Lock()          # 요청 처리 스레드 간 카운터 갱신 보호
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/chat/completions"
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive 연결 재사용
+
+            def log_message(self, format, *args):
+                pass
+
+            def _write_chunk(self, data):
+                body = data.encode('utf-8')
+                self.wfile.write(f"{len(body):x}\r\n".encode() + body + b"\r\n")
+                self.wfile.flush()
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                try:
+                    payload = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    self.send_error(400, "invalid json")
+                    return
+
+                messages = payload.get('messages', [])
+                prompt = messages[-1].get('content', '') if messages else ''
+                response = match_fixture(stub.responses, stub.default, prompt)
+                tokens = split_tokens(response)[:payload.get('max_tokens', 1024)]
+                with stub._count_lock:
+                    stub.requests_served += 1
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                try:
+                    time.sleep(stub.latency)
+                    for token in tokens:
+                        event = {"choices": [{"delta": {"content": token}}]}
+                        self._write_chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n")
+                        if stub.tokens_per_second:
+                            time.sleep(1 / stub.tokens_per_second)
+                    self._write_chunk("data: [DONE]\n\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    # 클라이언트가 스트림을 조기 종료한 경우
+                    with stub._count_lock:
+                        stub.disconnects += 1
+                    self.close_connection = True
+
+        return Handler
+
+    def start(self):
+        """백그라운드 스레드에서 서버 시작"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """현재 스레드에서 서버 실행 (stop 또는 KeyboardInterrupt까지 대기)"""
+        self._server.serve_forever()
+
+    def stop(self):
+        """서버 종료"""
+        self._server.shutdown()
+        self._server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perplexity 스트리밍 API 로컬 스텁 서버")
+    parser.add_argument("--fixtures", default="./benchmarks/fixtures/llm_responses.json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.3, help="첫 토큰까지 지연(초)")
+    parser.add_argument("--tokens-per-second", type=float, default=50)
+    args = parser.parse_args()
+
+    server = StubLLMServer(
+        args.fixtures,
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second
+    )
+    print(f"스텁 서버 실행 중: {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import uuid
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+class Span:
+    """파이프라인 단계별 측정 구간"""
+    def __init__(self, name, trace_id, attrs=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.attrs = dict(attrs or {})
+        self.children = []
+        self.start = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms = None
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+
+    def to_dict(self):
+        data = {
+            'name': self.name,
+            'start': self.start,
+            'duration_ms': round(self.duration_ms or 0.0, 3),
+            'attrs': self.attrs,
+        }
+        if self.error:
+            data['error'] = self.error
+        if self.children:
+            data['spans'] = [child.to_dict() for child in self.children]
+        return data
+
+    def timings(self):
+        """하위 구간 포함 단계별 소요 시간(ms)"""
+        result = {self.name: round(self.duration_ms or 0.0, 3)}
+        for child in self.children:
+            for name, ms in child.timings().items():
+                result[name] = round(result.get(name, 0.0) + ms, 3)
+        return result
+
+@contextmanager
+def span(name, **attrs):
+    """현재 추적 중인 요청의 하위 구간 측정 (추적 중이 아니면 아무것도 하지 않음)"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, parent.trace_id, attrs)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = str(e)
+        raise
+    finally:
+        child.finish()
+        _current_span.reset(token)
+
+def start_span(name, **attrs):
+    """현재 구간의 하위 구간 생성 (제너레이터처럼 실행 흐름이 끊기는 구간용, finish 직접 호출)"""
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    child = Span(name, parent.trace_id, attrs)
+    parent.children.append(child)
+    return child
+
+def annotate(**attrs):
+    """현재 구간에 속성 추가 (캐시 적중 여부, 프롬프트 크기 등)"""
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attrs)
+
+class MetricsRegistry:
+    """Prometheus 텍스트 형식 메트릭 (카운터, 게이지, 히스토그램)"""
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+    SIZE_BUCKETS = (10, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+    def __init__(self, prefix="nl2sql"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)    # (name, labels) -> 값
+        self._gauges = {}                      # (name, labels) -> 현재 값
+        self._histograms = {}                  # (name, labels) -> [buckets, counts, sum, count]
+        self._help = {}
+        self._server = None
+
+    @staticmethod
+    def _labels(labels):
+        return tuple(sorted((labels or {}).items()))
+
+    def inc(self, name, value=1, labels=None, help_text=""):
+        """카운터 증가"""
+        with self._lock:
+            self._help.setdefault(name, (help_text, 'counter'))
+            self._counters[(name, self._labels(labels))] += value
+
+    def set_gauge(self, name, value, labels=None, help_text=""):
+        """게이지 값 설정"""
+        with self._lock:
+            self._help.setdefault(name, (help_text, 'gauge'))
+            self._gauges[(name, self._labels(labels))] = value
+
+    def observe(self, name, value, labels=None, buckets=None, help_text=""):
+        """히스토그램 관측값 기록"""
+        with self._lock:
+            self._help.setdefault(name, (help_text, 'histogram'))
+            key = (name, self._labels(labels))
+            hist = self._histograms.get(key)
+            if hist is None:
+                bounds = tuple(buckets or self.DEFAULT_BUCKETS)
+                hist = self._histograms[key] = [bounds, [0] * len(bounds), 0.0, 0]
+            index = bisect.bisect_left(hist[0], value)
+            if index < len(hist[1]):
+                hist[1][index] += 1
+            hist[2] += value
+            hist[3] += 1
+
+    @staticmethod
+    def _format_labels(labels, extra=None):
+        items = list(labels) + list(extra or [])
+        if not items:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+    def render(self):
+        """Prometheus 노출 형식 텍스트"""
+        lines = []
+        with self._lock:
+            described = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                full = f"{self.prefix}_{name}"
+                if name not in described:
+                    described.add(name)
+                    lines.append(f"# HELP {full} {self._help[name][0]}")
+                    lines.append(f"# TYPE {full} counter")
+                lines.append(f"{full}{self._format_labels(labels)} {value}")
+            for (name, labels), value in sorted(self._gauges.items()):
+                full = f"{self.prefix}_{name}"
+                if name not in described:
+                    described.add(name)
+                    lines.append(f"# HELP {full} {self._help[name][0]}")
+                    lines.append(f"# TYPE {full} gauge")
+                lines.append(f"{full}{self._format_labels(labels)} {value}")
+            for (name, labels), (bounds, counts, total, count) in sorted(self._histograms.items()):
+                full = f"{self.prefix}_{name}"
+                if name not in described:
+                    described.add(name)
+                    lines.append(f"# HELP {full} {self._help[name][0]}")
+                    lines.append(f"# TYPE {full} histogram")
+                cumulative = 0
+                for bound, bucket_count in zip(bounds, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{full}_bucket{self._format_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{full}_bucket{self._format_labels(labels, [('le', '+Inf')])} {count}")
+                lines.append(f"{full}_sum{self._format_labels(labels)} {total}")
+                lines.append(f"{full}_count{self._format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """메트릭 파일 저장 (node_exporter textfile collector 등)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host="0.0.0.0"):
+        """/metrics HTTP 엔드포인트 시작"""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def close(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+class Tracer:
+    """요청 단위 추적 (JSON Lines 내보내기 + 메트릭 집계)"""
+    def __init__(self, trace_path=None, metrics=None, metrics_path=None):
+        self.trace_path = trace_path      # JSON Lines 추적 파일 경로
+        self.metrics = metrics or MetricsRegistry()
+        self.metrics_path = metrics_path  # Prometheus 텍스트 파일 경로
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def trace(self, name, **attrs):
+        """요청 최상위 구간 (종료 시 내보내기)"""
+        root = Span(name, uuid.uuid4().hex, attrs)
+        token = _current_span.set(root)
+        try:
+            yield root
+        except BaseException as e:
+            root.error = str(e)
+            raise
+        finally:
+            root.finish()
+            _current_span.reset(token)
+            self._record(root)
+
+    def _record(self, root):
+        """단계별 메트릭 집계 및 추적 기록 저장"""
+        def visit(span_):
+            self.metrics.observe(
+                "stage_duration_seconds", span_.duration_ms / 1000,
+                labels={'stage': span_.name},
+                help_text="파이프라인 단계별 소요 시간"
+            )
+            attrs = span_.attrs
+            if 'sql_cache' in attrs:
+                self.metrics.inc("sql_cache_total", labels={'result': attrs['sql_cache']},
+                                 help_text="SQL 캐시 조회 결과 (memory/persistent/semantic/miss)")
+            if 'prompt_tokens' in attrs:
+                self.metrics.observe("prompt_tokens", attrs['prompt_tokens'],
+                                     buckets=MetricsRegistry.SIZE_BUCKETS, help_text="LLM 프롬프트 토큰 수(추정)")
+            if 'response_chars' in attrs:
+                self.metrics.observe("response_chars", attrs['response_chars'],
+                                     buckets=MetricsRegistry.SIZE_BUCKETS, help_text="LLM 응답 문자 수")
+            if 'rows_returned' in attrs:
+                self.metrics.observe("rows_returned", attrs['rows_returned'],
+                                     buckets=(0, 1, 10, 100, 1000, 10000), help_text="쿼리 결과 행 수")
+            for child in span_.children:
+                visit(child)
+        visit(root)
+
+        status = 'error' if root.error or root.attrs.get('error') else 'ok'
+        self.metrics.inc("requests_total", labels={'status': status}, help_text="처리한 요청 수")
+
+        if self.trace_path:
+            record = dict(root.to_dict(), trace_id=root.trace_id)
+            line = json.dumps(record, ensure_ascii=False, default=str)
+            with self._lock:
+                with open(self.trace_path, 'a', encoding='utf-8') as f:
+                    f.write(line + "\n")
+        if self.metrics_path:
+            with self._lock:
+                self.metrics.write(self.metrics_path)
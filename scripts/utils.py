@@ -1,24 +1,12 @@
-import hashlib
-import time
-import functools
+import re
 
-def cache_result(expires_after=3600):  # 기본 1시간 캐싱
-    '''함수 실행 결과 캐싱하는 함수'''
-    cache = {}
-    
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            # 함수 호출 정보로 캐시 키 생성
-            key = hashlib.md5(str((func.__name__, args, kwargs)).encode()).hexdigest()
-            
-            # 캐시된 결과가 있고 만료되지 않았으면 반환
-            if key in cache and time.time() - cache[key]['time'] < expires_after:
-                return cache[key]['result']
-            
-            # 함수 실행 및 결과 캐싱
-            result = func(*args, **kwargs)
-            cache[key] = {'result': result, 'time': time.time()}
-            return result
-        return wrapper
-    return decorator
\ No newline at end of file
+def normalize_question(question):
+    '''캐시 키용 자연어 질의 정규화 (공백, 대소문자, 끝 문장부호)'''
+    normalized = re.sub(r'\s+', ' ', question.strip().lower())
+    return normalized.rstrip('?.!。 ')
+
+def estimate_tokens(text):
+    '''LLM 토큰 수 근사치 (영문/숫자 4자당 1토큰, 한글 및 기타 문자 1자당 1토큰)'''
+    ascii_chars = sum(1 for ch in text if ch.isascii() and not ch.isspace())
+    other_chars = sum(1 for ch in text if not ch.isascii() and not ch.isspace())
+    return (ascii_chars + 3) // 4 + other_chars
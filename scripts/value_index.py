@@ -0,0 +1,304 @@
+import re
+import json
+import time
+import threading
+from sqlalchemy import text
+from keyword_matcher import KeywordMatcher
+
+STRING_TYPES = ('CHAR', 'VARCHAR', 'TEXT', 'ENUM')
+# 테이블별 마지막 변경 시각 (InnoDB는 재시작 직후 등 NULL일 수 있음)
+TABLE_VERSION_QUERY = (
+    "SELECT TABLE_NAME, UPDATE_TIME FROM information_schema.TABLES "
+    "WHERE TABLE_SCHEMA = DATABASE()"
+)
+
+def is_string_type(column_type):
+    return str(column_type or '').upper().startswith(STRING_TYPES)
+
+def parse_note_values(description, column_type=''):
+    """컬럼 설명의 범주형 값 목록 ({값: [이름]}). 예: '범주형(0: 일반, 1: 고급)', '30 = 시즌 7'"""
+    values = {}
+    description = description or ''
+    categorical = re.search(r'범주형\s*\((.*)\)', description)
+    if categorical:
+        items = [item.strip() for item in categorical.group(1).split(',') if item.strip()]
+        for item in items:
+            coded = re.match(r'([\w.-]+)\s*[:=]\s*(.+)$', item)
+            if coded:
+                values.setdefault(_typed(coded.group(1), column_type), []).append(coded.group(2).strip())
+            else:
+                # 이름만 나열된 경우 (예: 범주형(Weapon, Armor))
+                values.setdefault(_typed(item, column_type), [])
+    else:
+        for code, label in re.findall(r'(-?\d+)\s*=\s*([^,]+)', description):
+            values.setdefault(_typed(code, column_type), []).append(label.strip())
+    return values
+
+def _typed(value, column_type):
+    """숫자형 컬럼의 코드는 정수로 변환"""
+    if not is_string_type(column_type) and re.fullmatch(r'-?\d+', str(value)):
+        return int(value)
+    if str(value).lower() in ('true', 'false') and 'BOOL' in str(column_type).upper():
+        return str(value).lower() == 'true'
+    return value
+
+def sql_literal(value):
+    """프롬프트에 표시할 SQL 리터럴"""
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+class ValueIndex:
+    """범주형/이름 컬럼의 실제 값 색인 (질문 속 값 -> (테이블, 컬럼, 값))"""
+    MIN_TERM_LENGTH = 2  # 한 글자 별칭은 다른 단어 안에서 잘못 매칭되므로 제외
+    # 일상적으로도 쓰이는 범주 이름 (예: '일반 게임'의 '일반') - 컬럼을 가리키는 단어가 근처에 있을 때만 매칭
+    GENERIC_LABELS = {'일반', '고급', '희귀', '영웅', '전설', '초월', '무기', '방어구'}
+    QUALIFIER_SYNONYMS = {'유형': ['종류', '타입']}
+    QUALIFIER_WINDOW = 4  # 범주 이름 앞뒤로 컬럼 단어를 찾는 거리(글자 수, 조사 포함)
+    # 숫자로 언급되는 값 (예: '46 버전', '46.2 버전')
+    NUMBER_PATTERNS = [
+        (re.compile(r'(\d+)(?:\.(\d+))?\s*버전'), ('version_major', 'version_minor')),
+    ]
+
+    def __init__(self, metadata, aliases=None, max_distinct=1000):
+        self.metadata = metadata
+        self.aliases = aliases or {}          # "테이블.컬럼" -> {값: [별칭]}
+        self.max_distinct = max_distinct      # 이보다 값이 많은 컬럼은 색인하지 않음
+        self.scanned = {}                     # (테이블, 컬럼) -> DB에서 읽은 값 집합
+        self.scan_versions = {}               # (테이블, 컬럼) -> 조회 당시 테이블 변경 시각
+        self.last_scanned = 0                 # 마지막 갱신에서 다시 읽은 컬럼 수
+        self.refreshed_at = None
+        self.refreshes = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.matcher, self.entries, self.qualifiers = self._build()
+
+    @classmethod
+    def from_sources(cls, metadata, aliases_path=None, max_distinct=1000):
+        """데이터 명세서와 값 별칭 파일로 색인 구성 (DB 값은 refresh로 추가)"""
+        aliases = {}
+        if aliases_path:
+            try:
+                with open(aliases_path, 'r', encoding='utf-8') as f:
+                    aliases = json.load(f)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"값 별칭 파일 로드 중 오류 발생: {str(e)}")
+        return cls(metadata, aliases, max_distinct)
+
+    def scan_targets(self):
+        """DB에서 값을 읽을 컬럼 (값 목록이 없는 범주형 문자열 컬럼, 이름 컬럼, 별칭이 있는 문자열 컬럼)"""
+        targets = []
+        for table, details in self.metadata.items():
+            for column, info in details['columns'].items():
+                if not is_string_type(info.get('type')):
+                    continue
+                description = info.get('description', '')
+                categorical = '범주형' in description and not parse_note_values(description, info.get('type'))
+                # 참고 사항(범주형 등)을 제외한 설명 기준 (예: '캐릭터 이름')
+                named = description.split('범주형')[0].split('(')[0].strip().endswith('이름')
+                if categorical or named or f"{table}.{column}" in self.aliases:
+                    targets.append((table, column))
+        return targets
+
+    def _column_values(self):
+        """컬럼별 값과 이름/별칭 ({(테이블, 컬럼): {값: [용어]}})"""
+        columns = {}
+        for table, details in self.metadata.items():
+            for column, info in details['columns'].items():
+                column_type = info.get('type')
+                # 참/거짓 컬럼의 이름(사용, 사용안함 등)은 일반 단어라 잘못 매칭되므로 제외
+                if 'BOOL' in str(column_type).upper():
+                    continue
+                values = parse_note_values(info.get('description'), column_type)
+                scanned = self.scanned.get((table, column))
+                for value in scanned or ():
+                    values.setdefault(value, [])
+                for value, aliases in self.aliases.get(f"{table}.{column}", {}).items():
+                    value = _typed(value, column_type)
+                    # DB에서 읽은 컬럼은 실제로 있는 값의 별칭만 사용
+                    if scanned is not None and value not in scanned:
+                        continue
+                    values.setdefault(value, []).extend(aliases)
+                if values:
+                    columns[(table, column)] = values
+        return columns
+
+    def _column_qualifiers(self, table, column):
+        """컬럼을 가리키는 단어 (설명 앞부분의 두 글자 이상 단어, 예: '장비 등급' -> 장비, 등급)"""
+        description = self.metadata[table]['columns'][column].get('description', '')
+        head = description.split('범주형')[0].split('(')[0]
+        words = set(re.findall(r'[가-힣]{2,}', head))
+        for word in list(words):
+            words.update(self.QUALIFIER_SYNONYMS.get(word, ()))
+        return words
+
+    def _build(self):
+        """값/이름/별칭을 패턴으로 등록한 오토마톤과 일반 범주 이름의 컬럼 단어"""
+        matcher = KeywordMatcher()
+        entries = 0
+        qualifiers = {}  # 일반 범주 이름 (테이블, 컬럼, 용어) -> 컬럼 단어
+        for (table, column), values in self._column_values().items():
+            for value, labels in values.items():
+                # 숫자 코드 자체는 질문 속 다른 숫자와 구분할 수 없으므로 이름/별칭만 등록
+                terms = list(labels)
+                if isinstance(value, str):
+                    terms.append(value)
+                for term in terms:
+                    term = term.strip()
+                    if len(term) < self.MIN_TERM_LENGTH:
+                        continue
+                    matcher.add(term, {(table, column, value)})
+                    entries += 1
+                    if term in self.GENERIC_LABELS:
+                        qualifiers[(table, column, term)] = self._column_qualifiers(table, column)
+        return matcher.compile(), entries, qualifiers
+
+    def resolve(self, question):
+        """질문에 언급된 값 목록 (겹치는 매칭은 왼쪽부터 가장 긴 것만)"""
+        matcher, qualifiers = self.matcher, self.qualifiers
+        candidates = []
+        end = -1
+        for match in matcher.find_all(question):
+            if match['start'] < end:
+                continue
+            end = match['end']
+            term = question[match['start']:match['end']]
+            for table, column, value in sorted(match['expansions'], key=str):
+                candidates.append({
+                    'table': table, 'column': column, 'value': value, 'term': term,
+                    'start': match['start'], 'end': match['end']
+                })
+
+        def words_of(candidate):
+            return qualifiers.get((candidate['table'], candidate['column'], candidate['term'])) or ()
+
+        def near(candidate):
+            return question[max(0, candidate['start'] - self.QUALIFIER_WINDOW):candidate['end'] + self.QUALIFIER_WINDOW]
+
+        # 일반 범주 이름은 컬럼 단어가 근처에 있을 때만 인정 (예: '전설 등급', '무기 종류')
+        accepted, pending = [], []
+        for candidate in candidates:
+            words = qualifiers.get((candidate['table'], candidate['column'], candidate['term']))
+            if words is None or any(word in near(candidate) for word in words):
+                accepted.append(candidate)
+            else:
+                pending.append(candidate)
+        # 같은 테이블의 인정된 값 바로 옆이면 인정 (사이에 그 값의 컬럼 단어만 허용, 예: '전설 등급 무기'의 '무기')
+        def adjacent(left, right, words):
+            gap = question[left['end']:right['start']].strip()
+            return left['end'] <= right['start'] and (not gap or gap in words)
+
+        for candidate in pending:
+            if any(other['table'] == candidate['table']
+                   and (adjacent(other, candidate, words_of(other))
+                        or adjacent(candidate, other, words_of(other)))
+                   for other in accepted):
+                accepted.append(candidate)
+        accepted.sort(key=lambda c: c['start'])
+
+        resolved = [
+            {'table': c['table'], 'column': c['column'], 'value': c['value'], 'term': c['term']}
+            for c in accepted
+        ]
+        for pattern, columns in self.NUMBER_PATTERNS:
+            for match in pattern.finditer(question):
+                for column, number in zip(columns, match.groups()):
+                    table = self._table_with(column)
+                    if table and number is not None:
+                        resolved.append({'table': table, 'column': column, 'value': int(number),
+                                         'term': match.group(0)})
+        return resolved
+
+    def _table_with(self, column):
+        for table, details in self.metadata.items():
+            if column in details['columns']:
+                return table
+        return None
+
+    def scan_query(self, targets):
+        """대상 컬럼의 고유 값을 한 번에 읽는 UNION ALL 쿼리 (컬럼 순번, 값)"""
+        limit = int(self.max_distinct) + 1
+        return " UNION ALL ".join(
+            f"(SELECT DISTINCT {i} AS target, CONVERT(`{column}` USING utf8mb4) AS value "
+            f"FROM `{table}` WHERE `{column}` IS NOT NULL LIMIT {limit})"
+            for i, (table, column) in enumerate(targets)
+        )
+
+    def scan(self, db_connector, targets=None, connection=None):
+        """대상 컬럼의 고유 값 조회 ({(테이블, 컬럼): 값 집합}, 값이 너무 많은 컬럼 제외)"""
+        targets = self.scan_targets() if targets is None else list(targets)
+        if not targets:
+            return {}
+        if connection is None:
+            with db_connector.engine.connect() as connection:
+                return self.scan(db_connector, targets, connection)
+        values = {}
+        for target, value in connection.execute(text(self.scan_query(targets))):
+            values.setdefault(targets[target], set()).add(value)
+        # 값이 없는 컬럼은 빈 집합, 상한을 넘는 컬럼은 제외
+        return {
+            key: values.get(key, set()) for key in targets
+            if len(values.get(key, ())) <= self.max_distinct
+        }
+
+    def refresh(self, db_connector):
+        """변경된 테이블의 컬럼만 다시 읽어 바뀐 값이 있을 때만 오토마톤 재구성 (바뀐 컬럼 목록 반환)"""
+        targets = self.scan_targets()
+        with db_connector.engine.connect() as connection:
+            versions = dict(connection.execute(text(TABLE_VERSION_QUERY)).fetchall())
+            # 변경 시각을 알 수 없는 테이블은 매번 다시 읽음
+            stale = [
+                (table, column) for table, column in targets
+                if versions.get(table) is None
+                or (table, column) not in self.scan_versions
+                or self.scan_versions[(table, column)] != versions[table]
+            ]
+            fresh = self.scan(db_connector, stale, connection)
+        with self._lock:
+            stale_keys, target_keys = set(stale), set(targets)
+            scanned = {key: values for key, values in self.scanned.items()
+                       if key in target_keys and key not in stale_keys}
+            scanned.update(fresh)
+            self.scan_versions = {
+                key: versions.get(key[0]) if key in stale_keys else self.scan_versions.get(key)
+                for key in targets
+            }
+            changed = sorted(key for key in set(scanned) | set(self.scanned)
+                             if scanned.get(key) != self.scanned.get(key))
+            if changed:
+                self.scanned = scanned
+                # 새 오토마톤을 만든 뒤 참조만 교체 (조회 중인 요청은 기존 오토마톤 사용)
+                self.matcher, self.entries, self.qualifiers = self._build()
+            self.last_scanned = len(stale)
+            self.refreshed_at = time.time()
+            self.refreshes += 1
+        return changed
+
+    def set_metadata(self, metadata):
+        """데이터 명세서 변경 반영 (DB에서 읽은 값은 유지)"""
+        with self._lock:
+            self.metadata = metadata
+            self.matcher, self.entries, self.qualifiers = self._build()
+
+    def start_refresh(self, db_connector, interval=3600):
+        """백그라운드 주기적 갱신 시작 (시작 직후 1회 조회)"""
+        def run():
+            while True:
+                try:
+                    self.refresh(db_connector)
+                except Exception as e:
+                    print(f"값 색인 갱신 중 오류: {str(e)}")
+                if not interval or self._stop.wait(interval):
+                    return
+
+        self._thread = threading.Thread(target=run, name="value-index-refresh", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+from sql_stream import SQLStreamParser
+
+CHUNK_SIZES = [1, 3, 7, 100]
+
+def parse(response, chunk_size):
+    """청크 단위로 파서에 전달하여 추출된 SQL 반환"""
+    parser = SQLStreamParser()
+    fragments = []
+    for i in range(0, len(response), chunk_size):
+        fragments.append(parser.feed(response[i:i + chunk_size]))
+        if parser.done:
+            break
+    fragments.append(parser.finish())
+    return "".join(fragments).strip()
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("response, expected", [
+    ("From the schema above, the query is:\n```sql\nSELECT a.x FROM t a;\n```\n설명",
+     "SELECT a.x FROM t a;"),
+    ("With these tables:\n\n```\nWITH c AS (SELECT 1) SELECT * FROM c;\n```",
+     "WITH c AS (SELECT 1) SELECT * FROM c;"),
+    ("Selection of rows:\nSELECT 1;", "SELECT 1;"),
+    ("다음 쿼리를 사용합니다.\nSELECT a.id FROM t a;\n추가 설명", "SELECT a.id FROM t a;"),
+])
+def test_prose_preamble_is_skipped(response, expected, chunk_size):
+    assert parse(response, chunk_size) == expected
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("response, expected", [
+    ("```sql SELECT name FROM users;\n```", "SELECT name FROM users;"),
+    ("```SELECT name FROM users;\n```", "SELECT name FROM users;"),
+    ("```SELECT name FROM users;```", "SELECT name FROM users;"),
+])
+def test_fence_language_tag_on_same_line(response, expected, chunk_size):
+    assert parse(response, chunk_size) == expected
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_unfenced_sql(chunk_size):
+    response = "SELECT gc.name, AVG(x)\nFROM t gc\nWHERE gc.name = 'the best:'"
+    assert parse(response, chunk_size) == response